@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+
+# Keep every verified solution found in the logs once, in an archive addressed by its canonical form
+# Each model in a log is verified (see verify.verify_model) and reduced to the canonical form of its TRP under the symmetries that
+# the normal form of encode.py does not remove (see normal_copies in enumerate_trps.py), so two runs finding the same TRP
+# up to equivalence store it only once
+# The canonical form is packed into a record of 2+n*n+n*n/4 bytes (n and m, the symbols of P and Q as the two halves of one byte
+# per entry, and the dark entries of P and Q as bits) stored in archive/objects/<hash> where <hash> is the SHA-256 of the record
+# An SQLite index (archive/index.sqlite) maps each hash to the pair type and the subsquares Omega_i the TRP is compatible with,
+# and records every log (case, subsquare option and seed) and model in which it was found; logs are only read again when they change
+# The logs of run.sh, portfolio.py and campaign.py (log/<case><subsq>-<seed>.log, with the variable map log/<case><subsq>-<seed>.map
+# of a simplified instance) and of cube.py (log/cubes/<case><subsq>/cube-<i>.log) are archived
+# For example:
+# ./archive.py add log                     archives the solutions in the logs of the directory log
+# ./archive.py query UU-z4-11 and UU-z4-12 lists the TRPs found by both seeds 11 and 12 of UU with -z4
+# ./archive.py query UU minus UU-z4        lists the TRPs found by runs of UU without a subsquare option but not with -z4
+# ./archive.py show 3fa2                   prints the TRP whose hash starts with 3fa2 and the runs that found it
+
+import argparse
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import time
+
+import decode
+import encode
+import enumerate_trps
+import params
+import verify
+
+# Names of the logs of runs as in summary.py, also with the square types A, B, ... of the analogues of other orders (see params.py)
+log_pattern = re.compile(r"([A-Z]{2})(-z4|-z2xz2|-z4z2xz2)?-([0-9]+)\.log$")
+
+# Names of the logs of cube.py: cubes/<pair type><subsquare option>/cube-<index>.log
+cube_dir_pattern = re.compile(r"([A-Z]{2})(-z4|-z2xz2|-z4z2xz2)?$")
+cube_log_pattern = re.compile(r"cube-([0-9]+)\.log$")
+
+# Terms of a query: a case with an optional subsquare option and an optional seed (e.g., UU, UU-z4 or UU-z4-11), or all
+term_pattern = re.compile(r"([A-Z]{2})(-z4|-z2xz2|-z4z2xz2)?(?:-([0-9]+))?$")
+
+schema = ["""create table if not exists trps (
+	hash text primary key,
+	n integer,
+	m integer,
+	pair_type text,
+	omega text,
+	added real
+)""", """create table if not exists found (
+	file text,
+	model integer,
+	hash text,
+	pair_type text,
+	subsq text,
+	seed integer,
+	primary key (file, model)
+)""", """create table if not exists logs (
+	file text primary key,
+	mtime real,
+	size integer,
+	models integer,
+	rejected integer
+)""", "create index if not exists found_hash on found (hash)", "create index if not exists found_case on found (pair_type, subsq, seed)"]
+
+# Set the order n and the subsquare order m from the parameters p (see params.py), also in enumerate_trps.py, encode.py, decode.py and verify.py
+def configure(p):
+	global n, m
+	assert p.n <= 16, "records hold the symbols of P and Q in one byte per entry"
+	enumerate_trps.configure(p)
+	n = p.n
+	m = p.m
+
+configure(params.default)
+
+# Return the record of the TRP (P, Q) with dark entries Pd and Qd (given as tuples of rows)
+def pack(P, Q, Pd, Qd):
+	record = bytearray([n, m])
+	record.extend(P[i][j] << 4 | Q[i][j] for i in range(n) for j in range(n))
+	bits = [D[i][j] for D in (Pd, Qd) for i in range(n) for j in range(n)]
+	record.extend(sum(bits[b+t] << t for t in range(8) if b+t < len(bits)) for b in range(0, len(bits), 8))
+	return bytes(record)
+
+# Return the TRP (P, Q, Pd, Qd) packed in the record
+def unpack(record):
+	if record[0] != n or record[1] != m:
+		raise ValueError("record of order {},{} read with order {},{}".format(record[0], record[1], n, m))
+	entries = record[2:2+n*n]
+	P = tuple(tuple(entries[i*n+j] >> 4 for j in range(n)) for i in range(n))
+	Q = tuple(tuple(entries[i*n+j] & 15 for j in range(n)) for i in range(n))
+	bits = record[2+n*n:]
+	def dark(b):
+		return bool(bits[b >> 3] >> (b & 7) & 1)
+	Pd = tuple(tuple(dark(i*n+j) for j in range(n)) for i in range(n))
+	Qd = tuple(tuple(dark(n*n+i*n+j) for j in range(n)) for i in range(n))
+	return P, Q, Pd, Qd
+
+# Return the canonical form (P, Q, Pd, Qd) of the TRP in the decoded squares LS (in the flat layout of decode.py)
+def canonical(LS, same_type):
+	P, Q, Pc, Qc = (tuple(tuple(row) for row in decode.square_rows(LS, p)) for p in (2, 3, 0, 1))
+	Pd = tuple(tuple(c == decode.DARK for c in row) for row in Pc)
+	Qd = tuple(tuple(c == decode.DARK for c in row) for row in Qc)
+	return min(enumerate_trps.normal_copies(P, Q, Pd, Qd, same_type))
+
+# Return the name of the file holding the record with the given hash in the archive directory
+def object_name(directory, h):
+	return os.path.join(directory, "objects", h[:2], h[2:])
+
+# Store the record in the archive directory (unless it is already there) and return its hash
+def store(directory, record):
+	h = hashlib.sha256(record).hexdigest()
+	name = object_name(directory, h)
+	if not os.path.exists(name):
+		os.makedirs(os.path.dirname(name), exist_ok=True)
+		with open(name + ".tmp", "wb") as f:
+			f.write(record)
+		os.replace(name + ".tmp", name)
+	return h
+
+# Return the record with the given hash in the archive directory
+def load(directory, h):
+	with open(object_name(directory, h), "rb") as f:
+		return f.read()
+
+# Open the index of the archive directory
+def open_index(directory):
+	os.makedirs(directory, exist_ok=True)
+	db = sqlite3.connect(os.path.join(directory, "index.sqlite"))
+	for statement in schema:
+		db.execute(statement)
+	return db
+
+# Return the case, subsquare option and seed (None for a cube) of the log name, or None if it is not a log of a run or a cube of
+# a pair type of the configured order
+def log_case(name):
+	m = log_pattern.fullmatch(os.path.basename(name))
+	seed = int(m.group(3)) if m else None
+	if not m:
+		m = cube_dir_pattern.fullmatch(os.path.basename(os.path.dirname(name)))
+		if not m or not cube_log_pattern.fullmatch(os.path.basename(name)):
+			return None
+	if any(t not in encode.transversal_types for t in m.group(1)):
+		return None
+	return m.group(1), m.group(2) or "", seed
+
+# Verify the models of the log name of the given case and subsquare option and add the TRPs to the archive directory and its index db
+# Return the numbers of models, of TRPs new to the archive and of models that failed verification
+def add_log(db, directory, name, case, subsq, seed):
+	z4, z2xz2 = encode.subsquare_flags(subsq)
+	unmap = None
+	if os.path.exists(name[:-4] + ".map"):
+		with open(name[:-4] + ".map") as f:
+			unmap = decode.read_map(f)
+	models, new, rejected = 0, 0, 0
+	db.execute("delete from found where file = ?", (name,))
+	with open(name, errors="replace") as f:
+		for model in decode.read_models(f):
+			if model is None:
+				continue
+			models += 1
+			try:
+				result = verify.verify_model(unmap(model) if unmap else model, case[0], case[1], z4, z2xz2)
+			except ValueError:
+				result = None
+			if result is None or not result.passed():
+				print("{}: model {} failed verification{}".format(name, models, ": " + ", ".join(result.failed()) if result else ""), file=sys.stderr)
+				rejected += 1
+				continue
+			h = store(directory, pack(*canonical(result.squares, case[0] == case[1])))
+			omega = ",".join(str(s+1) for s, c in enumerate(result.compatible) if c)
+			if db.execute("insert or ignore into trps values (?, ?, ?, ?, ?, ?)", (h, n, m, case, omega, time.time())).rowcount:
+				new += 1
+			db.execute("insert into found values (?, ?, ?, ?, ?, ?)", (name, models, h, case, subsq, seed))
+	return models, new, rejected
+
+# Add the solutions in the logs given in names (files or directories searched recursively) to the archive directory
+# Logs already archived are skipped unless they changed since; return the numbers of logs read, models, new TRPs and rejected models
+def update(db, directory, names):
+	indexed = {row[0]: (row[1], row[2]) for row in db.execute("select file, mtime, size from logs")}
+	totals = [0, 0, 0, 0]
+	for name in decode.input_files(names):
+		name = os.path.normpath(name)
+		case = log_case(name)
+		if case is None:
+			continue
+		st = os.stat(name)
+		if indexed.get(name) == (st.st_mtime, st.st_size):
+			continue
+		counts = add_log(db, directory, name, *case)
+		db.execute("insert or replace into logs values (?, ?, ?, ?, ?)", (name, st.st_mtime, st.st_size, counts[0], counts[2]))
+		db.commit()
+		for t, c in enumerate((1,) + counts):
+			totals[t] += c
+	return totals
+
+# Return the set of hashes of the TRPs found by the runs selected by the term (see term_pattern)
+def select(db, term):
+	if term == "all":
+		return {row[0] for row in db.execute("select hash from trps")}
+	m = term_pattern.fullmatch(term)
+	if not m:
+		raise ValueError("invalid term {} (expected e.g. UU, UU-z4, UU-z4-11 or all)".format(term))
+	query = "select hash from found where pair_type = ? and subsq = ?"
+	args = (m.group(1), m.group(2) or "")
+	if m.group(3) is not None:
+		query += " and seed = ?"
+		args += (int(m.group(3)),)
+	return {row[0] for row in db.execute(query, args)}
+
+# Evaluate a query of terms joined by the operators and, or and minus (from left to right) and return the set of hashes
+def evaluate(db, words):
+	if not words or len(words) % 2 == 0:
+		raise ValueError("a query is a term or terms joined by and, or and minus")
+	result = select(db, words[0])
+	for op, term in zip(words[1::2], words[2::2]):
+		if op not in ("and", "or", "minus"):
+			raise ValueError("unknown operator {} (expected and, or or minus)".format(op))
+		s = select(db, term)
+		result = result & s if op == "and" else result | s if op == "or" else result - s
+	return result
+
+# Return the hash of the archive starting with prefix
+def resolve(db, prefix):
+	hashes = [row[0] for row in db.execute("select hash from trps where hash like ?", (prefix + "%",))]
+	if len(hashes) != 1:
+		raise ValueError("{} TRPs have a hash starting with {}".format(len(hashes), prefix))
+	return hashes[0]
+
+def main():
+	parser = argparse.ArgumentParser(description="Archive the verified solutions in the logs under the hash of their canonical form")
+	parser.add_argument("--archive", default="archive", help="directory of the archive (default: archive)")
+	parser.add_argument("--order", help="archive the analogue n,m of order n with an m x m subsquare (see params.py)")
+	commands = parser.add_subparsers(dest="command", required=True)
+	add = commands.add_parser("add", help="archive the solutions in logs")
+	add.add_argument("logs", nargs="*", default=["log"], help="log files and directories of logs (default: log)")
+	query = commands.add_parser("query", help="list the TRPs found by the runs selected by a query")
+	query.add_argument("words", nargs="+", help="terms (e.g. UU, UU-z4 or UU-z4-11, or all) joined by and, or and minus")
+	query.add_argument("--omega", type=int, help="only list the TRPs compatible with the subsquare Omega_i")
+	query.add_argument("-c", dest="count", action="store_true", help="print only the number of TRPs")
+	show = commands.add_parser("show", help="print a TRP and the runs that found it")
+	show.add_argument("hash", help="hash (or the start of the hash) of the TRP")
+	show.add_argument("-f", dest="format", choices=["text", "json"], default="text", help="output format of the squares (as in decode.py)")
+	args = parser.parse_args()
+	if args.order:
+		configure(params.from_string(args.order))
+
+	db = open_index(args.archive)
+	try:
+		if args.command == "add":
+			logs, models, new, rejected = update(db, args.archive, args.logs)
+			total = db.execute("select count(*) from trps").fetchone()[0]
+			print("{} logs read: {} models, {} new TRPs, {} failed verification ({} TRPs in the archive)".format(logs, models, new, rejected, total))
+			if rejected:
+				sys.exit(1)
+		elif args.command == "query":
+			hashes = evaluate(db, args.words)
+			rows = db.execute("select trps.hash, trps.pair_type, omega, count(*) from trps join found on trps.hash = found.hash "
+			                  "group by trps.hash order by trps.added").fetchall()
+			rows = [row for row in rows if row[0] in hashes and (args.omega is None or str(args.omega) in row[2].split(","))]
+			if args.count:
+				print(len(rows))
+			for h, pair_type, omega, found in ([] if args.count else rows):
+				print("{} {} Omega_{{{}}} found {} time{}".format(h[:16], pair_type, omega, found, "" if found == 1 else "s"))
+		else:
+			h = resolve(db, args.hash)
+			LS = enumerate_trps.flat_squares(*unpack(load(args.archive, h)))
+			if args.format == "text":
+				sys.stdout.write(decode.format_text(LS))
+				for file, model in db.execute("select file, model from found where hash = ? order by file, model", (h,)):
+					print("found in {} (model {})".format(file, model))
+			else:
+				print(decode.format_json(LS, h))
+	except ValueError as e:
+		print("Error: {}".format(e))
+		sys.exit(1)
+	finally:
+		db.close()
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+# Benchmark the encodings of the exactly-one and cardinality constraints available in encode.py
+# For each pair type and each combination of encodings it reports the number of variables, clauses and literals and the encoding time
+# With --seeds k it also solves every instance with Kissat using k random seeds and reports the distribution of the solving times
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import encode
+import portfolio
+
+# Solve the instance cnf with Kissat and return the process time in seconds, or None if the solver stopped without an answer
+def solve_time(solver, cnf, seed, timeout):
+	result = subprocess.run(portfolio.solver_command(solver, cnf, seed, timeout), capture_output=True, text=True)
+	if result.returncode not in (portfolio.SAT, portfolio.UNSAT):
+		return None
+	m = re.search(r"^c process-time:.*?([0-9.]+) seconds", result.stdout, re.M)
+	return float(m.group(1)) if m else None
+
+# Return a summary "solved/total median min max" of a list of solving times (None for runs without an answer)
+def summarize(times):
+	solved = sorted(t for t in times if t is not None)
+	if not solved:
+		return "{:>5}/{:<3}{:>10}{:>10}{:>10}".format(0, len(times), "-", "-", "-")
+	# Runs without an answer count as taking longer than any solved run for the median
+	median = statistics.median(solved + [float("inf")]*(len(times)-len(solved)))
+	return "{:>5}/{:<3}{:>10}{:>10.1f}{:>10.1f}".format(len(solved), len(times), "timeout" if median == float("inf") else "{:.1f}".format(median), solved[0], solved[-1])
+
+def main():
+	parser = argparse.ArgumentParser(description="Compare the exactly-one and cardinality encodings of encode.py")
+	parser.add_argument("cases", nargs="*", default=["UU", "SX", "UW", "WW", "VX", "UX", "WX", "XX"], help="pair types to encode")
+	parser.add_argument("-z", dest="subsq", help="subsquare consistency option (4, 2xz2 or 4z2xz2)")
+	parser.add_argument("--eo", nargs="+", default=encode.eo_encodings, help="exactly-one encodings to compare")
+	parser.add_argument("--card", nargs="+", default=encode.card_encodings, help="cardinality encodings to compare")
+	parser.add_argument("--seeds", type=int, default=0, help="number of random seeds to solve each instance with (default: do not solve)")
+	parser.add_argument("-t", dest="timeout", type=int, default=3600, help="stop each solver after timeout seconds")
+	parser.add_argument("-j", dest="jobs", type=int, default=len(os.sched_getaffinity(0)), help="number of solvers run in parallel")
+	parser.add_argument("--solver", default=portfolio.default_solver, help="path to the Kissat binary")
+	args = parser.parse_args()
+	subsq = "-z" + args.subsq if args.subsq else ""
+	z4, z2xz2 = encode.subsquare_flags(subsq)
+
+	if args.seeds:
+		portfolio.ensure_solver(args.solver)
+	header = "{:<10}{:<12}{:<12}{:>8}{:>9}{:>10}{:>9}".format("case", "eo", "card", "vars", "clauses", "literals", "encode s")
+	if args.seeds:
+		header += "{:>9}{:>10}{:>10}{:>10}".format("solved", "median s", "min s", "max s")
+	print(header)
+
+	with tempfile.TemporaryDirectory() as tmp, ThreadPoolExecutor(args.jobs) as pool:
+		for case in args.cases:
+			for eo in args.eo:
+				for card in args.card:
+					# Time the full encoding, including the core, since the core depends on the encodings
+					encode.core_cache.clear()
+					start = time.perf_counter()
+					e = encode.encode(case[0], case[1], z4, z2xz2, False, eo, card)
+					elapsed = time.perf_counter() - start
+					line = "{:<10}{:<12}{:<12}{:>8}{:>9}{:>10}{:>9.2f}".format(case+subsq, eo, card, e.total_vars, len(e.clauses), len(e.clauses.lits)-len(e.clauses), elapsed)
+					if args.seeds:
+						cnf = os.path.join(tmp, "{}-{}-{}.cnf".format(case, eo, card))
+						with open(cnf, "w") as f:
+							e.write_dimacs(f)
+						seeds = portfolio.random_seeds(args.seeds)
+						times = list(pool.map(lambda seed: solve_time(args.solver, cnf, seed, args.timeout), seeds))
+						os.remove(cnf)
+						line += summarize(times)
+					print(line, flush=True)
+
+if __name__ == "__main__":
+	main()
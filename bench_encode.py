@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+# Benchmark the encoding time and peak memory of encode.py against a reference version of encode.py
+# The reference version is taken from a git revision (by default the first commit of the repository)
+# and the script checks that both versions produce byte-identical output
+# With --sweep it instead times encoding every pair type and subsquare option in one process using the encode() API
+
+import argparse
+import hashlib
+import itertools
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# Run the encoder script on the given arguments and return (wall time, peak RSS in MB, SHA-256 of output)
+def run_encoder(script, args):
+	h = hashlib.sha256()
+	start = time.perf_counter()
+	proc = subprocess.Popen([sys.executable, script] + args, stdout=subprocess.PIPE)
+	while True:
+		data = proc.stdout.read(1<<20)
+		if not data:
+			break
+		h.update(data)
+	_, status, usage = os.wait4(proc.pid, 0)
+	elapsed = time.perf_counter() - start
+	assert os.waitstatus_to_exitcode(status) == 0, "{} {} failed".format(script, " ".join(args))
+	# ru_maxrss is in kilobytes on Linux
+	return elapsed, usage.ru_maxrss/1024, h.hexdigest()
+
+# Time encoding all 28 pair types with all 4 subsquare options in this process
+def sweep():
+	import encode
+	start = time.perf_counter()
+	core = encode.get_core(use_disk_cache=False)
+	core_time = time.perf_counter() - start
+	count = 0
+	for P_type, Q_type in itertools.combinations_with_replacement(sorted(encode.transversal_types), 2):
+		for z4, z2xz2 in itertools.product([False, True], repeat=2):
+			e = encode.encode(P_type, Q_type, z4, z2xz2, use_disk_cache=False)
+			count += 1
+	total = time.perf_counter() - start
+	print("core encode: {:.2f} s".format(core_time))
+	print("{} instances: {:.2f} s in total, {:.3f} s per instance after the core".format(count, total, (total-core_time)/count))
+
+def main():
+	parser = argparse.ArgumentParser(description="Compare encode.py against a reference version")
+	parser.add_argument("cases", nargs="*", default=["UU", "SX", "UW", "WW", "VX", "UX", "WX", "XX"], help="pair types to encode")
+	parser.add_argument("-r", "--ref", help="git revision of the reference encode.py (default: first commit)")
+	parser.add_argument("-n", "--repeat", type=int, default=3, help="number of timed runs per case (the best is reported)")
+	parser.add_argument("--sweep", action="store_true", help="time an in-process sweep over all pair types and subsquare options")
+	parser.add_argument("-z", dest="subsq", help="subsquare consistency option passed to both encoders (4, 2xz2 or 4z2xz2)")
+	args = parser.parse_args()
+	subsq = "-z" + args.subsq if args.subsq else ""
+	if args.sweep:
+		sweep()
+		return
+
+	here = os.path.dirname(os.path.abspath(__file__))
+	ref = args.ref
+	if ref is None:
+		ref = subprocess.check_output(["git", "rev-list", "--max-parents=0", "HEAD"], cwd=here, text=True).split()[0]
+	ref_source = subprocess.check_output(["git", "show", ref + ":encode.py"], cwd=here)
+
+	with tempfile.NamedTemporaryFile(suffix=".py") as ref_script:
+		ref_script.write(ref_source)
+		ref_script.flush()
+
+		print("{:<10}{:>10}{:>10}{:>10}{:>10}{:>10}".format("case", "ref s", "new s", "ref MB", "new MB", "output"))
+		for case in args.cases:
+			encoder_args = ([subsq] if subsq else []) + [case]
+			ref_runs = [run_encoder(ref_script.name, encoder_args) for _ in range(args.repeat)]
+			new_runs = [run_encoder(os.path.join(here, "encode.py"), encoder_args) for _ in range(args.repeat)]
+			identical = len({r[2] for r in ref_runs + new_runs}) == 1
+			print("{:<10}{:>10.2f}{:>10.2f}{:>10.1f}{:>10.1f}{:>10}".format(case+subsq,
+				min(r[0] for r in ref_runs), min(r[0] for r in new_runs),
+				max(r[1] for r in ref_runs), max(r[1] for r in new_runs),
+				"same" if identical else "DIFFERS"))
+			if not identical:
+				sys.exit(1)
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+
+# Benchmark how the encoding of encode.py grows with the order of the problem
+# The smaller analogues of Myrvold's problem (order n with an m x m subsquare, see params.py) are encoded for every pair type
+# and solved with a solver of the python-sat package; the number of variables and clauses, the encoding time,
+# the result and the solving time of every instance are reported, followed by a summary of each order
+# With --json file the records are also written as JSON so that the runs of different versions of the encoder can be compared
+# Only the analogues with m(m+1) = 2n have dark entries (see params.py), and the smallest of them is Myrvold's problem itself (10,4):
+# in the default analogues the dark constraints only force every dark variable false, so the growth reported here leaves out
+# the placement of the dark entries and underestimates the resources needed for order 10 (a note is printed when this is the case)
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import statistics
+import sys
+import time
+
+import encode
+import params
+
+# Solve the clauses with the python-sat solver name and send the result and the solving time over the connection conn
+def solve_child(name, clauses, conn):
+	from pysat.solvers import Solver
+	with Solver(name=name, bootstrap_with=clauses) as solver:
+		start = time.perf_counter()
+		result = solver.solve()
+		conn.send((result, time.perf_counter() - start))
+
+# Solve the clauses with the python-sat solver name for at most timeout seconds
+# Return the result (True for SAT, False for UNSAT, None if the solver was stopped) and the solving time in seconds
+# The solver runs in a forked process that is killed at the timeout (not every python-sat solver can be interrupted)
+def solve(name, clauses, timeout):
+	ctx = multiprocessing.get_context("fork")
+	recv, send = ctx.Pipe(False)
+	start = time.perf_counter()
+	child = ctx.Process(target=solve_child, args=(name, clauses, send))
+	child.start()
+	send.close()
+	if recv.poll(timeout):
+		result = recv.recv()
+	else:
+		result = None, time.perf_counter() - start
+	child.kill()
+	child.join()
+	recv.close()
+	return result
+
+def main():
+	parser = argparse.ArgumentParser(description="Encode and solve smaller analogues of the problem and report how the instances grow")
+	parser.add_argument("orders", nargs="*", default=["6,3", "7,3", "8,3", "9,3", "7,4", "8,4", "9,4"], help="analogues n,m to run (order n with an m x m subsquare)")
+	parser.add_argument("-p", dest="pairs", type=int, help="run at most pairs pair types of each order")
+	parser.add_argument("-t", dest="timeout", type=float, default=60, help="stop each solver after timeout seconds")
+	parser.add_argument("--no-solve", dest="solve", action="store_false", help="only encode the instances")
+	parser.add_argument("--solver", default="cadical195", help="name of the python-sat solver to use")
+	parser.add_argument("--json", help="also write the records to this file")
+	args = parser.parse_args()
+	if args.solve:
+		try:
+			import pysat.solvers
+		except ImportError:
+			print("Solving requires the python-sat package (pip install python-sat); pass --no-solve to only encode")
+			sys.exit(1)
+
+	records = []
+	print("{:<8}{:<6}{:>9}{:>10}{:>11}{:>10}{:>10}".format("order", "pair", "vars", "clauses", "encode s", "result", "solve s"))
+	for order in args.orders:
+		p = params.from_string(order)
+		encode.configure(p)
+		pairs = list(itertools.combinations_with_replacement(sorted(p.types), 2))[:args.pairs]
+		for P_type, Q_type in pairs:
+			start = time.perf_counter()
+			e = encode.encode(P_type, Q_type, use_disk_cache=False)
+			encode_time = time.perf_counter() - start
+			record = {"n": p.n, "m": p.m, "darks": p.darks, "pair type": P_type + Q_type, "vars": e.total_vars, "clauses": len(e.clauses),
+			          "literals": len(e.clauses.lits)-len(e.clauses), "encode seconds": encode_time, "result": None, "solve seconds": None}
+			if args.solve:
+				result, record["solve seconds"] = solve(args.solver, e.clauses, args.timeout)
+				record["result"] = {True: "SAT", False: "UNSAT", None: "timeout"}[result]
+			records.append(record)
+			print("{:<8}{:<6}{:>9}{:>10}{:>11.2f}{:>10}{:>10}".format(order, P_type + Q_type, record["vars"], record["clauses"], encode_time,
+			      record["result"] or "-", "-" if record["solve seconds"] is None else "{:.2f}".format(record["solve seconds"])), flush=True)
+
+	# Summary of each order: the number of pair types, the mean size of the instances and the total solving time
+	print()
+	print("{:<8}{:>7}{:>7}{:>12}{:>14}{:>8}{:>8}{:>10}{:>10}".format("order", "darks", "pairs", "mean vars", "mean clauses", "SAT", "UNSAT", "timeouts", "solve s"))
+	for order in args.orders:
+		p = params.from_string(order)
+		rs = [r for r in records if (r["n"], r["m"]) == (p.n, p.m)]
+		if not rs:
+			continue
+		print("{:<8}{:>7}{:>7}{:>12.0f}{:>14.0f}{:>8}{:>8}{:>10}{:>10}".format(order, p.darks, len(rs), statistics.mean(r["vars"] for r in rs), statistics.mean(r["clauses"] for r in rs),
+		      sum(r["result"] == "SAT" for r in rs), sum(r["result"] == "UNSAT" for r in rs), sum(r["result"] == "timeout" for r in rs),
+		      "-" if not args.solve else "{:.2f}".format(sum(r["solve seconds"] for r in rs))))
+	without_darks = [order for order in args.orders if params.from_string(order).darks == 0]
+	if without_darks:
+		print()
+		print("Note: the analogues {} have no dark entries (only those with m(m+1) = 2n do, the smallest being 10,4),".format(", ".join(without_darks)))
+		print("so their dark constraints only force the dark variables false; their growth does not include placing the dark entries")
+		print("and underestimates the resources needed for order 10 (run ./bench_scaling.py --no-solve 10,4 for the sizes of order 10)")
+
+	if args.json:
+		with open(args.json, "w") as f:
+			json.dump({"solver": args.solver if args.solve else None, "timeout": args.timeout, "records": records}, f, indent=1)
+
+if __name__ == "__main__":
+	main()
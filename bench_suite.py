@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+
+# Benchmark the whole pipeline on a fixed suite of cases, subsquare options and seeds, and compare the results with a stored baseline
+# The suite is a JSON file such as {"cases": ["UU", "SX"], "flags": ["", "-z4"], "seeds": [1, 2, 3], "time": 60}
+# (optionally with "order": "7,3" for an analogue of another order, see params.py); without --suite the default suite below is run
+# For every case and subsquare option it measures
+# * the time to encode the instance with encode.py (on the core of the encoding, which is timed once for the suite),
+#   the time to write it in DIMACS format, its numbers of variables, clauses and literals and the SHA-256 of the DIMACS,
+# * the time per model to decode with decode.py and to verify with verify.py a fixed set of --models full assignments
+#   (random Latin squares with their colours, drawn from the first seed, so that every check of verify.py is run),
+# * the process time of Kissat on each seed with a budget of the "time" of the suite (-t overrides it)
+# Every time is measured -r times; the results are written as JSON with -o (a baseline, recording the version of the format,
+# the git revision and the machine) and compared with a baseline given with -b
+# A time is reported as a regression when its median grew by more than --tolerance and the Mann-Whitney U test of the two sets
+# of measurements gives p < --alpha (runs of Kissat without an answer count as twice the budget); any change of the size
+# or the DIMACS of an instance is reported as well, and the exit status is 1 if there is a regression
+# For example, ./bench_suite.py -o bench/baseline.json records a baseline, and ./bench_suite.py -b bench/baseline.json
+# after a change to encode.py, decode.py or verify.py reports what became slower
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bench_card
+import decode
+import encode
+import params
+import portfolio
+import verify
+
+# Version of the format of the results; increase it whenever the meaning of a field changes so old baselines are not compared
+BENCH_FORMAT = 1
+
+default_suite = {"cases": ["UU", "SX", "UW", "WW", "VX", "UX", "WX", "XX"], "flags": ["", "-z4"], "seeds": [1, 2, 3], "time": 60}
+
+# Timed metrics of the records and of the suite, and the metrics compared exactly
+timed_metrics = ["encode seconds", "write seconds", "decode seconds", "verify seconds", "solve seconds"]
+size_metrics = ["vars", "clauses", "literals", "dimacs sha256"]
+
+# Read the suite in the file name (or return the default suite) and check its fields
+def load_suite(name):
+	suite = dict(default_suite)
+	if name:
+		with open(name) as f:
+			suite = json.load(f)
+		suite.setdefault("flags", [""])
+		suite.setdefault("seeds", [1])
+		suite.setdefault("time", 60)
+	if isinstance(suite["seeds"], int):
+		suite["seeds"] = list(range(1, suite["seeds"]+1))
+	if "order" in suite:
+		p = params.from_string(suite["order"])
+		encode.configure(p)
+		decode.configure(p)
+		verify.configure(p)
+	for case in suite["cases"]:
+		if len(case) != 2 or any(t not in encode.transversal_types for t in case):
+			raise ValueError("Invalid pair type {} in the suite".format(case))
+	for subsq in suite["flags"]:
+		encode.subsquare_flags(subsq)
+	return suite
+
+# Return the times of repeat calls of f in seconds
+def timings(f, repeat):
+	times = []
+	for _ in range(repeat):
+		start = time.perf_counter()
+		f()
+		times.append(time.perf_counter() - start)
+	return times
+
+# Return k full assignments of the squares (as models with a literal for every variable of the squares) drawn with the seed:
+# P and Q are random isotopes of the cyclic Latin square with the entries below m white and darks dark entries in each of the first n-m columns
+def sample_models(count, seed):
+	n, m = encode.n, encode.m
+	rng = random.Random(seed)
+	models = []
+	for _ in range(count):
+		squares = []
+		for _ in range(2):
+			rows, cols, syms = (rng.sample(range(n), n) for _ in range(3))
+			squares.append([[syms[(rows[i]+cols[j]) % n] for j in range(n)] for i in range(n)])
+		colours = [[[decode.WHITE if A[i][j] < m else decode.LIGHT for j in range(n)] for i in range(n)] for A in squares]
+		for C in colours:
+			for j in range(encode.first_cols):
+				for i in rng.sample([i for i in range(n) if C[i][j] != decode.WHITE], encode.darks):
+					C[i][j] = decode.DARK
+		values = colours + squares
+		model = []
+		for sq in range(4):
+			for i in range(n):
+				for j in range(n):
+					model.extend(((sq*n+i)*n+j)*n+k+1 if k == values[sq][i][j] else -(((sq*n+i)*n+j)*n+k+1) for k in range(n))
+		models.append(model)
+	return models
+
+# Return the process times of Kissat on the instance cnf for the seeds (None for the runs without an answer within the budget)
+def solve_times(solver, cnf, seeds, budget, jobs):
+	with ThreadPoolExecutor(jobs) as pool:
+		return list(pool.map(lambda seed: bench_card.solve_time(solver, cnf, seed, budget), seeds))
+
+# Run the suite and return the results
+def run_suite(suite, repeat, models, solve, solver, jobs):
+	here = os.path.dirname(os.path.abspath(__file__))
+	try:
+		revision = subprocess.check_output(["git", "describe", "--always", "--dirty"], cwd=here, text=True, stderr=subprocess.DEVNULL).strip()
+	except (OSError, subprocess.CalledProcessError):
+		revision = None
+	results = {"format": BENCH_FORMAT, "encoder version": encode.ENCODER_VERSION, "revision": revision, "created": time.time(),
+	           "machine": {"node": platform.node(), "processor": platform.processor() or platform.machine(), "python": platform.python_version(),
+	                       "cores": len(os.sched_getaffinity(0))},
+	           "suite": suite, "repeat": repeat, "models": models, "solver": solver if solve else None}
+	results["core seconds"] = timings(lambda: encode.generate_core(), repeat)
+	print("core: {:.2f} seconds".format(statistics.median(results["core seconds"])))
+	sample = sample_models(models, suite["seeds"][0])
+	if solve:
+		portfolio.ensure_solver(solver)
+	records = []
+	with tempfile.TemporaryDirectory() as tmp:
+		for case in suite["cases"]:
+			for subsq in suite["flags"]:
+				z4, z2xz2 = encode.subsquare_flags(subsq)
+				record = {"case": case, "subsq": subsq}
+				encoders = []
+				record["encode seconds"] = timings(lambda: encoders.append(encode.encode(case[0], case[1], z4, z2xz2)), repeat)
+				e = encoders[-1]
+				cnf = os.path.join(tmp, "{}{}.cnf".format(case, subsq))
+				def write():
+					with open(cnf, "w") as f:
+						e.write_dimacs(f)
+				record["write seconds"] = timings(write, repeat)
+				record.update({"vars": e.total_vars, "clauses": len(e.clauses), "literals": len(e.clauses.lits)-len(e.clauses)})
+				with open(cnf, "rb") as f:
+					record["dimacs sha256"] = hashlib.sha256(f.read()).hexdigest()
+				decoded = []
+				record["decode seconds"] = [t/models for t in timings(lambda: decoded.extend(decode.decode_model(model) for model in sample), repeat)]
+				squares = [[decode.square_rows(LS, p) for p in range(4)] for LS in decoded[:models]]
+				record["verify seconds"] = [t/models for t in timings(lambda: [verify.check_trp(*S, case[0], case[1], z4, z2xz2) for S in squares], repeat)]
+				if solve:
+					record["seeds"] = suite["seeds"]
+					record["solve seconds"] = solve_times(solver, cnf, suite["seeds"], suite["time"], jobs)
+				records.append(record)
+				print("{:<10}{:>9}{:>10}{:>10.3f}{:>10.3f}{:>12.1f}{:>12.1f}{:>12}".format(case+subsq, record["vars"], record["clauses"],
+				      statistics.median(record["encode seconds"]), statistics.median(record["write seconds"]),
+				      1e6*statistics.median(record["decode seconds"]), 1e6*statistics.median(record["verify seconds"]),
+				      " ".join("-" if t is None else "{:.1f}".format(t) for t in record.get("solve seconds", []))))
+				sys.stdout.flush()
+	results["records"] = records
+	return results
+
+# Return the two-sided p-value of the Mann-Whitney U test of the samples x and y (normal approximation with the correction for ties)
+def mann_whitney(x, y):
+	values = sorted([(v, 0) for v in x] + [(v, 1) for v in y])
+	N = len(values)
+	ranks = [0]*N
+	ties = 0
+	i = 0
+	while i < N:
+		j = i
+		while j+1 < N and values[j+1][0] == values[i][0]:
+			j += 1
+		for k in range(i, j+1):
+			ranks[k] = (i+j)/2 + 1
+		ties += (j-i+1)**3 - (j-i+1)
+		i = j+1
+	n1, n2 = len(x), len(y)
+	U = sum(r for r, (v, s) in zip(ranks, values) if s == 0) - n1*(n1+1)/2
+	variance = n1*n2/12 * ((N+1) - ties/(N*(N-1))) if N > 1 else 0
+	if variance <= 0:
+		return 1.0
+	z = max(0, abs(U - n1*n2/2) - 0.5) / variance**0.5
+	return 2*(1 - statistics.NormalDist().cdf(z))
+
+# Return the measurements of a timed metric of a record, with the runs of Kissat without an answer counted as twice the budget
+def samples(record, metric, budget):
+	return [2*budget if t is None else t for t in record[metric]]
+
+# Compare the results with the baseline and print the differences; return the number of regressions
+def compare(baseline, results, tolerance, alpha):
+	if baseline.get("format") != BENCH_FORMAT:
+		raise ValueError("the baseline has format {}, not {}".format(baseline.get("format"), BENCH_FORMAT))
+	for key in ["encoder version", "machine", "repeat", "models"]:
+		if baseline.get(key) != results.get(key):
+			print("Note: the {} of the baseline was {}, not {}".format(key, baseline.get(key), results.get(key)))
+	if baseline["suite"].get("seeds") != results["suite"].get("seeds") or baseline["suite"].get("time") != results["suite"].get("time"):
+		print("Note: the seeds or the budget of the suite changed, so the solving times are not compared")
+	if mann_whitney([0]*baseline["repeat"], [1]*results["repeat"]) >= alpha:
+		print("Note: {} and {} measurements are too few for the test to reach p < {}".format(baseline["repeat"], results["repeat"], alpha))
+	print("Comparison with the baseline of revision {}".format(baseline.get("revision")))
+	print("{:<10}{:<16}{:>12}{:>12}{:>10}{:>9}  {}".format("case", "metric", "baseline", "new", "change", "p", "verdict"))
+	regressions = 0
+
+	def report(name, metric, old, new):
+		nonlocal regressions
+		if not old or not new:
+			return
+		a, b = statistics.median(old), statistics.median(new)
+		p = mann_whitney(old, new)
+		change = (b-a)/a if a > 0 else 0
+		verdict = ""
+		if p < alpha and change > tolerance:
+			verdict = "SLOWER"
+			regressions += 1
+		elif p < alpha and change < -tolerance:
+			verdict = "faster"
+		print("{:<10}{:<16}{:>12.4g}{:>12.4g}{:>+9.1f}%{:>9.3f}  {}".format(name, metric, a, b, 100*change, p, verdict))
+
+	report("suite", "core seconds", baseline["core seconds"], results["core seconds"])
+	old_records = {(r["case"], r["subsq"]): r for r in baseline["records"]}
+	same_runs = baseline["suite"].get("seeds") == results["suite"].get("seeds") and baseline["suite"].get("time") == results["suite"].get("time")
+	for record in results["records"]:
+		name = record["case"] + record["subsq"]
+		old = old_records.get((record["case"], record["subsq"]))
+		if old is None:
+			print("{:<10}not in the baseline".format(name))
+			continue
+		for metric in size_metrics:
+			if old[metric] != record[metric]:
+				print("{:<10}{:<16}{:>12}{:>12}{:>10}{:>9}  changed".format(name, metric, str(old[metric])[:10], str(record[metric])[:10], "", ""))
+		for metric in timed_metrics:
+			if metric == "solve seconds" and not same_runs:
+				continue
+			if metric in old and metric in record:
+				report(name, metric, samples(old, metric, baseline["suite"]["time"]), samples(record, metric, results["suite"]["time"]))
+	return regressions
+
+def main():
+	parser = argparse.ArgumentParser(description="Benchmark the pipeline on a fixed suite and compare the results with a baseline")
+	parser.add_argument("--suite", help="JSON file describing the suite (default: the eight open cases with and without -z4 on seeds 1-3)")
+	parser.add_argument("-r", dest="repeat", type=int, default=5, help="number of measurements of every time (default: 5)")
+	parser.add_argument("--models", type=int, default=200, help="number of models decoded and verified in each measurement (default: 200)")
+	parser.add_argument("-t", dest="timeout", type=int, help="budget of each run of Kissat in seconds (default: the time of the suite)")
+	parser.add_argument("--no-solve", dest="solve", action="store_false", help="do not run Kissat")
+	parser.add_argument("-j", dest="jobs", type=int, default=len(os.sched_getaffinity(0)), help="number of solvers run in parallel")
+	parser.add_argument("--solver", default=portfolio.default_solver, help="path to the Kissat binary")
+	parser.add_argument("-o", dest="output", help="write the results (a new baseline) to this file")
+	parser.add_argument("-b", dest="baseline", help="compare the results with this baseline")
+	parser.add_argument("--tolerance", type=float, default=0.1, help="relative change of a median time below which it is not reported (default: 0.1)")
+	parser.add_argument("--alpha", type=float, default=0.05, help="significance level of the Mann-Whitney U test (default: 0.05)")
+	args = parser.parse_args()
+
+	try:
+		suite = load_suite(args.suite)
+		if args.timeout:
+			suite["time"] = args.timeout
+		baseline = None
+		if args.baseline:
+			with open(args.baseline) as f:
+				baseline = json.load(f)
+	except (OSError, ValueError) as e:
+		print("Error: {}".format(e))
+		sys.exit(1)
+
+	print("{:<10}{:>9}{:>10}{:>10}{:>10}{:>12}{:>12}{:>12}".format("case", "vars", "clauses", "encode s", "write s", "decode us", "verify us", "solve s"))
+	results = run_suite(suite, args.repeat, args.models, args.solve, args.solver, args.jobs)
+	if args.output:
+		os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+		with open(args.output + ".tmp", "w") as f:
+			json.dump(results, f, indent=1)
+			f.write("\n")
+		os.replace(args.output + ".tmp", args.output)
+	if baseline is not None:
+		print()
+		try:
+			regressions = compare(baseline, results, args.tolerance, args.alpha)
+		except ValueError as e:
+			print("Error: {}".format(e))
+			sys.exit(1)
+		print("{} regression{}".format(regressions, "" if regressions == 1 else "s"))
+		if regressions:
+			sys.exit(1)
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+
+# Run a campaign of Kissat runs over several cases, subsquare options and seeds on a fixed number of cores
+# The campaign is described by a JSON manifest, for example
+#   {"cases": ["UU", "SX"], "flags": ["", "-z4"], "seeds": 4, "time": 86400}
+# which runs 4 seeds of each of the cases UU, SX, UU-z4 and SX-z4 with a budget of 86400 seconds (Kissat's --time) per run
+# (optionally "options" gives a list of extra Kissat options)
+# Every run writes its log to log/<case><subsq>-<seed>.log as run.sh does, so summary.sh covers the campaign
+# The seeds, starts and results of the runs are appended to a journal (<manifest>.journal by default) that is synced to disk
+# after every record; running the campaign again resumes it, drawing no new seeds and skipping the runs that finished
+# Runs are started longest first, with the expected time of a case taken from the logs indexed by summary.py (the budget if there are none),
+# so that the short runs fill the cores at the end of the campaign
+
+import argparse
+import json
+import os
+import signal
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+
+import encode
+import portfolio
+import summary
+
+# Read the manifest in the file name and check its fields
+def load_manifest(name):
+	with open(name) as f:
+		manifest = json.load(f)
+	for case in manifest["cases"]:
+		if len(case) != 2 or any(t not in encode.transversal_types for t in case):
+			raise ValueError("Invalid pair type {} in {}".format(case, name))
+	manifest.setdefault("flags", [""])
+	for subsq in manifest["flags"]:
+		encode.subsquare_flags(subsq)
+	manifest.setdefault("seeds", 1)
+	manifest.setdefault("time", None)
+	manifest.setdefault("options", [])
+	return manifest
+
+# Append the record to the journal and sync it to disk
+def journal_write(journal, record):
+	journal.write(json.dumps(record) + "\n")
+	journal.flush()
+	os.fsync(journal.fileno())
+
+# Read the journal in the file name
+# Return the planned runs as a dictionary from (case, subsq) to the list of their seeds and the set of (case, subsq, seed) of the finished runs
+def journal_read(name):
+	planned, finished = {}, set()
+	if os.path.exists(name):
+		with open(name) as f:
+			for line in f:
+				# A crash can leave the last record incomplete
+				try:
+					record = json.loads(line)
+				except ValueError:
+					continue
+				run = (record["case"], record["subsq"], record["seed"])
+				if record["event"] == "plan":
+					planned.setdefault(run[:2], []).append(run[2])
+				elif record["event"] == "done":
+					finished.add(run)
+	return planned, finished
+
+# Return the expected running time of each (case, subsq) in the manifest: the median time of its logs in the index of summary.py
+# (runs without an answer count as the budget), or the budget if there are no logs of it
+def expected_times(manifest, log_dir):
+	budget = manifest["time"] or summary.TIMEOUT
+	times = {}
+	db = None
+	if os.path.isdir(log_dir):
+		db = sqlite3.connect(os.path.join(log_dir, "index.sqlite"))
+		summary.update_index(db, log_dir)
+	for case in manifest["cases"]:
+		for subsq in manifest["flags"]:
+			rows = db.execute("select status, process_time from logs where pair_type = ? and subsq = ?", (case, subsq)).fetchall() if db else []
+			runs = [min(t, budget) if status in ("SATISFIABLE", "UNSATISFIABLE") and t is not None else budget for status, t in rows]
+			times[(case, subsq)] = statistics.median(runs) if runs else budget
+	if db:
+		db.close()
+	return times
+
+# Write the instance of the case to the directory dirname unless it is there already, and return its name
+# (the instance is written to a temporary file first, so an interrupted campaign never leaves a partial instance behind)
+def instance(case, subsq, dirname):
+	cnf = os.path.join(dirname, "{}{}.cnf".format(case, subsq))
+	if not os.path.exists(cnf):
+		z4, z2xz2 = encode.subsquare_flags(subsq)
+		with open(cnf + ".tmp", "w") as f:
+			encode.encode(case[0], case[1], z4, z2xz2).write_dimacs(f)
+		os.replace(cnf + ".tmp", cnf)
+	return cnf
+
+def main():
+	parser = argparse.ArgumentParser(description="Run or resume a campaign of Kissat runs described by a manifest")
+	parser.add_argument("manifest", help="JSON manifest of the campaign")
+	parser.add_argument("-j", dest="jobs", type=int, default=len(os.sched_getaffinity(0)), help="number of solvers run in parallel (default: number of available cores)")
+	parser.add_argument("--journal", help="journal of the campaign (default: the manifest name followed by .journal)")
+	parser.add_argument("--log-dir", default="log", help="directory of the logs (default: log)")
+	parser.add_argument("--status", action="store_true", help="only print the progress of the campaign")
+	parser.add_argument("--solver", default=portfolio.default_solver, help="path to the Kissat binary")
+	args = parser.parse_args()
+	manifest = load_manifest(args.manifest)
+	journal_name = args.journal or args.manifest + ".journal"
+
+	# Draw the seeds that are still missing and record them before any run starts
+	planned, finished = journal_read(journal_name)
+	journal = open(journal_name, "a")
+	for case in manifest["cases"]:
+		for subsq in manifest["flags"]:
+			seeds = planned.setdefault((case, subsq), [])
+			for seed in portfolio.random_seeds(max(0, manifest["seeds"] - len(seeds))):
+				journal_write(journal, {"event": "plan", "case": case, "subsq": subsq, "seed": seed})
+				seeds.append(seed)
+	runs = [(case, subsq, seed) for (case, subsq), seeds in planned.items() for seed in seeds[:manifest["seeds"]]
+	        if case in manifest["cases"] and subsq in manifest["flags"]]
+	pending = [run for run in runs if run not in finished]
+	print("{} runs in the campaign: {} finished, {} pending".format(len(runs), len(runs) - len(pending), len(pending)))
+	if args.status or not pending:
+		journal.close()
+		return
+
+	# Longest expected runs first
+	expected = expected_times(manifest, args.log_dir)
+	pending.sort(key=lambda run: -expected[run[:2]])
+	portfolio.ensure_solver(args.solver)
+	os.makedirs(args.log_dir, exist_ok=True)
+	cnf_dir = journal_name + ".cnf"
+	os.makedirs(cnf_dir, exist_ok=True)
+
+	# Stopping the campaign with SIGTERM (e.g., at a shutdown) is handled like an interrupt
+	signal.signal(signal.SIGTERM, signal.default_int_handler)
+	running = {}
+	try:
+		while pending or running:
+			while pending and len(running) < args.jobs:
+				case, subsq, seed = run = pending.pop(0)
+				cnf = instance(case, subsq, cnf_dir)
+				log = open(portfolio.log_name(case, subsq, seed, args.log_dir), "w")
+				command = portfolio.solver_command(args.solver, cnf, seed, manifest["time"], manifest["options"])
+				journal_write(journal, {"event": "start", "case": case, "subsq": subsq, "seed": seed, "time": time.time()})
+				running[run] = (subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT), log, time.time())
+			time.sleep(0.5)
+			for run, (proc, log, start) in list(running.items()):
+				if proc.poll() is None:
+					continue
+				log.close()
+				del running[run]
+				case, subsq, seed = run
+				result = {portfolio.SAT: "SAT", portfolio.UNSAT: "UNSAT"}.get(proc.returncode, "UNKNOWN")
+				record = {"event": "done", "case": case, "subsq": subsq, "seed": seed, "result": result, "seconds": round(time.time()-start, 2)}
+				if result == "SAT":
+					record["verified"] = portfolio.decode_and_verify(portfolio.log_name(case, subsq, seed, args.log_dir), case, subsq)
+				journal_write(journal, record)
+				print("{}{} seed {}: {} after {:.1f} seconds ({} pending, {} running)".format(case, subsq, seed, result, record["seconds"], len(pending), len(running)))
+				sys.stdout.flush()
+	except KeyboardInterrupt:
+		# The interrupted runs have no "done" record, so they are run again when the campaign is resumed
+		for run, (proc, log, start) in running.items():
+			portfolio.stop(proc, log, "stopped by campaign.py")
+			log.close()
+		print("Campaign interrupted; run it again to resume")
+		sys.exit(1)
+	finally:
+		journal.close()
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+
+# Check the DRAT proofs kept by run.sh -d with drat-trim, as a separate stage that does not compete with the solvers
+# Every proof log/<name>.drat.gz of an UNSAT run (with its instance log/<name>.cnf.gz) is checked once and a record of the check
+# (proof size, check time and result) is appended to log/proofs.jsonl; the output of drat-trim is kept in log/<name>.check
+# The checks run on a pool of at most -j processes at the lowest priority (nice 19), and no check is started
+# while the load average is above --max-load, so the checkers only use cores left idle by the solvers
+# The proof and instance are decompressed to a temporary directory (--tmp) since drat-trim reads the proof more than once
+
+import argparse
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+here = os.path.dirname(os.path.abspath(__file__))
+
+# Default location of the drat-trim binary (compiled by compile-drat-trim.sh)
+default_checker = "./drat-trim/drat-trim"
+
+# Compile drat-trim if the checker is the default one and it does not exist yet
+def ensure_checker(checker):
+	if not os.path.exists(checker) and checker == default_checker:
+		subprocess.run([os.path.join(here, "compile-drat-trim.sh")], check=True)
+
+# Return the names of the runs in log_dir with a proof and instance whose log reports UNSAT
+def unsat_proofs(log_dir):
+	names = []
+	for f in sorted(os.listdir(log_dir)):
+		if not f.endswith(".drat.gz"):
+			continue
+		name = f[:-len(".drat.gz")]
+		log = os.path.join(log_dir, name + ".log")
+		if not os.path.exists(os.path.join(log_dir, name + ".cnf.gz")) or not os.path.exists(log):
+			continue
+		with open(log, errors="replace") as g:
+			if any(line.startswith("s UNSATISFIABLE") for line in g):
+				names.append(name)
+	return names
+
+# Return the records of the proofs checked before
+def load_records(name):
+	records = {}
+	if os.path.exists(name):
+		with open(name) as f:
+			for line in f:
+				if line.strip():
+					record = json.loads(line)
+					records[record["run"]] = record
+	return records
+
+# Append a record to the file name (synced to disk so it survives a crash)
+def write_record(name, record):
+	with open(name, "a") as f:
+		f.write(json.dumps(record) + "\n")
+		f.flush()
+		os.fsync(f.fileno())
+
+# Start checking the proof of the run name in log_dir with the decompressed files in the directory tmp
+# The instance and proof are decompressed by gzip and then checked by drat-trim, all at the lowest priority
+# and in a new session, so that the whole process group can be killed
+def start_check(checker, log_dir, name, tmp, timeout):
+	cnf, proof = os.path.join(tmp, "instance.cnf"), os.path.join(tmp, "proof.drat")
+	script = 'gzip -dc "$1" > "$3" && gzip -dc "$2" > "$4" && exec "$0" "$3" "$4" -t "$5"'
+	args = [checker, os.path.join(log_dir, name + ".cnf.gz"), os.path.join(log_dir, name + ".drat.gz"), cnf, proof, str(timeout)]
+	output = open(os.path.join(log_dir, name + ".check"), "w")
+	proc = subprocess.Popen(["sh", "-c", script] + args, stdout=output, stderr=subprocess.STDOUT, preexec_fn=lambda: os.nice(19), start_new_session=True)
+	return proc, output
+
+# Return the result of a check from the output of drat-trim: VERIFIED, NOT VERIFIED, or ERROR if drat-trim did not finish
+def check_result(name):
+	with open(name, errors="replace") as f:
+		for line in f:
+			if line.startswith("s VERIFIED"):
+				return "VERIFIED"
+			if line.startswith("s NOT VERIFIED"):
+				return "NOT VERIFIED"
+	return "ERROR"
+
+def main():
+	parser = argparse.ArgumentParser(description="Check the DRAT proofs of the UNSAT runs kept by run.sh -d")
+	parser.add_argument("-j", dest="jobs", type=int, default=1, help="number of proofs checked in parallel (default: 1)")
+	parser.add_argument("--max-load", type=float, default=len(os.sched_getaffinity(0)), help="start no check while the load average is above this (default: number of available cores)")
+	parser.add_argument("-t", dest="timeout", type=int, default=10**8, help="timeout of drat-trim in seconds")
+	parser.add_argument("--log-dir", default="log", help="directory of the logs and proofs (default: log)")
+	parser.add_argument("--tmp", help="directory for the decompressed proofs (default: the system temporary directory)")
+	parser.add_argument("--status", action="store_true", help="only print the records of the checked proofs")
+	parser.add_argument("--checker", default=default_checker, help="path to the drat-trim binary")
+	args = parser.parse_args()
+
+	records_name = os.path.join(args.log_dir, "proofs.jsonl")
+	records = load_records(records_name)
+	pending = [name for name in unsat_proofs(args.log_dir) if name not in records]
+	print("{} proofs checked, {} pending".format(len(records), len(pending)))
+	for record in records.values():
+		print("{:<30}{:>14} bytes{:>12.1f} s  {}".format(record["run"], record["proof bytes"], record["check seconds"], record["result"]))
+	if args.status or not pending:
+		return
+
+	ensure_checker(args.checker)
+	running = {}
+	try:
+		while pending or running:
+			while pending and len(running) < args.jobs and os.getloadavg()[0] - len(running) < args.max_load:
+				name = pending.pop(0)
+				tmp = tempfile.mkdtemp(dir=args.tmp)
+				proc, output = start_check(args.checker, args.log_dir, name, tmp, args.timeout)
+				running[name] = (proc, output, tmp, time.time())
+			time.sleep(1)
+			for name, (proc, output, tmp, start) in list(running.items()):
+				if proc.poll() is None:
+					continue
+				output.close()
+				del running[name]
+				proof = os.path.join(tmp, "proof.drat")
+				record = {"run": name, "proof bytes": os.path.getsize(os.path.join(args.log_dir, name + ".drat.gz")),
+				          "uncompressed bytes": os.path.getsize(proof) if os.path.exists(proof) else None,
+				          "check seconds": round(time.time()-start, 2), "result": check_result(os.path.join(args.log_dir, name + ".check"))}
+				shutil.rmtree(tmp)
+				write_record(records_name, record)
+				print("{}: {} after {:.1f} seconds ({} pending, {} running)".format(name, record["result"], record["check seconds"], len(pending), len(running)))
+				sys.stdout.flush()
+	except KeyboardInterrupt:
+		# Checks without a record are started again next time
+		for name, (proc, output, tmp, start) in running.items():
+			try:
+				os.killpg(proc.pid, signal.SIGKILL)
+			except ProcessLookupError:
+				pass
+			proc.wait()
+			output.close()
+			shutil.rmtree(tmp)
+		sys.exit(1)
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+
+# Pre-enumerate the colour layouts of the squares up to symmetry and split a case into instances with the colours fixed
+# The colour variables of a square are its dark entries in the first n-m columns and its white entries in the last m columns
+# (the whites in the first columns are given by the symbols alone); in a square of a given type a row of form p_w has darks*(w-1) darks
+# and w whites, each of the first n-m columns has darks darks and each of the last m columns has m whites
+# The layouts of the colour variables satisfying these counts are enumerated once for every square type up to the symmetries of the encoding:
+# * the rows of the same type can be permuted (in P the first row stays in place since it is fixed by the normal form),
+# * the columns m-1, ..., n-m-1 of P and Q (3, 4, 5 for n = 10) can be permuted together with the light symbols m, ..., n-m of
+#   the first row of P, which only matters in P since Q is then left with the row permutations
+# so a layout is stored with the rows of each type sorted, and the layouts of P as the smallest under these column permutations
+# The layouts are kept in the cache directory of encode.py and do not depend on the pair type or the subsquare options
+# An entry of the index of a case fixes the layout of P (--fix P, the default) or of both squares (--fix PQ); its instance
+# replaces the lex ordering of the rows of each type by the ordering of the rows with the same colours, since the fixed colours
+# already break the other row symmetries (so -strongsym, which breaks the column symmetry, cannot be combined with it)
+# A case is UNSAT if and only if all of its entries are, so the entries can be solved in parallel with cube.py --colours
+# For example, ./colour_index.py UU prints the number of layouts and ./colour_index.py -e 5 -o UU-5.cnf UU writes the instance of entry 5
+
+import argparse
+import itertools
+import os
+import sys
+from array import array
+
+import decode
+import encode
+import params
+import verify
+
+DARK = encode.DARK
+WHITE = encode.WHITE
+
+# Version of the stored layouts; bump it when the enumeration or the numbering of the row patterns changes
+INDEX_VERSION = 1
+
+# Set the parameters of the squares from p (see params.py), also in encode.py and verify.py (and so decode.py)
+# The row patterns of a row of form p_w are the pairs (D, W) of its dark columns D and white columns W, numbered in the order of patterns[w]
+def configure(p):
+	global n, m, first_cols, darks, patterns, pattern_ids, light_perms
+	encode.configure(p)
+	verify.configure(p)
+	n = p.n
+	m = p.m
+	first_cols = p.first_cols
+	darks = p.darks
+	patterns = {}
+	for w in range(1, m+1):
+		patterns[w] = [(D, W) for D in itertools.combinations(range(first_cols), p.row_darks(w)) for W in itertools.combinations(range(first_cols, n), w)]
+	pattern_ids = {w: {pattern: i for i, pattern in enumerate(patterns[w])} for w in patterns}
+	# The permutations of the columns m-1, ..., n-m-1 as maps of the row patterns
+	light_perms = []
+	for perm in itertools.permutations(range(m-1, first_cols)):
+		c = list(range(m-1)) + list(perm)
+		light_perms.append({w: [pattern_ids[w][(tuple(sorted(c[j] for j in D)), W)] for D, W in patterns[w]] for w in patterns})
+
+configure(params.default)
+
+# Return the ranges of the rows of the same form in the list of row forms M (which is sorted)
+def groups(M):
+	ranges = []
+	for i in range(n):
+		if i > 0 and M[i] == M[i-1]:
+			ranges[-1][1] = i+1
+		else:
+			ranges.append([i, i+1])
+	return ranges
+
+# Yield the layouts of a square with the list of row forms M as tuples of row pattern numbers, with the rows of each form in increasing order
+# If first_row is set, the first row is that of the normal form of P (one white in the first subsquare column) and stays in place
+# The rows are filled from the last form to the first; the rows of form p_1 have no darks and one white, so they are determined by the
+# whites left over in the last m columns
+def square_layouts(M, first_row):
+	ranges = groups(M)
+	layout = [0]*n
+	dark = [darks]*first_cols
+	white = [m]*n
+	def fill(g, start, low):
+		if g == 0:
+			if any(dark):
+				return
+			cols = [j for j in range(first_cols, n) for _ in range(white[j])]
+			if first_row:
+				if white[first_cols] == 0:
+					return
+				cols.remove(first_cols)
+				cols = [first_cols] + cols
+			for i, j in enumerate(cols):
+				layout[i] = pattern_ids[1][((), (j,))]
+			yield tuple(layout)
+			return
+		begin, end = ranges[g]
+		if start == end:
+			yield from fill(g-1, ranges[g-1][0], 0)
+			return
+		w = M[begin]
+		for p in range(low, len(patterns[w])):
+			D, W = patterns[w][p]
+			if any(dark[j] == 0 for j in D) or any(white[j] == 0 for j in W):
+				continue
+			for j in D: dark[j] -= 1
+			for j in W: white[j] -= 1
+			layout[start] = p
+			yield from fill(g, start+1, p)
+			for j in D: dark[j] += 1
+			for j in W: white[j] += 1
+	if M[0] != 1:
+		raise ValueError("the first row of a square type must have form p_1")
+	last = len(ranges)-1
+	yield from fill(last, ranges[last][0], 0)
+
+# Return the layout of P obtained by permuting the columns m-1, ..., n-m-1 with the map perm of the row patterns (see configure)
+# and sorting the rows of each form again (the first row stays in place)
+def permute_layout(layout, M, perm):
+	new = [perm[M[i]][layout[i]] for i in range(n)]
+	for begin, end in groups(M):
+		begin = max(begin, 1)
+		new[begin:end] = sorted(new[begin:end])
+	return tuple(new)
+
+# Layouts already enumerated or loaded by this process
+layout_cache = {}
+
+# Return the layouts of the square (P or Q) of type t (see read_layouts), kept in memory after the first call
+def load_layouts(square, t, use_disk_cache=True):
+	key = (n, m, square, t)
+	if key not in layout_cache:
+		layout_cache[key] = read_layouts(square, t, use_disk_cache)
+	return layout_cache[key]
+
+# Return the layouts of the square (P or Q) of type t, enumerating them if they are not stored in the cache directory of encode.py yet
+def read_layouts(square, t, use_disk_cache):
+	M = encode.transversal_types[t]
+	name = os.path.join(encode.cache_dir, "colours-n{}-m{}-v{}-{}{}.bin".format(n, m, INDEX_VERSION, square, t))
+	if use_disk_cache and os.path.exists(name):
+		with open(name, "rb") as f:
+			header = array('q')
+			header.fromfile(f, 4)
+			version, order, suborder, count = header
+			if (version, order, suborder) == (INDEX_VERSION, n, m):
+				data = array('H')
+				data.fromfile(f, count*n)
+				return [tuple(data[l*n:(l+1)*n]) for l in range(count)]
+	if square == "P":
+		layouts = [l for l in square_layouts(M, True) if all(permute_layout(l, M, perm) >= l for perm in light_perms)]
+	else:
+		layouts = list(square_layouts(M, False))
+	if use_disk_cache:
+		os.makedirs(encode.cache_dir, exist_ok=True)
+		tmp = "{}.{}.tmp".format(name, os.getpid())
+		with open(tmp, "wb") as f:
+			f.write(array('q', [INDEX_VERSION, n, m, len(layouts)]).tobytes())
+			f.write(array('H', [p for l in layouts for p in l]).tobytes())
+		os.replace(tmp, name)
+	return layouts
+
+# Return the number of entries of the index of the pair type case when the layouts of the squares in fix ("P" or "PQ") are fixed
+def num_entries(case, fix="P", use_disk_cache=True):
+	count = len(load_layouts("P", case[0], use_disk_cache))
+	if fix == "PQ":
+		count *= len(load_layouts("Q", case[1], use_disk_cache))
+	return count
+
+# Return the layouts of P and Q (None if it is not fixed) of the entry of the index of the pair type case
+def entry_layouts(case, entry, fix="P", use_disk_cache=True):
+	P_layouts = load_layouts("P", case[0], use_disk_cache)
+	if fix == "PQ":
+		Q_layouts = load_layouts("Q", case[1], use_disk_cache)
+		return P_layouts[entry // len(Q_layouts)], Q_layouts[entry % len(Q_layouts)]
+	return P_layouts[entry], None
+
+# Return the literals fixing the colour variables of the square A with the list of row forms M to the layout
+def layout_units(A, M, layout):
+	units = []
+	for i in range(n):
+		D, W = patterns[M[i]][layout[i]]
+		units += [A[i][j][DARK] if j in D else -A[i][j][DARK] for j in range(first_cols)]
+		units += [A[i][j][WHITE] if j in W else -A[i][j][WHITE] for j in range(first_cols, n)]
+	return units
+
+# Return an Encoder holding the instance of the entry of the index of the pair type case with the subsquare option subsq
+def encode_entry(case, subsq, entry, fix="P", use_disk_cache=True):
+	z4, z2xz2 = encode.subsquare_flags(subsq)
+	layouts = entry_layouts(case, entry, fix, use_disk_cache)
+	types = [encode.transversal_types[t] for t in case]
+	# Rows are only ordered by their first entry when they have the same form and the same colours
+	keys = [[(M[i], l[i]) for i in range(n)] if l is not None else None for M, l in zip(types, layouts)]
+	e = encode.encode(case[0], case[1], z4, z2xz2, use_disk_cache, lex_keys=keys)
+	with e.block("colour layout"):
+		for A, M, l in zip([encode.Pc, encode.Qc], types, layouts):
+			if l is not None:
+				for lit in layout_units(A, M, l):
+					e.generate_clause([lit])
+	return e
+
+# Sort the rows of each type of the decoded squares LS (in the flat layout of decode.py) by their first entry, in place
+# A solution of an entry of the index is a solution of the case once its rows are in this order
+def sort_rows(LS, case):
+	for p, t in enumerate(case):
+		M = encode.transversal_types[t]
+		rows = sorted(range(n), key=lambda i: (M[i], LS[((p+2)*n+i)*n]))
+		for q in [p, p+2]:
+			block = [LS[(q*n+i)*n:(q*n+i+1)*n] for i in rows]
+			for i in range(n):
+				LS[(q*n+i)*n:(q*n+i+1)*n] = block[i]
+
+# Decode and verify the solution of an entry in the log file as portfolio.decode_and_verify does, after sorting its rows (see sort_rows)
+# Return True if the solution passed verification
+def decode_and_verify(logname, case, subsq):
+	with open(logname) as f:
+		model = next((model for model in decode.read_models(f) if model is not None), None)
+	if model is None:
+		print("No model found in " + logname)
+		return False
+	z4, z2xz2 = encode.subsquare_flags(subsq)
+	LS = decode.decode_model(model)
+	sort_rows(LS, case)
+	result = verify.check_trp(*(decode.square_rows(LS, p) for p in range(4)), case[0], case[1], z4, z2xz2)
+	print(decode.format_text(LS), end="")
+	print(result.report(), end="")
+	return result.passed()
+
+def main():
+	parser = argparse.ArgumentParser(description="Enumerate the colour layouts of a case up to symmetry and write the instances with the colours fixed")
+	parser.add_argument("case", help="pair type (e.g., UU)")
+	parser.add_argument("-z", dest="subsq", help="subsquare consistency option (4, 2xz2 or 4z2xz2)")
+	parser.add_argument("--fix", choices=["P", "PQ"], default="P", help="fix the layout of P only (default) or of both squares in each entry")
+	parser.add_argument("-e", dest="entry", type=int, help="write the instance of this entry of the index")
+	parser.add_argument("-o", dest="output", help="file to write the instance to (compressed if the name ends in .gz, .bz2 or .xz; default: the standard output)")
+	parser.add_argument("--order", help="use the analogue n,m of order n with an m x m subsquare (see params.py)")
+	parser.add_argument("--nocache", action="store_true", help="enumerate the layouts again instead of using the copies in the cache directory")
+	args = parser.parse_args()
+	if args.order:
+		configure(params.from_string(args.order))
+
+	case = args.case
+	if len(case) != 2 or any(t not in encode.transversal_types for t in case):
+		print("Invalid square type. Both square types must be one of {" + ",".join(encode.transversal_types) + "}.")
+		sys.exit(1)
+	subsq = "-z" + args.subsq if args.subsq else ""
+	encode.subsquare_flags(subsq)
+	use_disk_cache = not args.nocache
+
+	if args.entry is None:
+		print("{} layouts of P of type {} (up to row and column permutations)".format(len(load_layouts("P", case[0], use_disk_cache)), case[0]))
+		print("{} layouts of Q of type {} (up to row permutations)".format(len(load_layouts("Q", case[1], use_disk_cache)), case[1]))
+		print("{} entries in the index of {} with the layout of {} fixed".format(num_entries(case, args.fix, use_disk_cache), case, args.fix))
+		return
+
+	count = num_entries(case, args.fix, use_disk_cache)
+	if not 0 <= args.entry < count:
+		print("The index of {} with the layout of {} fixed has entries 0 to {}.".format(case, args.fix, count-1))
+		sys.exit(1)
+	e = encode_entry(case, subsq, args.entry, args.fix, use_disk_cache)
+	if args.output is None:
+		e.write_dimacs(sys.stdout)
+	else:
+		with encode.open_output(args.output) as f:
+			e.write_dimacs(f)
+
+if __name__ == "__main__":
+	main()
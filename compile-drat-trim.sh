@@ -0,0 +1,8 @@
+#!/bin/bash
+if [ ! -d drat-trim ]
+then
+	git clone https://github.com/marijnheule/drat-trim.git
+fi
+cd drat-trim
+make drat-trim
+cd "$OLDPWD"
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+
+# Solve one case by cube-and-conquer
+# The instance is split into cubes (see generate_cubes in encode.py) and the cubes are solved by a pool of Kissat processes
+# Any cube being SAT means the case is SAT, and all cubes being UNSAT means the case is UNSAT
+# The cubes, the progress record and the logs of the cubes are kept in log/cubes/<case><subsq>/ so an interrupted run can be resumed
+# Passing --part i/m solves only the cubes whose index is i modulo m, so one case can be spread over m machines sharing that directory
+# Passing --colours P (or PQ) solves the entries of the colour layout index of colour_index.py instead, kept in log/cubes/<case><subsq>-coloursP/
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import subprocess
+
+import colour_index
+import encode
+import portfolio
+
+# Return the directory holding the cubes and progress of the case
+def work_dir(case, subsq, log_dir="log"):
+	return os.path.join(log_dir, "cubes", case + subsq)
+
+# Return the cubes of the case, generating them (with the splitters in spec) if they were not generated before
+def load_cubes(directory, case, subsq, spec):
+	name = os.path.join(directory, "cubes.icnf")
+	if os.path.exists(name):
+		with open(name) as f:
+			first = f.readline().split()
+			if first[:2] == ["c", "split"] and spec is not None and first[2] != spec:
+				raise ValueError("{} was split with {}, not {}".format(name, first[2], spec))
+			return encode.read_cubes(f)
+	spec = spec or "row,omega,pdark:2"
+	z4, z2xz2 = encode.subsquare_flags(subsq)
+	cubes = encode.generate_cubes(case[0], case[1], z4, z2xz2, spec)
+	os.makedirs(directory, exist_ok=True)
+	with open(name + ".tmp", "w") as f:
+		f.write("c split {}\n".format(spec))
+		encode.write_cubes(f, cubes)
+	os.replace(name + ".tmp", name)
+	return cubes
+
+# Return the results recorded for the cubes of the case as a dictionary from cube index to record
+# Only SAT and UNSAT results are final; cubes that stopped without an answer are solved again
+def load_progress(directory):
+	results = {}
+	name = os.path.join(directory, "progress.jsonl")
+	if os.path.exists(name):
+		with open(name) as f:
+			for line in f:
+				if line.strip():
+					record = json.loads(line)
+					if record["result"] in ("SAT", "UNSAT"):
+						results[record["cube"]] = record
+	return results
+
+# Append a record to the progress file (flushed to disk so it survives a crash)
+def record_progress(directory, record):
+	with open(os.path.join(directory, "progress.jsonl"), "a") as f:
+		f.write(json.dumps(record) + "\n")
+		f.flush()
+		os.fsync(f.fileno())
+
+# Return the combined result of the cubes: SAT if any cube is SAT, UNSAT if all cubes are UNSAT, and None otherwise
+def combine(results, num_cubes):
+	if any(r["result"] == "SAT" for r in results.values()):
+		return "SAT"
+	if len(results) == num_cubes:
+		return "UNSAT"
+	return None
+
+# Write the instance restricted to the cube to the file name
+# num_vars and num_clauses are the numbers of variables and clauses of the instance and body its clauses in DIMACS form (as text)
+def write_cube_instance(name, num_vars, num_clauses, body, cube):
+	with open(name, "w") as f:
+		f.write("p cnf {} {}\n".format(num_vars, num_clauses + len(cube)))
+		f.write(body)
+		f.write("".join("{} 0\n".format(lit) for lit in cube))
+
+# Solve the pending cubes with up to jobs solvers at a time; stop at the first SAT cube
+# If colours is "P" or "PQ" the cubes are the entries of the colour layout index (see colour_index.py) with those layouts fixed
+def conquer(case, subsq, cubes, pending, directory, jobs, solver, seed, timeout, options=[], poll=0.2, colours=None):
+	z4, z2xz2 = encode.subsquare_flags(subsq)
+	with tempfile.TemporaryDirectory() as tmp:
+		if colours is None:
+			e = encode.encode(case[0], case[1], z4, z2xz2)
+			base = os.path.join(tmp, "base.cnf")
+			with open(base, "w") as f:
+				e.write_dimacs(f)
+			with open(base) as f:
+				f.readline()
+				body = f.read()
+
+		pending = list(pending)
+		running = {}
+		sat_cube = None
+		while (pending or running) and sat_cube is None:
+			while pending and len(running) < jobs:
+				i = pending.pop(0)
+				cnf = os.path.join(tmp, "cube-{}.cnf".format(i))
+				if colours is None:
+					write_cube_instance(cnf, e.total_vars, len(e.clauses), body, cubes[i])
+				else:
+					with open(cnf, "w") as f:
+						colour_index.encode_entry(case, subsq, i, colours).write_dimacs(f)
+				log = open(os.path.join(directory, "cube-{}.log".format(i)), "w")
+				command = portfolio.solver_command(solver, cnf, seed, timeout, options)
+				running[i] = (subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT), log, cnf, time.time())
+			time.sleep(poll)
+			for i, (proc, log, cnf, start) in list(running.items()):
+				if proc.poll() is None:
+					continue
+				log.close()
+				os.remove(cnf)
+				del running[i]
+				result = {portfolio.SAT: "SAT", portfolio.UNSAT: "UNSAT"}.get(proc.returncode, "UNKNOWN")
+				record_progress(directory, {"cube": i, "result": result, "seed": seed, "time": round(time.time()-start, 2)})
+				print("cube {}: {}".format(i, result))
+				sys.stdout.flush()
+				if result == "SAT":
+					sat_cube = i
+
+		for i, (proc, log, cnf, start) in running.items():
+			portfolio.stop(proc, log, "stopped by cube.py after cube {} returned SAT".format(sat_cube))
+			log.close()
+	return sat_cube
+
+def main():
+	parser = argparse.ArgumentParser(description="Solve a case by cube-and-conquer")
+	parser.add_argument("case", help="pair type (e.g., UU)")
+	parser.add_argument("-z", dest="subsq", help="subsquare consistency option (4, 2xz2 or 4z2xz2)")
+	parser.add_argument("-j", dest="jobs", type=int, default=len(os.sched_getaffinity(0)), help="number of cubes solved in parallel (default: number of available cores)")
+	parser.add_argument("-t", dest="timeout", type=int, help="stop the solver on a cube after timeout seconds")
+	parser.add_argument("-s", dest="seed", type=int, default=0, help="random seed of the solver")
+	parser.add_argument("--split", help="splitters used to generate the cubes (default: row,omega,pdark:2; see generate_cubes in encode.py)")
+	parser.add_argument("--colours", choices=["P", "PQ"], help="solve the entries of the colour layout index with the layout of P or of both squares fixed instead of cubes (see colour_index.py)")
+	parser.add_argument("--part", default="0/1", help="solve only the cubes whose index is i modulo m (given as i/m)")
+	parser.add_argument("--status", action="store_true", help="only print the progress and combined result")
+	parser.add_argument("--solver", default=portfolio.default_solver, help="path to the Kissat binary")
+	args = parser.parse_args()
+
+	case = args.case
+	if len(case) != 2 or any(t not in encode.transversal_types for t in case):
+		print("Invalid square type. Both square types must be one of {R,S,T,U,V,W,X}.")
+		sys.exit(1)
+	subsq = "-z" + args.subsq if args.subsq else ""
+	part, parts = map(int, args.part.split("/"))
+
+	if args.colours:
+		if args.split:
+			print("The cubes of --split cannot be combined with --colours.")
+			sys.exit(1)
+		directory = work_dir(case, subsq + "-colours" + args.colours)
+		os.makedirs(directory, exist_ok=True)
+		cubes = range(colour_index.num_entries(case, args.colours))
+	else:
+		directory = work_dir(case, subsq)
+		cubes = load_cubes(directory, case, subsq, args.split)
+	results = load_progress(directory)
+	result = combine(results, len(cubes))
+	pending = [i for i in range(len(cubes)) if i not in results and i % parts == part]
+	print("{}{}: {} cubes, {} solved, {} pending in this part".format(case, subsq, len(cubes), len(results), len(pending)))
+
+	if result is None and pending and not args.status:
+		portfolio.ensure_solver(args.solver)
+		sat_cube = conquer(case, subsq, cubes, pending, directory, args.jobs, args.solver, args.seed, args.timeout, colours=args.colours)
+		if sat_cube is not None:
+			verifier = colour_index.decode_and_verify if args.colours else portfolio.decode_and_verify
+			if not verifier(os.path.join(directory, "cube-{}.log".format(sat_cube)), case, subsq):
+				sys.exit(1)
+		results = load_progress(directory)
+		result = combine(results, len(cubes))
+
+	if result == "SAT":
+		print("s SATISFIABLE")
+	elif result == "UNSAT":
+		print("s UNSATISFIABLE")
+	else:
+		print("{} of {} cubes still unsolved".format(len(cubes) - len(results), len(cubes)))
+
+if __name__ == "__main__":
+	main()
@@ -1,24 +1,35 @@
 #!/usr/bin/env python3
 
 # Print the Latin squares encoded by a SAT assignment
-# The SAT assignment should be provided on the standard input
+# The SAT assignment should be provided on the standard input (or in the log files and directories of logs given on the command-line)
+# The input may contain any number of models, each ending with the literal 0 as in the "v" lines of a solver
 
+import json
+import os
 import sys
+from array import array
 
-if "-h" in sys.argv:
-	print("Script to print the Latin squares encoded by a SAT assignment")
-	print("The SAT assignment should be provided on the standard input")
-	quit()
+import params
 
 # List of colours
+LIGHT = 0
 DARK = 2
 WHITE = 3
 
-n = 10 # Order of the squares
 k = 4 # Number of squares (two colour squares, two symbol squares)
 
-# LS stores the four squares where squares are stored as a list of lists
-LS = [[['*' for i in range(n)] for j in range(n)] for l in range(k)]
+# Set the order n of the squares, the order m of the subsquare (the symbols below m are white) and the number first_cols = n-m
+# of columns before the subsquare columns from the parameters p (see params.py)
+def configure(p):
+	global n, m, first_cols
+	n = p.n
+	m = p.m
+	first_cols = p.first_cols
+
+configure(params.default)
+
+# Value of an entry that was not assigned by the model
+UNSET = -1
 
 # Convert a string to an integer if possible; return 0 if not possible
 def to_int(str):
@@ -28,57 +39,170 @@ def to_int(str):
 	except ValueError:
 		return 0
 
-# Print the symbols in the square A
-def print_square(A):
-	for i in range(n):
-		st = ""
-		for j in range(n):
-			st += str(A[i][j])+" "
-		print(st[:-1])
-
-# Print the colours in the square A
-# 'w' denotes white, 'd' denotes dark, and 'l' denotes light
-def print_square_colour(A):
-	for i in range(n):
-		st = ""
-		for j in range(n):
-			if A[i][j] == WHITE:
-				st += "w "
-			elif A[i][j] == DARK:
-				st += "d "
+# Yield the models in the lines of a solver output as lists of literals
+# A model is ended by the literal 0 (or the end of the input); None is yielded for a line reporting that the instance is UNSAT
+def read_models(lines):
+	model = []
+	for line in lines:
+		if line.startswith("v"):
+			tokens = line.split()[1:]
+		elif line[:1].isdigit() or line[:1] == "-":
+			tokens = line.split()
+		else:
+			if "UNSAT" in line:
+				yield None
+			continue
+		# Only literals (and the terminating 0) appear after the "v" so no exception handling is needed in the common case
+		try:
+			lits = list(map(int, tokens))
+		except ValueError:
+			lits = list(map(to_int, tokens))
+		for lit in lits:
+			if lit == 0:
+				if model:
+					yield model
+				model = []
 			else:
-				st += "l "
-		print(st[:-1])
+				model.append(lit)
+	if model:
+		yield model
 
-# Read from the standard input
-for line in sys.stdin.readlines():
-	if "UNSAT" in line:
-		print("UNSAT")
-		quit()
-	# Get the list of literals in the SAT assignment
-	assigns = map(to_int, line.split())
-	for assign in assigns:
+# Yield the files given in names, where directories are searched recursively for files ending in .log
+def input_files(names):
+	for name in names:
+		if os.path.isdir(name):
+			for root, dirs, files in os.walk(name):
+				dirs.sort()
+				for f in sorted(files):
+					if f.endswith(".log"):
+						yield os.path.join(root, f)
+		else:
+			yield name
+
+# Read the variable map written by encode.py -simplify from the text stream f
+# Return a function translating a model of the simplified instance into a model of the original instance
+def read_map(f):
+	m = json.load(f)
+	vars = m["vars"]
+	fixed = m["fixed"]
+	def unmap(model):
+		return [vars[lit-1] if lit > 0 else -vars[-lit-1] for lit in model if abs(lit) <= len(vars)] + fixed
+	return unmap
+
+# Decode a model into a flat array LS of the four squares where LS[(p*n+i)*n+j] is entry (i,j) of square p
+# Squares 0 and 1 hold the colours of P and Q (LIGHT, DARK or WHITE) and squares 2 and 3 hold the symbols of P and Q
+# For n = 10:
+# Variables 0001 to 1000 denote the colours of the first square
+# Variables 1001 to 2000 denote the colours of the second square
+# Variables 2001 to 3000 denote the symbols of the first square
+# Variables 3001 to 4000 denote the symbols of the second square
+def decode_model(model):
+	LS = array('b', [LIGHT])*(2*n*n) + array('b', [UNSET])*(2*n*n)
+	for assign in model:
+		if assign <= 0 or assign > n*n*n*k:
+			continue
 		# Translate literals into Latin square entries
-		vx = (assign-1)%n                  #symbol
-		vp = ((assign-1)//n)%n             #column
-		vj = (((assign-1)//n)//n)%n        #row
-		vi = ((((assign-1)//n)//n)//n)     #square
-		# Variables 0001 to 1000 denote the colours of the first square
-		# Variables 1001 to 2000 denote the colours of the second square
-		# Variables 2001 to 3000 denote the symbols of the first square
-		# Variables 3001 to 4000 denote the symbols of the second square
-		if assign > 0 and assign <= n*n*n*k:
-			assert(LS[vi][vj][vp] == '*')
-			LS[vi][vj][vp] = vx
-			if vi >= 2 and vx in {0,1,2,3} and vp in {0,1,2,3,4,5}:
-				LS[vi-2][vj][vp] = WHITE
-
-# Print squares A and B (colours of squares P and Q)
-for p in range(2):
-	print_square_colour([[LS[p][i][j] for j in range(n)] for i in range(n)])
-	print("")
-
-# Print symbols in squares P and Q
-for p in range(2, k):
-	print_square([[LS[p][i][j] for j in range(n)] for i in range(n)])
-	if p < k-1: print("")
+		cell, vx = divmod(assign-1, n)
+		if cell >= 2*n*n:
+			if LS[cell] != UNSET and LS[cell] != vx:
+				raise ValueError("two symbols {} and {} assigned to entry ({},{}) of square {}".format(LS[cell], vx, (cell//n)%n, cell%n, cell//(n*n)))
+			LS[cell] = vx
+			# Entries of the first n-m columns with a symbol below m are white (the first six columns and symbols below 4 for n = 10)
+			if vx < m and cell%n < first_cols:
+				LS[cell-2*n*n] = WHITE
+		else:
+			LS[cell] = vx
+	return LS
+
+# Return the rows of square p of the decoded squares LS
+def square_rows(LS, p):
+	return [LS[(p*n+i)*n:(p*n+i+1)*n].tolist() for i in range(n)]
+
+# Return the colour letter of a colour: 'w' denotes white, 'd' denotes dark, and 'l' denotes light
+def colour_letter(c):
+	return 'w' if c == WHITE else 'd' if c == DARK else 'l'
+
+# Return the squares in the text layout read by verify.py (two colour squares then two symbol squares separated by blank lines)
+def format_text(LS):
+	blocks = []
+	for p in range(2):
+		blocks.append("\n".join(" ".join(colour_letter(c) for c in row) for row in square_rows(LS, p)))
+	for p in range(2, k):
+		blocks.append("\n".join(" ".join('*' if x == UNSET else str(x) for x in row) for row in square_rows(LS, p)))
+	return "\n\n".join(blocks) + "\n"
+
+# Return the squares as a JSON object
+def format_json(LS, source=None):
+	obj = {"Pc": ["".join(colour_letter(c) for c in row) for row in square_rows(LS, 0)],
+	       "Qc": ["".join(colour_letter(c) for c in row) for row in square_rows(LS, 1)],
+	       "P": square_rows(LS, 2),
+	       "Q": square_rows(LS, 3)}
+	if source is not None:
+		obj["source"] = source
+	return json.dumps(obj)
+
+# Return the squares packed into k*n*n bytes (the entries of LS in order with UNSET stored as 255)
+def format_binary(LS):
+	return LS.tobytes()
+
+def main():
+	if "-order" in sys.argv:
+		i = sys.argv.index("-order")
+		configure(params.from_string(sys.argv[i+1]))
+		del sys.argv[i:i+2]
+
+	if "-h" in sys.argv:
+		print("Script to print the Latin squares encoded by a SAT assignment")
+		print("The SAT assignment should be provided on the standard input, or in the log files or directories of log files given as arguments")
+		print("Pass -f json to print one JSON object per model, or -f binary to write each model as {} packed bytes".format(k*n*n))
+		print("Pass -m mapfile to decode models of an instance simplified by encode.py -simplify mapfile")
+		print("Pass -order n,m to decode models of the analogue of order n with an m x m subsquare (as encoded by encode.py -order n,m)")
+		quit()
+
+	fmt = "text"
+	if "-f" in sys.argv:
+		i = sys.argv.index("-f")
+		fmt = sys.argv[i+1]
+		del sys.argv[i:i+2]
+	if fmt not in ["text", "json", "binary"]:
+		print("Output format must be one of text, json, binary.")
+		quit()
+	unmap = None
+	if "-m" in sys.argv:
+		i = sys.argv.index("-m")
+		with open(sys.argv[i+1]) as f:
+			unmap = read_map(f)
+		del sys.argv[i:i+2]
+	names = sys.argv[1:]
+
+	out = sys.stdout.buffer if fmt == "binary" else sys.stdout
+	first = True
+	for name in input_files(names) if names else [None]:
+		lines = open(name) if name is not None else sys.stdin
+		for model in read_models(lines):
+			if model is None:
+				if fmt == "text":
+					print("UNSAT")
+				elif fmt == "json":
+					print(json.dumps({"result": "UNSAT", "source": name}))
+				continue
+			if unmap is not None:
+				model = unmap(model)
+			try:
+				LS = decode_model(model)
+			except ValueError as err:
+				print("Skipping model{}: {}".format(" in " + name if name else "", err), file=sys.stderr)
+				continue
+			if fmt == "text":
+				if not first: out.write("\n")
+				out.write(format_text(LS))
+			elif fmt == "json":
+				out.write(format_json(LS, name) + "\n")
+			else:
+				out.write(format_binary(LS))
+			first = False
+		if name is not None:
+			lines.close()
+
+if __name__ == "__main__":
+	main()
@@ -1,284 +1,520 @@
 #!/usr/bin/env python3
+
+# Generate the SAT encoding of a coloured transversal representation pair (TRP) of two given square types
+# Run as ./encode.py [-z4|-z2xz2] VX, or import the module and call encode('V', 'X', z4=..., z2xz2=...)
+
+import contextlib
+import functools
+import itertools
+import json
+import os
 import sys
+import time
+from array import array
+
+import params
 
 # Colour constants
 DARK = 2
 WHITE = 3
 
-# Order of the squares
-n = 10
-
-# Transversal type data for the square types
-# The ith entry of each list represents that row i has form p_i (has i whites in the last 4 columns)
-transversal_types = {
-'R': 8*[1] + 2*[4],
-'S': 7*[1] + 3*[3],
-'T': 7*[1] + [2] + [3] + [4],
-'U': 6*[1] + 2*[2] + 2*[3],
-'V': 6*[1] + 3*[2] + [4],
-'W': 5*[1] + 4*[2] + [3],
-'X': 4*[1] + 6*[2]
-}
-
-use_z4 = "-z4" in sys.argv
-if use_z4: sys.argv.remove("-z4")
-use_z2xz2 = "-z2xz2" in sys.argv
-if use_z2xz2: sys.argv.remove("-z2xz2")
-if "-z4z2xz2" in sys.argv: use_z4 = True; use_z2xz2 = True; sys.argv.remove("-z4z2xz2")
-
-# Verify that square names are provided
-if len(sys.argv) <= 1 or len(sys.argv[1]) <= 1:
-	print("Need to provide the names of the squares as first command-line argument: e.g., VX")
-	print("Optionally pass -z4 or -z2xz2 to encode subsquare consistency constraints for Z_4 or Z_2 x Z_2")
-	quit()
-
-# Verify the square types are valid
-P_type = sys.argv[1][0]
-Q_type = sys.argv[1][1]
-
-if not P_type in ['R','S','T','U','V','W','X']:
-	print("Incorrect first square type. Type must be one of {R,S,T,U,V,W,X}.")
-	quit()
-
-if not Q_type in ['R','S','T','U','V','W','X']:
-	print("Incorrect second square type. Type must be one of {R,S,T,U,V,W,X}.")
-	quit()
-
-# Multi-dimensional arrays to hold the variables used in the encoding
-Pc = [[[0 for k in range(n)] for j in range(n)] for i in range(n)] # Colours of square P
-Qc = [[[0 for k in range(n)] for j in range(n)] for i in range(n)] # Colours of square Q
-P = [[[0 for k in range(n)] for j in range(n)] for i in range(n)] # Symbols of square P
-Q = [[[0 for k in range(n)] for j in range(n)] for i in range(n)] # Symbols of square Q
-Z = [[[0 for k in range(n)] for j in range(n)] for i in range(n)] # Witness square ensuring (P,Q) is a transversal representation pair
-
-# Counter for # of variables used in SAT instance
-total_vars = 0
-# List to hold clauses of SAT instance
-clauses = []
-
-# Generate a clause containing the literals in the set X
-def generate_clause(X):
-	clause = ""
-	for x in X:
-		clause += str(x) + " "
-	clauses.append(clause + "0")
-
-# Generate a clause specifying (x1 & ... & xn) -> (y1 | ... | yk) where X = {x1, ..., xn} and Y = {y1, ..., yk}
-def generate_implication_clause(X, Y):
-	if 'F' in X or 'T' in Y:
-		return
-	while 'T' in X: X.remove('T')
-	while 'F' in Y: Y.remove('F')
-	clause = ""
-	for x in X:
-		clause += str(-x) + " "
-	for y in Y:
-		clause += str(y) + " "
-	clauses.append(clause + "0")
-
-# Generate clauses encoding exactly one variable in X is assigned true
-def generate_exactly_one_clauses(X):
-	generate_adder_clauses(X, 1, 1)
-
-# Return the number of leaves under node k in the complete binary tree with N nodes
-def num_leaves_under(N, k):
-	if k >= N: return 0
-	if 2*k+1 >= N: return 1
-	return num_leaves_under(N, 2*k+1) + num_leaves_under(N, 2*k+2)
-
-# Generate clauses encoding that <= s variables and >= l variables in X are assigned true using the totalizer encoding
-def generate_adder_clauses(X, l, s):
-	global total_vars
-
-	n = len(X)
-	# Totalizer auxiliary variables
-	R = [['F' for j in range(n+2)] for i in range(2*n-1)]
-	for i in range(2*n-1):
-		R[i][0] = 'T'
-
-	for i in range(n-1):
-		t = num_leaves_under(2*n-1, i)
-		for j in range(t):
-			total_vars += 1
-			R[i][j+1] = total_vars
-	for i in range(n-1, 2*n-1):
-		R[i][1] = X[i-n+1]
-
-	for i in range(n-1):
-		m = num_leaves_under(2*n-1, i)
-		for sigma in range(m+1):
-			# Solve alpha + beta = sigma
-			for alpha in range(sigma+1):
-				beta = sigma - alpha
-				generate_implication_clause({R[2*i+1][alpha], R[2*i+2][beta]}, {R[i][sigma]})
-				generate_implication_clause({R[i][sigma+1]}, {R[2*i+1][alpha+1], R[2*i+2][beta+1]})
-
-	for i in range(1,l+1):
-		generate_clause({R[0][i]})
-	for i in range(s+1,n+1):
-		generate_clause({-R[0][i]})
-
-# Define colour variables for P
-for i in range(n):
-	for j in range(n):
-		for k in range(n):
-			total_vars += 1
-			Pc[i][j][k] = total_vars
-
-# Define colour variables for Q
-for i in range(n):
-	for j in range(n):
-		for k in range(n):
-			total_vars += 1
-			Qc[i][j][k] = total_vars
-
-# Define symbol variables for P
-for i in range(n):
-	for j in range(n):
-		for k in range(n):
-			total_vars += 1
-			P[i][j][k] = total_vars
-
-# Define symbol variables for Q
-for i in range(n):
-	for j in range(n):
-		for k in range(n):
-			total_vars += 1
-			Q[i][j][k] = total_vars
-
-# Define symbol variables for Z
-for i in range(n):
-	for j in range(n):
-		for k in range(n):
-			total_vars += 1
-			Z[i][j][k] = total_vars
-
-# Constraints ensuring that Q = PZ
-for i in range(n):
-	for j in range(n):
-		for k in range(n):
-			for ip in range(n):
-				generate_implication_clause({P[i][j][k], Q[ip][j][k]}, {Z[ip][j][i]})
-				generate_implication_clause({P[i][j][k], Z[ip][j][i]}, {Q[ip][j][k]})
-				generate_implication_clause({Z[ip][j][i], Q[ip][j][k]}, {P[i][j][k]})
-
-# Z must be a Latin square
-for i in range(n):
-	for j in range(n):
-		generate_exactly_one_clauses([Z[i][k][j] for k in range(n)])
-		generate_exactly_one_clauses([Z[i][j][k] for k in range(n)])
-		generate_exactly_one_clauses([Z[k][i][j] for k in range(n)])
+# Version of the encoding; increase it whenever the clauses of the core formula change so cached cores are rebuilt
+ENCODER_VERSION = 2
+
+# Directory holding the cached core formulas
+cache_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+
+# Flat buffer holding the clauses of a SAT instance
+# The literals of each clause are stored consecutively in lits followed by a terminating 0 (as in DIMACS)
+# and offsets[c] is the position in lits where clause c starts
+class ClauseBuffer:
+	def __init__(self):
+		self.lits = array('i')
+		self.offsets = array('q')
+
+	def __len__(self):
+		return len(self.offsets)
+
+	def add(self, X):
+		self.offsets.append(len(self.lits))
+		self.lits.extend(X)
+		self.lits.append(0)
+
+	# Iterate over the clauses as lists of literals (for passing the instance to an in-process solver)
+	def __iter__(self):
+		for c in range(len(self)):
+			start = self.offsets[c]
+			end = self.offsets[c+1] if c+1 < len(self) else len(self.lits)
+			yield self.lits[start:end-1].tolist()
+
+	# Append all clauses of the buffer B
+	def extend(self, B):
+		base = len(self.lits)
+		self.offsets.extend(o + base for o in B.offsets)
+		self.lits.extend(B.lits)
+
+	# Write the clauses in DIMACS format to the text stream f using one write per chunk of clauses
+	# Every clause is assumed to be nonempty so that the only literals equal to 0 are clause terminators
+	def write_dimacs(self, f, num_vars, chunk_size=4096):
+		f.write("p cnf {} {}\n".format(num_vars, len(self)))
+		for c in range(0, len(self), chunk_size):
+			start = self.offsets[c]
+			end = self.offsets[c+chunk_size] if c+chunk_size < len(self) else len(self.lits)
+			f.write(" ".join(map(str, self.lits[start:end])).replace(" 0 ", " 0\n") + "\n")
+
+	# Write the buffer in binary form to the binary stream f
+	def write_binary(self, f):
+		f.write(array('q', [len(self.lits), len(self.offsets)]).tobytes())
+		self.lits.tofile(f)
+		self.offsets.tofile(f)
+
+	# Read a buffer written by write_binary from the binary stream f
+	@staticmethod
+	def read_binary(f):
+		B = ClauseBuffer()
+		sizes = array('q')
+		sizes.fromfile(f, 2)
+		B.lits.fromfile(f, sizes[0])
+		B.offsets.fromfile(f, sizes[1])
+		return B
+
+# Open the file name for writing text, compressing the output according to the file extension
+def open_output(name):
+	if name.endswith(".gz"):
+		import gzip
+		return gzip.open(name, "wt")
+	if name.endswith(".bz2"):
+		import bz2
+		return bz2.open(name, "wt")
+	if name.endswith(".xz"):
+		import lzma
+		return lzma.open(name, "wt")
+	return open(name, "w")
+
+# Encodings available for exactly-one constraints and for the other cardinality constraints
+eo_encodings = ["totalizer", "pairwise", "sequential", "commander", "cardnet"]
+card_encodings = ["totalizer", "sequential", "cardnet"]
+
+# A SAT instance under construction: a counter for the # of variables used and a buffer of clauses
+# eo and card select the encodings of exactly-one constraints and of the other cardinality constraints
+# If blocks is a list, a record of the constraints generated in each named block (see block) is appended to it
+class Encoder:
+	def __init__(self, total_vars=0, eo="totalizer", card="totalizer", blocks=None):
+		assert eo in eo_encodings, "Unknown exactly-one encoding " + eo
+		assert card in card_encodings, "Unknown cardinality encoding " + card
+		self.total_vars = total_vars
+		self.clauses = ClauseBuffer()
+		self.eo = eo
+		self.card = card
+		self.blocks = blocks
+
+	def write_dimacs(self, f):
+		self.clauses.write_dimacs(f, self.total_vars)
+
+	# Record the variables, clauses and literals added, the histogram of clause lengths and the time taken by the constraints generated in a with block
+	@contextlib.contextmanager
+	def block(self, name):
+		if self.blocks is None:
+			yield
+			return
+		num_vars, num_clauses = self.total_vars, len(self.clauses)
+		start = time.perf_counter()
+		yield
+		elapsed = time.perf_counter() - start
+		offsets = self.clauses.offsets
+		ends = offsets[num_clauses+1:].tolist() + [len(self.clauses.lits)]
+		lengths = {}
+		for c in range(num_clauses, len(self.clauses)):
+			length = ends[c-num_clauses] - offsets[c] - 1
+			lengths[length] = lengths.get(length, 0) + 1
+		self.blocks.append({"block": name, "vars": self.total_vars - num_vars, "clauses": len(self.clauses) - num_clauses,
+		                    "literals": sum(length*count for length, count in lengths.items()),
+		                    "lengths": {str(length): lengths[length] for length in sorted(lengths)}, "seconds": round(elapsed, 4)})
+
+	def new_var(self):
+		self.total_vars += 1
+		return self.total_vars
+
+	# Generate a clause containing the literals in the set X
+	def generate_clause(self, X):
+		self.clauses.add(X)
+
+	# Generate a clause specifying (x1 & ... & xn) -> (y1 | ... | yk) where X = {x1, ..., xn} and Y = {y1, ..., yk}
+	def generate_implication_clause(self, X, Y):
+		if 'F' in X or 'T' in Y:
+			return
+		while 'T' in X: X.remove('T')
+		while 'F' in Y: Y.remove('F')
+		self.clauses.add([-x for x in X] + list(Y))
+
+	# Generate clauses encoding exactly one variable in X is assigned true
+	def generate_exactly_one_clauses(self, X):
+		if self.eo == "totalizer":
+			self.generate_totalizer_clauses(X, 1, 1)
+		elif self.eo == "pairwise":
+			self.generate_pairwise_clauses(X)
+		elif self.eo == "sequential":
+			self.generate_sequential_amo_clauses(X)
+			self.generate_clause(X)
+		elif self.eo == "commander":
+			self.generate_commander_clauses(X)
+		elif self.eo == "cardnet":
+			self.generate_cardnet_clauses(X, 1, 1)
+
+	# Generate clauses encoding that <= s variables and >= l variables in X are assigned true
+	def generate_adder_clauses(self, X, l, s):
+		if self.card == "totalizer":
+			self.generate_totalizer_clauses(X, l, s)
+		elif self.card == "sequential":
+			self.generate_sequential_clauses(X, l, s)
+		elif self.card == "cardnet":
+			self.generate_cardnet_clauses(X, l, s)
+
+	# Generate clauses encoding that <= s variables and >= l variables in X are assigned true using the totalizer encoding
+	def generate_totalizer_clauses(self, X, l, s):
+		n = len(X)
+		leaves = leaves_under(2*n-1)
+		# Totalizer auxiliary variables
+		R = [['F' for j in range(n+2)] for i in range(2*n-1)]
+		for i in range(2*n-1):
+			R[i][0] = 'T'
+
+		for i in range(n-1):
+			t = leaves[i]
+			for j in range(t):
+				self.total_vars += 1
+				R[i][j+1] = self.total_vars
+		for i in range(n-1, 2*n-1):
+			R[i][1] = X[i-n+1]
+
+		for i in range(n-1):
+			m = leaves[i]
+			for sigma in range(m+1):
+				# Solve alpha + beta = sigma
+				for alpha in range(sigma+1):
+					beta = sigma - alpha
+					self.generate_implication_clause({R[2*i+1][alpha], R[2*i+2][beta]}, {R[i][sigma]})
+					self.generate_implication_clause({R[i][sigma+1]}, {R[2*i+1][alpha+1], R[2*i+2][beta+1]})
+
+		for i in range(1,l+1):
+			self.generate_clause({R[0][i]})
+		for i in range(s+1,n+1):
+			self.generate_clause({-R[0][i]})
+
+	# Generate clauses encoding that at most one variable in X is assigned true by excluding every pair
+	def generate_pairwise_amo_clauses(self, X):
+		for a in range(len(X)):
+			for b in range(a+1, len(X)):
+				self.generate_clause([-X[a], -X[b]])
+
+	# Generate clauses encoding exactly one variable in X is assigned true using the pairwise encoding
+	def generate_pairwise_clauses(self, X):
+		self.generate_clause(X)
+		self.generate_pairwise_amo_clauses(X)
+
+	# Generate clauses encoding that at most one variable in X is assigned true using the sequential counter of Sinz
+	# The auxiliary variable S[i] is true if one of X[0], ..., X[i] is true
+	def generate_sequential_amo_clauses(self, X):
+		S = [self.new_var() for i in range(len(X)-1)]
+		for i in range(len(X)):
+			if i < len(X)-1:
+				self.generate_implication_clause({X[i]}, {S[i]})
+			if i > 0:
+				self.generate_implication_clause({X[i]}, {-S[i-1]})
+				if i < len(X)-1:
+					self.generate_implication_clause({S[i-1]}, {S[i]})
+
+	# Generate clauses encoding that <= s variables and >= l variables in X are assigned true using a sequential counter
+	# R[i][j] is true if at least j of X[0], ..., X[i-1] are true; counts are only kept up to the largest value the bounds need
+	# Upward implications are only needed for the upper bound and downward implications only for the lower bound
+	def generate_sequential_clauses(self, X, l, s):
+		n = len(X)
+		w = min(n, max(l, s+1))
+		R = [['T'] + ['F']*w]
+		for i in range(1, n+1):
+			R.append(['T'] + [self.new_var() if j <= i else 'F' for j in range(1, w+1)])
+			for j in range(1, min(i, w)+1):
+				if s < n:
+					self.generate_implication_clause({R[i-1][j]}, {R[i][j]})
+					self.generate_implication_clause({X[i-1], R[i-1][j-1]}, {R[i][j]})
+				if l > 0:
+					self.generate_implication_clause({R[i][j]}, {R[i-1][j], X[i-1]})
+					self.generate_implication_clause({R[i][j]}, {R[i-1][j], R[i-1][j-1]})
+		for j in range(1, l+1):
+			self.generate_clause({R[n][j]})
+		for j in range(s+1, w+1):
+			self.generate_clause({-R[n][j]})
+
+	# Generate clauses encoding exactly one variable in X is assigned true using the commander encoding of Klieber and Kwon
+	# X is split into groups of three; each group gets a commander variable that is true exactly when a variable of the group is true
+	def generate_commander_clauses(self, X, group_size=3):
+		if len(X) <= group_size+1:
+			self.generate_pairwise_clauses(X)
+			return
+		commanders = []
+		for g in range(0, len(X), group_size):
+			group = X[g:g+group_size]
+			if len(group) == 1:
+				commanders.append(group[0])
+				continue
+			c = self.new_var()
+			self.generate_pairwise_amo_clauses(group)
+			self.generate_implication_clause({c}, set(group))
+			for x in group:
+				self.generate_implication_clause({x}, {c})
+			commanders.append(c)
+		self.generate_commander_clauses(commanders, group_size)
+
+	# Return (max(a, b), min(a, b)) for a comparator of a sorting network with the inputs a and b
+	# up and down select the implications from the inputs to the outputs and from the outputs to the inputs
+	def comparator(self, a, b, up, down):
+		if a == 'F': return b, 'F'
+		if b == 'F': return a, 'F'
+		hi, lo = self.new_var(), self.new_var()
+		if up:
+			self.generate_implication_clause({a}, {hi})
+			self.generate_implication_clause({b}, {hi})
+			self.generate_implication_clause({a, b}, {lo})
+		if down:
+			self.generate_implication_clause({hi}, {a, b})
+			self.generate_implication_clause({lo}, {a})
+			self.generate_implication_clause({lo}, {b})
+		return hi, lo
+
+	# Return the outputs of Batcher's odd-even merge of the sorted (decreasing) lists A and B of the same power of two length
+	def merge(self, A, B, up, down):
+		if len(A) == 1:
+			return list(self.comparator(A[0], B[0], up, down))
+		odd = self.merge(A[0::2], B[0::2], up, down)
+		even = self.merge(A[1::2], B[1::2], up, down)
+		C = [odd[0]]
+		for i in range(len(A)-1):
+			C += self.comparator(even[i], odd[i+1], up, down)
+		return C + [even[-1]]
+
+	# Return the outputs of Batcher's odd-even merge sort of the list X whose length is a power of two
+	def sort(self, X, up, down):
+		if len(X) == 1:
+			return X
+		h = len(X)//2
+		return self.merge(self.sort(X[:h], up, down), self.sort(X[h:], up, down), up, down)
+
+	# Generate clauses encoding that <= s variables and >= l variables in X are assigned true using a cardinality network
+	# For the short lists in this encoding the cardinality network is the full odd-even merge sorting network of X
+	# (padded with false inputs to a power of two) whose ith output is true if at least i of the variables in X are true
+	def generate_cardnet_clauses(self, X, l, s):
+		size = 1
+		while size < len(X): size *= 2
+		Y = self.sort(list(X) + ['F']*(size-len(X)), s < len(X), l > 0)
+		for i in range(l):
+			self.generate_clause({Y[i]})
+		for i in range(s, len(X)):
+			self.generate_clause({-Y[i]})
+
+# Return the list of the number of leaves under each node of the complete binary tree with N nodes
+@functools.lru_cache(maxsize=None)
+def leaves_under(N):
+	leaves = [0]*N
+	for k in reversed(range(N)):
+		leaves[k] = 1 if 2*k+1 >= N else leaves[2*k+1] + leaves[2*k+2]
+	return leaves
+
+# Set the parameters of the encoding (see params.py): the order n of the squares, the order m of the subsquare,
+# the number first_cols = n-m of columns before the subsquare columns, the number of darks in each of these columns,
+# the transversal types and the candidate subsquares Ls; then define the variables of the squares
+# The variables are numbered identically for every pair type
+def configure(p):
+	global parameters, n, m, first_cols, darks, transversal_types, Ls, Pc, Qc, P, Q, Z, square_vars
+	parameters = p
+	n = p.n
+	m = p.m
+	first_cols = p.first_cols
+	darks = p.darks
+	transversal_types = p.types
+	Ls = p.subsquares
+
+	# Multi-dimensional arrays to hold the variables used in the encoding
+	Pc = [[[0 for k in range(n)] for j in range(n)] for i in range(n)] # Colours of square P
+	Qc = [[[0 for k in range(n)] for j in range(n)] for i in range(n)] # Colours of square Q
+	P = [[[0 for k in range(n)] for j in range(n)] for i in range(n)] # Symbols of square P
+	Q = [[[0 for k in range(n)] for j in range(n)] for i in range(n)] # Symbols of square Q
+	Z = [[[0 for k in range(n)] for j in range(n)] for i in range(n)] # Witness square ensuring (P,Q) is a transversal representation pair
+
+	# Define the colour variables of P and Q and the symbol variables of P, Q and Z (in this order)
+	total_vars = 0
+	for A in [Pc, Qc, P, Q, Z]:
+		for i in range(n):
+			for j in range(n):
+				for k in range(n):
+					total_vars += 1
+					A[i][j][k] = total_vars
+
+	# Number of variables of the squares (the auxiliary variables are numbered after them)
+	square_vars = total_vars
+
+configure(params.default)
+
+# Generate the constraints ensuring that Q = PZ and Z is a Latin square
+def transversal_constraints(e):
+	# Constraints ensuring that Q = PZ
+	with e.block("Q = PZ"):
+		for i in range(n):
+			for j in range(n):
+				for k in range(n):
+					for ip in range(n):
+						e.generate_implication_clause({P[i][j][k], Q[ip][j][k]}, {Z[ip][j][i]})
+						e.generate_implication_clause({P[i][j][k], Z[ip][j][i]}, {Q[ip][j][k]})
+						e.generate_implication_clause({Z[ip][j][i], Q[ip][j][k]}, {P[i][j][k]})
+
+	# Z must be a Latin square
+	with e.block("Z Latin"):
+		for i in range(n):
+			for j in range(n):
+				e.generate_exactly_one_clauses([Z[i][k][j] for k in range(n)])
+				e.generate_exactly_one_clauses([Z[i][j][k] for k in range(n)])
+				e.generate_exactly_one_clauses([Z[k][i][j] for k in range(n)])
 
 # Generate constraints encoding that every row of the square A has colours matching the list of transversal types in M
-def colour_constraints(M, A):
+# The number of auxiliary variables used does not depend on M
+def colour_constraints(e, M, A):
 	for i in range(n):
-		# Row i is of form p_i, so ensure there are M[i] white entries in the last four columns of row i
-		generate_adder_clauses([A[i][j][WHITE] for j in range(6,n)], M[i], M[i])
-		# Row i is of form p_i, so ensure there are 2*M[i]-2 dark entries in the first six columns of row i
-		generate_adder_clauses([A[i][j][DARK] for j in range(6)], 2*M[i]-2, 2*M[i]-2)
-
-colour_constraints(transversal_types[P_type], Pc)
-colour_constraints(transversal_types[Q_type], Qc)
-
-# Two darks per column in P
-for j in range(6):
-	generate_adder_clauses([Pc[i][j][DARK] for i in range(n)], 2, 2)
-
-# Two darks per column in Q
-for j in range(6):
-	generate_adder_clauses([Qc[i][j][DARK] for i in range(n)], 2, 2)
-
-# Set all extraneous variables to false
-for i in range(n):
-	for j in range(n):
-		for k in range(n):
-			if not k in {WHITE, DARK}:
-				generate_clause({-Pc[i][j][k]})
-				generate_clause({-Qc[i][j][k]})
-	for j in range(6, n):
-		generate_clause({-Pc[i][j][DARK]})
-		generate_clause({-Qc[i][j][DARK]})
-	for j in range(6):
-		generate_clause({-Pc[i][j][WHITE]})
-		generate_clause({-Qc[i][j][WHITE]})
-
-# Symbol to colour correspondence:
-
-for i in range(n):
-	for j in range(6, n):
-		for k in range(4):
-			generate_implication_clause({P[i][j][k]}, {Pc[i][j][WHITE]})
-
-for i in range(n):
-	for j in range(6, n):
-		for k in range(4):
-			generate_implication_clause({Q[i][j][k]}, {Qc[i][j][WHITE]})
-
-# Colour to symbol correspondence:
-
-for i in range(n):
-	for j in range(6, n):
-		generate_implication_clause({Pc[i][j][WHITE]}, {P[i][j][0], P[i][j][1], P[i][j][2], P[i][j][3]})
-	for j in range(6):
-		generate_implication_clause({Pc[i][j][DARK]}, {P[i][j][4], P[i][j][5], P[i][j][6], P[i][j][7], P[i][j][8], P[i][j][9]})
-
-for i in range(n):
-	for j in range(6, n):
-		generate_implication_clause({Qc[i][j][WHITE]}, {Q[i][j][0], Q[i][j][1], Q[i][j][2], Q[i][j][3]})
-	for j in range(6):
-		generate_implication_clause({Qc[i][j][DARK]}, {Q[i][j][4], Q[i][j][5], Q[i][j][6], Q[i][j][7], Q[i][j][8], Q[i][j][9]})
-
-# Fixing symbols in the first row of P (symmetry breaking)
-# First row is one of
-# * [0, 1, 2, 4, 5, 6, 3, 7, 8, 9]
-# * [0, 1, 3, 4, 5, 6, 2, 7, 8, 9]
-# * [0, 2, 3, 4, 5, 6, 1, 7, 8, 9]
-for cl in [P[0][0][0], P[0][3][4], P[0][4][5], P[0][5][6], P[0][7][7], P[0][8][8], P[0][9][9]]:
-	generate_clause([cl])
-generate_implication_clause({P[0][6][3]}, {P[0][1][1]})
-generate_implication_clause({P[0][6][3]}, {P[0][2][2]})
-generate_implication_clause({P[0][6][2]}, {P[0][1][1]})
-generate_implication_clause({P[0][6][2]}, {P[0][2][3]})
-generate_implication_clause({P[0][6][1]}, {P[0][1][2]})
-generate_implication_clause({P[0][6][1]}, {P[0][2][3]})
-generate_implication_clause({P[0][1][2]}, {P[0][2][3]})
-generate_implication_clause({P[0][1][2]}, {P[0][6][1]})
-generate_implication_clause({P[0][2][2]}, {P[0][1][1]})
-generate_implication_clause({P[0][2][2]}, {P[0][6][3]})
-
-# Ensure consistency of the dark entries in P and Q
-for i in range(n):
-	for j in range(6):
-		for l in range(n):
-			for k in range(n):
-				generate_implication_clause({Qc[i][j][DARK], Q[i][j][k], P[l][j][k]}, {Pc[l][j][DARK]})
-				generate_implication_clause({Pc[l][j][DARK], Q[i][j][k], P[l][j][k]}, {Qc[i][j][DARK]})
-
-# Latin square constraints for P and Q
-for i in range(n):
-	for j in range(n):
-		generate_exactly_one_clauses([P[i][j][k] for k in range(n)])
-		generate_exactly_one_clauses([Q[i][j][k] for k in range(n)])
-		generate_exactly_one_clauses([P[i][k][j] for k in range(n)])
-		generate_exactly_one_clauses([Q[i][k][j] for k in range(n)])
-		generate_exactly_one_clauses([P[k][j][i] for k in range(n)])
-		generate_exactly_one_clauses([Q[k][j][i] for k in range(n)])
+		# Row i is of form p_i, so ensure there are M[i] white entries in the last m columns of row i
+		e.generate_adder_clauses([A[i][j][WHITE] for j in range(first_cols,n)], M[i], M[i])
+		# Row i is of form p_i, so ensure there are darks*(M[i]-1) dark entries (2*M[i]-2 for n = 10) in the first n-m columns of row i
+		e.generate_adder_clauses([A[i][j][DARK] for j in range(first_cols)], darks*(M[i]-1), darks*(M[i]-1))
+
+# Generate the constraints on the colours and symbols of P and Q that do not depend on the square types
+def square_constraints(e):
+	# Two darks (n-2m darks in general) per column in P
+	with e.block("darks per column of P"):
+		for j in range(first_cols):
+			e.generate_adder_clauses([Pc[i][j][DARK] for i in range(n)], darks, darks)
+
+	# Two darks (n-2m darks in general) per column in Q
+	with e.block("darks per column of Q"):
+		for j in range(first_cols):
+			e.generate_adder_clauses([Qc[i][j][DARK] for i in range(n)], darks, darks)
+
+	# Set all extraneous variables to false
+	with e.block("extraneous units"):
+		for i in range(n):
+			for j in range(n):
+				for k in range(n):
+					if not k in {WHITE, DARK}:
+						e.generate_clause({-Pc[i][j][k]})
+						e.generate_clause({-Qc[i][j][k]})
+			for j in range(first_cols, n):
+				e.generate_clause({-Pc[i][j][DARK]})
+				e.generate_clause({-Qc[i][j][DARK]})
+			for j in range(first_cols):
+				e.generate_clause({-Pc[i][j][WHITE]})
+				e.generate_clause({-Qc[i][j][WHITE]})
+
+	# Symbol to colour correspondence:
+	with e.block("symbol to colour"):
+		for i in range(n):
+			for j in range(first_cols, n):
+				for k in range(m):
+					e.generate_implication_clause({P[i][j][k]}, {Pc[i][j][WHITE]})
+
+		for i in range(n):
+			for j in range(first_cols, n):
+				for k in range(m):
+					e.generate_implication_clause({Q[i][j][k]}, {Qc[i][j][WHITE]})
+
+	# Colour to symbol correspondence:
+	with e.block("colour to symbol"):
+		for i in range(n):
+			for j in range(first_cols, n):
+				e.generate_implication_clause({Pc[i][j][WHITE]}, {P[i][j][k] for k in range(m)})
+			for j in range(first_cols):
+				e.generate_implication_clause({Pc[i][j][DARK]}, {P[i][j][k] for k in range(m, n)})
+
+		for i in range(n):
+			for j in range(first_cols, n):
+				e.generate_implication_clause({Qc[i][j][WHITE]}, {Q[i][j][k] for k in range(m)})
+			for j in range(first_cols):
+				e.generate_implication_clause({Qc[i][j][DARK]}, {Q[i][j][k] for k in range(m, n)})
+
+	# Fixing symbols in the first row of P (symmetry breaking)
+	# For n = 10 the first row is one of
+	# * [0, 1, 2, 4, 5, 6, 3, 7, 8, 9]
+	# * [0, 1, 3, 4, 5, 6, 2, 7, 8, 9]
+	# * [0, 2, 3, 4, 5, 6, 1, 7, 8, 9]
+	# (see Parameters.first_rows); the entries shared by all of them are fixed by unit clauses
+	# and the entries of each row are implied by its white symbol x in the first subsquare column
+	with e.block("first row"):
+		rows = parameters.first_rows()
+		for j in [0] + list(range(m-1, first_cols)) + list(range(first_cols+1, n)):
+			e.generate_clause([P[0][j][rows[0][j]]])
+		for row in rows:
+			for j in range(1, m-1):
+				e.generate_implication_clause({P[0][first_cols][row[first_cols]]}, {P[0][j][row[j]]})
+		# A white symbol in the first m-1 columns that appears there in only one of the rows implies the rest of that row
+		for j in range(1, m-1):
+			for row in rows:
+				if [r[j] for r in rows].count(row[j]) == 1:
+					for jp in list(range(1, m-1)) + [first_cols]:
+						if jp != j:
+							e.generate_implication_clause({P[0][j][row[j]]}, {P[0][jp][row[jp]]})
+
+	# Ensure consistency of the dark entries in P and Q
+	with e.block("dark consistency"):
+		for i in range(n):
+			for j in range(first_cols):
+				for l in range(n):
+					for k in range(n):
+						e.generate_implication_clause({Qc[i][j][DARK], Q[i][j][k], P[l][j][k]}, {Pc[l][j][DARK]})
+						e.generate_implication_clause({Pc[l][j][DARK], Q[i][j][k], P[l][j][k]}, {Qc[i][j][DARK]})
+
+	# Latin square constraints for P and Q
+	with e.block("P/Q Latin"):
+		for i in range(n):
+			for j in range(n):
+				e.generate_exactly_one_clauses([P[i][j][k] for k in range(n)])
+				e.generate_exactly_one_clauses([Q[i][j][k] for k in range(n)])
+				e.generate_exactly_one_clauses([P[i][k][j] for k in range(n)])
+				e.generate_exactly_one_clauses([Q[i][k][j] for k in range(n)])
+				e.generate_exactly_one_clauses([P[k][j][i] for k in range(n)])
+				e.generate_exactly_one_clauses([Q[k][j][i] for k in range(n)])
 
 # Order rows of P and Q of the same type lexicographically
 
 # Generate symbol ordering constraints within a block of the same colour
 # K is the list of transversal types for the square H
-def lex_order(K, H):
+def lex_order(e, K, H):
 	for i in range(n-1):
 		if K[i] == K[i+1]:
 			for k in range(n):
 				for l in range(k):
-					generate_implication_clause({H[i][0][k]}, {-H[i+1][0][l]})
-
-lex_order(transversal_types[P_type], P)
-lex_order(transversal_types[Q_type], Q)
-
-# Constraints that the squares in the TRP are consistent with one of the following 4x4 Latin subsquares in the bottom-right of the third square L:
+					e.generate_implication_clause({H[i][0][k]}, {-H[i+1][0][l]})
+
+# Order the light symbols of the first row of P (optional symmetry breaking)
+# The symbols m, ..., n-m (4, 5, 6 for n = 10) are the lights of the first row of P in the columns m-1, ..., n-m-1;
+# relabelling them and permuting these columns in the same way maps a TRP in normal form to another one
+# (after sorting the rows of P and Q again; the witness Z is determined by P and Q and follows along)
+# So it can be required that each symbol s of them has a key no larger than the key of s+1, where the key of s
+# is the type of the row of Q with s in the first column followed by the type of the row of P with s in the first column
+# K and M are the lists of transversal types of P and Q
+def light_symbol_order(e, K, M):
+	lights = range(m, n-m+1)
+	for s in lights:
+		for sp in lights:
+			if sp <= s:
+				continue
+			for i in range(n):
+				for ip in range(n):
+					if M[i] > M[ip]:
+						e.generate_clause({-Q[i][0][s], -Q[ip][0][sp]})
+					# Rows of the same type are sorted by their first entry (see lex_order), so then s is in an earlier row than sp
+					elif M[i] == M[ip] and i < ip:
+						for r in range(n):
+							for rp in range(n):
+								if K[r] > K[rp]:
+									e.generate_clause({-Q[i][0][s], -Q[ip][0][sp], -P[r][0][s], -P[rp][0][sp]})
+
+# Constraints that the squares in the TRP are consistent with one of the candidate m x m Latin subsquares Ls in the bottom-right of the third square L
+# For n = 10 these are the following 4x4 Latin subsquares (see params.py):
 # Omega_1 (The Cayley table of Z_4)
 # [ 0 1 2 3 ]
 # [ 1 2 3 0 ]
@@ -289,36 +525,440 @@ lex_order(transversal_types[Q_type], Q)
 # [ 1 0 3 2 ]
 # [ 2 3 0 1 ]
 # [ 3 2 1 0 ]
-Ls = [[[0,1,2,3],[1,2,3,0],[2,3,0,1],[3,0,1,2]],
-      [[0,1,2,3],[1,0,3,2],[2,3,0,1],[3,2,1,0]]]
-# Two new variables omega[0] and omega[1] to encode which order 4 subsquare appears in L
-omega = [total_vars+1, total_vars+2]
-total_vars += 2
-for subsqtype in range(2):
-	L = Ls[subsqtype]
-	for i in range(n):
-		for j in range(6,n):
-			for jp in range(j+1,n):
-				for l in range(4):
-					k = L[l][j-6]
-					kp = L[l][jp-6]
-					# The omega variable can be removed from the antecedent if the (l,j-6) and (l,jp-6) entries in both order 4 subsquares are the same
-					if Ls[0][l][j-6] == Ls[1][l][j-6] and Ls[0][l][jp-6] == Ls[1][l][jp-6]:
-						generate_implication_clause({P[i][j][k]}, {-P[i][jp][kp]})
-						generate_implication_clause({Q[i][j][k]}, {-Q[i][jp][kp]})
-					else:
-						generate_implication_clause({omega[subsqtype], P[i][j][k]}, {-P[i][jp][kp]})
-						generate_implication_clause({omega[subsqtype], Q[i][j][k]}, {-Q[i][jp][kp]})
-# (P,Q) must be compatible with the 4x4 subsquare Omega_1 or Omega_2
-generate_clause({omega[0], omega[1]})
-# If -z4 option enabled, (P,Q) must be compatible with Omega_1
-if use_z4:
-	generate_clause({omega[0]})
-# If -z2xz2 option enabled, (P,Q) must be compatible with Omega_2
-if use_z2xz2:
-	generate_clause({omega[1]})
-
-# Output SAT instance in DIMACS format
-print("p cnf {} {}".format(total_vars, len(clauses)))
-for clause in clauses:
-	print(clause)
+
+# Generate the subsquare consistency constraints conditioned on the variables omega[0], omega[1], ... (one for each candidate subsquare)
+def subsquare_constraints(e, omega):
+	for subsqtype in range(len(Ls)):
+		L = Ls[subsqtype]
+		for i in range(n):
+			for j in range(first_cols,n):
+				for jp in range(j+1,n):
+					for l in range(m):
+						k = L[l][j-first_cols]
+						kp = L[l][jp-first_cols]
+						# The omega variable can be removed from the antecedent if the (l,j-first_cols) and (l,jp-first_cols) entries in all candidate subsquares are the same
+						if all(L2[l][j-first_cols] == L[l][j-first_cols] and L2[l][jp-first_cols] == L[l][jp-first_cols] for L2 in Ls):
+							e.generate_implication_clause({P[i][j][k]}, {-P[i][jp][kp]})
+							e.generate_implication_clause({Q[i][j][k]}, {-Q[i][jp][kp]})
+						else:
+							e.generate_implication_clause({omega[subsqtype], P[i][j][k]}, {-P[i][jp][kp]})
+							e.generate_implication_clause({omega[subsqtype], Q[i][j][k]}, {-Q[i][jp][kp]})
+
+# The part of the encoding shared by all pair types and subsquare options
+# The clauses of the encoding are (in order) head, the colour constraints of P and Q, middle, the lex ordering of P and Q, tail, and the omega clauses
+# colour_vars is the number of variables before the colour constraints and middle_vars is the number of variables before middle
+# eo and card are the encodings of the exactly-one and cardinality constraints used
+class Core:
+	def __init__(self, head, colour_vars, middle, middle_vars, tail, omega, total_vars, eo="totalizer", card="totalizer"):
+		self.eo = eo
+		self.card = card
+		self.head = head
+		self.colour_vars = colour_vars
+		self.middle = middle
+		self.middle_vars = middle_vars
+		self.tail = tail
+		self.omega = omega
+		self.total_vars = total_vars
+
+	# Write the core in binary form to the file name (atomically, so concurrent sweeps never read a partial file)
+	def save(self, name):
+		tmp = "{}.{}.tmp".format(name, os.getpid())
+		with open(tmp, "wb") as f:
+			f.write(array('q', [ENCODER_VERSION, n, m, self.colour_vars, self.middle_vars, self.total_vars, len(self.omega)] + self.omega).tobytes())
+			for B in [self.head, self.middle, self.tail]:
+				B.write_binary(f)
+		os.replace(tmp, name)
+
+	# Read a core written by save from the file name; return None if it was written by another encoder version
+	@staticmethod
+	def load(name, eo="totalizer", card="totalizer"):
+		with open(name, "rb") as f:
+			header = array('q')
+			header.fromfile(f, 7)
+			version, order, suborder, colour_vars, middle_vars, total_vars, num_omega = header
+			if version != ENCODER_VERSION or order != n or suborder != m:
+				return None
+			omega = array('q')
+			omega.fromfile(f, num_omega)
+			head = ClauseBuffer.read_binary(f)
+			middle = ClauseBuffer.read_binary(f)
+			tail = ClauseBuffer.read_binary(f)
+		return Core(head, colour_vars, middle, middle_vars, tail, list(omega), total_vars, eo, card)
+
+# Generate the core formula from scratch
+# If blocks is a list, records of the constraint blocks are appended to it (see Encoder.block)
+def generate_core(eo="totalizer", card="totalizer", blocks=None):
+	head = Encoder(square_vars, eo, card, blocks)
+	transversal_constraints(head)
+	# The colour constraints are type-specific, so they are skipped here
+	# Room is left for the largest number of auxiliary variables they use for any square type
+	# (with the totalizer encoding this number does not depend on the square type)
+	colour_vars = 0
+	for t in transversal_types:
+		colour = Encoder(head.total_vars, eo, card)
+		colour_constraints(colour, transversal_types[t], Pc)
+		colour_vars = max(colour_vars, colour.total_vars - head.total_vars)
+	middle = Encoder(head.total_vars + 2*colour_vars, eo, card, blocks)
+	square_constraints(middle)
+	# New variables omega[0], omega[1], ... to encode which candidate subsquare appears in L (omega[0] and omega[1] for n = 10)
+	omega = [middle.total_vars+1+s for s in range(len(Ls))]
+	tail = Encoder(middle.total_vars+len(Ls), eo, card, blocks)
+	with tail.block("subsquare consistency"):
+		subsquare_constraints(tail, omega)
+	return Core(head.clauses, head.total_vars, middle.clauses, head.total_vars + 2*colour_vars, tail.clauses, omega, tail.total_vars, eo, card)
+
+# Cores already generated or loaded by this process
+core_cache = {}
+
+# Return the core formula, loading it from the on-disk cache or generating (and caching) it if necessary
+def get_core(use_disk_cache=True, eo="totalizer", card="totalizer"):
+	key = (n, m, ENCODER_VERSION, eo, card)
+	if key in core_cache:
+		return core_cache[key]
+	core = None
+	name = os.path.join(cache_dir, "core-n{}-m{}-v{}-{}-{}.bin".format(n, m, ENCODER_VERSION, eo, card))
+	if use_disk_cache and os.path.exists(name):
+		core = Core.load(name, eo, card)
+	if core is None:
+		core = generate_core(eo, card)
+		if use_disk_cache:
+			os.makedirs(cache_dir, exist_ok=True)
+			core.save(name)
+	core_cache[key] = core
+	return core
+
+# Return an Encoder holding the SAT instance for the pair type P_type Q_type
+# If z4 (z2xz2) is set the TRP must be compatible with the subsquare Omega_1 (Omega_2)
+# eo and card select the encodings of the exactly-one and cardinality constraints (see eo_encodings and card_encodings)
+# If blocks is a list, the core is generated afresh and a record of every block of constraints is appended to blocks (see Encoder.block)
+# If strong_symmetry is set the light symbols of the first row of P are also ordered (see light_symbol_order)
+# If lex_keys is a pair of lists of row keys, consecutive rows of P (Q) are only ordered when their keys are equal (None keeps the types;
+# see colour_index.py, which breaks the other row symmetries by fixing the colours)
+def encode(P_type, Q_type, z4=False, z2xz2=False, use_disk_cache=True, eo="totalizer", card="totalizer", blocks=None, strong_symmetry=False, lex_keys=(None, None)):
+	core = get_core(use_disk_cache, eo, card) if blocks is None else generate_core(eo, card, blocks)
+	e = Encoder(core.colour_vars, eo, card, blocks)
+	e.clauses.extend(core.head)
+	with e.block("colour types of P"):
+		colour_constraints(e, transversal_types[P_type], Pc)
+	with e.block("colour types of Q"):
+		colour_constraints(e, transversal_types[Q_type], Qc)
+	assert e.total_vars <= core.middle_vars
+	e.total_vars = core.middle_vars
+	e.clauses.extend(core.middle)
+	with e.block("lex order of P"):
+		lex_order(e, lex_keys[0] or transversal_types[P_type], P)
+	with e.block("lex order of Q"):
+		lex_order(e, lex_keys[1] or transversal_types[Q_type], Q)
+	e.clauses.extend(core.tail)
+	e.total_vars = core.total_vars
+	omega = core.omega
+	with e.block("subsquare choice"):
+		# (P,Q) must be compatible with one of the candidate subsquares (the 4x4 subsquare Omega_1 or Omega_2 for n = 10)
+		e.generate_clause(set(omega))
+		# If -z4 option enabled, (P,Q) must be compatible with Omega_1 (the first candidate subsquare)
+		if z4:
+			e.generate_clause({omega[0]})
+		# If -z2xz2 option enabled, (P,Q) must be compatible with Omega_2 (the second candidate subsquare)
+		if z2xz2:
+			e.generate_clause({omega[1]})
+	if strong_symmetry:
+		with e.block("light symbol order"):
+			light_symbol_order(e, transversal_types[P_type], transversal_types[Q_type])
+	return e
+
+# Simplify the instance of the encoder e by unit propagation
+# Clauses satisfied by the literals fixed by unit clauses are removed, false literals are removed from the other clauses,
+# and the variables still occurring in the clauses are renumbered consecutively (in their original order)
+# Return the simplified encoder and a Simplification holding the variable map and the fixed literals
+def simplify(e):
+	value = bytearray(e.total_vars+1) # 0 for unassigned, 1 for true, 2 for false
+	clauses = list(e.clauses)
+	units = [c[0] for c in clauses if len(c) == 1]
+	fixed = []
+	conflict = False
+	while units and not conflict:
+		for lit in units:
+			v = 1 if lit > 0 else 2
+			if value[abs(lit)] == 0:
+				value[abs(lit)] = v
+				fixed.append(lit)
+			elif value[abs(lit)] != v:
+				conflict = True
+		units = []
+		remaining = []
+		for c in clauses:
+			kept = []
+			for lit in c:
+				v = value[abs(lit)]
+				if v == 0:
+					kept.append(lit)
+				elif (v == 1) == (lit > 0):
+					break
+			else:
+				if len(kept) == 1:
+					units.append(kept[0])
+				elif kept:
+					remaining.append(kept)
+				else:
+					conflict = True
+		clauses = remaining
+	if conflict:
+		clauses = []
+	s = Simplification(fixed, sorted({abs(lit) for c in clauses for lit in c}), e.total_vars)
+	simplified = Encoder(len(s.vars), e.eo, e.card)
+	for c in clauses:
+		simplified.clauses.add([s.new_var[lit] if lit > 0 else -s.new_var[-lit] for lit in c])
+	if conflict:
+		# The instance is UNSAT: it is replaced by the contradictory clauses x and -x
+		simplified.total_vars = 1
+		simplified.generate_clause([1])
+		simplified.generate_clause([-1])
+	return simplified, s
+
+# The variable map of a simplified instance: vars[v-1] is the original variable of the variable v of the simplified instance,
+# and fixed lists the (original) literals fixed by the simplification; num_vars is the number of variables of the original instance
+class Simplification:
+	def __init__(self, fixed, vars, num_vars):
+		self.fixed = fixed
+		self.vars = vars
+		self.num_vars = num_vars
+		self.new_var = {v: i+1 for i, v in enumerate(vars)}
+
+	# Write the map as JSON to the text stream f (read by decode.py -m to translate models back to the original variables)
+	def write(self, f):
+		json.dump({"num_vars": self.num_vars, "vars": self.vars, "fixed": self.fixed}, f)
+		f.write("\n")
+
+	# Translate a cube over the original variables into one over the simplified variables
+	# Return None if the cube contradicts a fixed literal; literals of variables that no longer occur are dropped
+	def translate_cube(self, cube):
+		fixed = set(self.fixed)
+		if any(-lit in fixed for lit in cube):
+			return None
+		return [self.new_var[lit] if lit > 0 else -self.new_var[-lit] for lit in cube if abs(lit) in self.new_var]
+
+# Write the records of the constraint blocks as a table to the text stream f
+def write_block_table(f, blocks):
+	f.write("{:<24}{:>8}{:>10}{:>10}{:>10}  {}\n".format("block", "vars", "clauses", "literals", "seconds", "clause lengths"))
+	for b in blocks:
+		f.write("{:<24}{:>8}{:>10}{:>10}{:>10.3f}  {}\n".format(b["block"], b["vars"], b["clauses"], b["literals"], b["seconds"],
+		        " ".join("{}:{}".format(length, count) for length, count in b["lengths"].items())))
+	f.write("{:<24}{:>8}{:>10}{:>10}{:>10.3f}\n".format("total", sum(b["vars"] for b in blocks), sum(b["clauses"] for b in blocks),
+	        sum(b["literals"] for b in blocks), sum(b["seconds"] for b in blocks)))
+
+# Cube-and-conquer splitting
+# Each splitter below returns a list of cubes (partial assignments given as lists of literals) such that every
+# solution of the encoding satisfies one of the cubes; cubes that contradict the encoding outright are left out
+
+# The allowed first rows of P, distinguished by the symbol in the first subsquare column (column 6 for n = 10)
+def split_first_row():
+	return [[P[0][first_cols][x]] for x in reversed(range(1, m))]
+
+# The choice of the candidate subsquares: every nonempty set of them, smallest first
+# (for n = 10: Omega_1 only, Omega_2 only, or both)
+def split_omega(omega, z4, z2xz2):
+	cubes = []
+	for size in range(1, len(omega)+1):
+		for S in itertools.combinations(range(len(omega)), size):
+			cubes.append([omega[s] if s in S else -omega[s] for s in range(len(omega))])
+	return [c for c in cubes if (not z4 or omega[0] in c) and (not z2xz2 or omega[1] in c)]
+
+# The symbols in the first column of the rows start, ..., start+depth-1 of the square H with transversal types K
+# The symbols in rows of the same type must increase (see lex_order) and rows before start are assumed to be fixed to the symbols fixed
+def split_first_column(H, K, start, depth, fixed=[]):
+	cubes = []
+	def extend(i, used, cube):
+		if i == start+depth:
+			cubes.append(cube)
+			return
+		for k in range(n):
+			if k in used:
+				continue
+			if i > 0 and K[i-1] == K[i] and (i-1 >= start or i-1 < len(fixed)):
+				prev = used[-1] if i-1 >= start else fixed[i-1]
+				if k < prev:
+					continue
+			extend(i+1, used + [k], cube + [H[i][0][k]])
+	extend(start, list(fixed), [])
+	return cubes
+
+# The positions of the dark entries in the first c columns of the square A with transversal types M
+# Row i contains darks*(M[i]-1) dark entries and every one of the first n-m columns contains darks dark entries
+# (2*M[i]-2 and two in each of the first six columns for n = 10)
+def split_darks(A, M, c):
+	cubes = []
+	def extend(j, budget, cube):
+		if sum(budget) > darks*(first_cols-j) or max(budget) > first_cols-j:
+			return
+		if j == c:
+			cubes.append(cube)
+			return
+		rows = [i for i in range(n) if budget[i] > 0]
+		for chosen in itertools.combinations(rows, darks):
+			newbudget = list(budget)
+			for i in chosen:
+				newbudget[i] -= 1
+			extend(j+1, newbudget, cube + [A[i][j][DARK] for i in chosen])
+	extend(0, [darks*(w-1) for w in M], [])
+	return cubes
+
+# Return the cubes of the product of the splitters given in spec, a comma-separated list of
+# row (first row of P), omega (subsquare choice), pcol:d and qcol:d (symbols in the first column of the first d free rows of P and Q),
+# and pdark:c and qdark:c (dark entries in the first c columns of P and Q)
+def generate_cubes(P_type, Q_type, z4=False, z2xz2=False, spec="row,omega,pdark:2", eo="totalizer", card="totalizer"):
+	omega = get_core(True, eo, card).omega
+	cubes = [[]]
+	for splitter in spec.split(","):
+		name, _, arg = splitter.partition(":")
+		if name == "row":
+			split = split_first_row()
+		elif name == "omega":
+			split = split_omega(omega, z4, z2xz2)
+		elif name == "pcol":
+			# The symbol in the first column of the first row of P is fixed to 0
+			split = split_first_column(P, transversal_types[P_type], 1, int(arg), [0])
+		elif name == "qcol":
+			split = split_first_column(Q, transversal_types[Q_type], 0, int(arg))
+		elif name == "pdark":
+			split = split_darks(Pc, transversal_types[P_type], int(arg))
+		elif name == "qdark":
+			split = split_darks(Qc, transversal_types[Q_type], int(arg))
+		else:
+			raise ValueError("Unknown splitter " + splitter)
+		cubes = [c + s for c in cubes for s in split]
+	return cubes
+
+# Write the cubes to the text stream f in the iCNF cube format (one line "a lit ... lit 0" per cube)
+def write_cubes(f, cubes):
+	for cube in cubes:
+		f.write("a " + " ".join(map(str, cube)) + " 0\n")
+
+# Read cubes written by write_cubes from the text stream f
+def read_cubes(f):
+	return [[int(x) for x in line.split()[1:-1]] for line in f if line.startswith("a ")]
+
+# Return the pair (z4, z2xz2) of flags set by a subsquare option string "", "-z4", "-z2xz2" or "-z4z2xz2"
+def subsquare_flags(subsq):
+	assert subsq in ["", "-z4", "-z2xz2", "-z4z2xz2"], "Unknown subsquare option " + subsq
+	return "z4" in subsq, "z2xz2" in subsq
+
+def main():
+	use_z4 = "-z4" in sys.argv
+	if use_z4: sys.argv.remove("-z4")
+	use_z2xz2 = "-z2xz2" in sys.argv
+	if use_z2xz2: sys.argv.remove("-z2xz2")
+	if "-z4z2xz2" in sys.argv: use_z4 = True; use_z2xz2 = True; sys.argv.remove("-z4z2xz2")
+	# Optionally encode a smaller (or larger) analogue of the problem of order n with an m x m subsquare (see params.py)
+	if "-order" in sys.argv:
+		i = sys.argv.index("-order")
+		configure(params.from_string(sys.argv[i+1]))
+		del sys.argv[i:i+2]
+	# Optional output file (compressed if it ends in .gz, .bz2 or .xz); the default is the standard output
+	output = None
+	if "-o" in sys.argv:
+		i = sys.argv.index("-o")
+		output = sys.argv[i+1]
+		del sys.argv[i:i+2]
+	# Optionally write cubes splitting the instance to a file, using the splitters in split_spec
+	cube_file = None
+	split_spec = "row,omega,pdark:2"
+	if "-cubes" in sys.argv:
+		i = sys.argv.index("-cubes")
+		cube_file = sys.argv[i+1]
+		del sys.argv[i:i+2]
+	if "-split" in sys.argv:
+		i = sys.argv.index("-split")
+		split_spec = sys.argv[i+1]
+		del sys.argv[i:i+2]
+	# Optionally select the encodings of the exactly-one and cardinality constraints
+	eo = "totalizer"
+	card = "totalizer"
+	if "-eo" in sys.argv:
+		i = sys.argv.index("-eo")
+		eo = sys.argv[i+1]
+		del sys.argv[i:i+2]
+	if "-card" in sys.argv:
+		i = sys.argv.index("-card")
+		card = sys.argv[i+1]
+		del sys.argv[i:i+2]
+	if eo not in eo_encodings or card not in card_encodings:
+		print("Exactly-one encoding must be one of {}; cardinality encoding must be one of {}.".format(", ".join(eo_encodings), ", ".join(card_encodings)))
+		quit()
+	# Optionally do not read or write the on-disk cache of the core formula
+	use_disk_cache = "-nocache" not in sys.argv
+	if not use_disk_cache: sys.argv.remove("-nocache")
+	# Optionally add the stronger symmetry breaking of light_symbol_order
+	strong_symmetry = "-strongsym" in sys.argv
+	if strong_symmetry: sys.argv.remove("-strongsym")
+	# Optionally report the variables, clauses, literals, clause lengths and time of each block of constraints
+	# as a table on the standard error (-stats -) or as JSON in a file (-stats file)
+	stats_file = None
+	if "-stats" in sys.argv:
+		i = sys.argv.index("-stats")
+		stats_file = sys.argv[i+1]
+		del sys.argv[i:i+2]
+	# Optionally simplify the instance by unit propagation and write the variable map needed by decode.py to a file
+	map_file = None
+	if "-simplify" in sys.argv:
+		i = sys.argv.index("-simplify")
+		map_file = sys.argv[i+1]
+		del sys.argv[i:i+2]
+
+	# Verify that square names are provided
+	if len(sys.argv) <= 1 or len(sys.argv[1]) <= 1:
+		print("Need to provide the names of the squares as first command-line argument: e.g., VX")
+		print("Optionally pass -z4 or -z2xz2 to encode subsquare consistency constraints for Z_4 or Z_2 x Z_2")
+		print("Optionally pass -o file to write the instance to a file (compressed if the name ends in .gz, .bz2 or .xz)")
+		print("Optionally pass -cubes file to also write cubes for cube-and-conquer, split according to -split spec (default: row,omega,pdark:2)")
+		print("Optionally pass -eo encoding and -card encoding to select the encodings of exactly-one and cardinality constraints (default: totalizer)")
+		print("Optionally pass -nocache to regenerate the type-independent core instead of using the copy cached in " + cache_dir)
+		print("Optionally pass -stats file to write statistics of each block of constraints as JSON to a file (or as a table to the standard error with -stats -)")
+		print("Optionally pass -simplify mapfile to simplify the instance by unit propagation and write the variable map (for decode.py -m mapfile) to mapfile")
+		print("Optionally pass -order n,m to encode the analogue of order n with an m x m subsquare (default: 10,4)")
+		print("Optionally pass -strongsym to also break the symmetry of the light symbols in the first row of P")
+		quit()
+
+	# Verify the square types are valid
+	P_type = sys.argv[1][0]
+	Q_type = sys.argv[1][1]
+
+	if not P_type in transversal_types:
+		print("Incorrect first square type. Type must be one of {" + ",".join(transversal_types) + "}.")
+		quit()
+
+	if not Q_type in transversal_types:
+		print("Incorrect second square type. Type must be one of {" + ",".join(transversal_types) + "}.")
+		quit()
+
+	if use_z2xz2 and len(Ls) < 2:
+		print("There is no second candidate subsquare for -z2xz2 when m = {}.".format(m))
+		quit()
+
+	blocks = [] if stats_file is not None else None
+	e = encode(P_type, Q_type, use_z4, use_z2xz2, use_disk_cache, eo, card, blocks, strong_symmetry)
+	if stats_file == "-":
+		write_block_table(sys.stderr, blocks)
+	elif stats_file is not None:
+		with open(stats_file, "w") as f:
+			json.dump({"pair type": P_type + Q_type, "z4": use_z4, "z2xz2": use_z2xz2, "eo": eo, "card": card,
+			           "vars": e.total_vars, "clauses": len(e.clauses), "blocks": blocks}, f, indent=1)
+	cubes = generate_cubes(P_type, Q_type, use_z4, use_z2xz2, split_spec, eo, card) if cube_file is not None else None
+	if map_file is not None:
+		e, s = simplify(e)
+		with open(map_file, "w") as f:
+			s.write(f)
+		if cubes is not None:
+			cubes = [c for c in map(s.translate_cube, cubes) if c is not None]
+	if cube_file is not None:
+		with open(cube_file, "w") as f:
+			write_cubes(f, cubes)
+
+	# Output SAT instance in DIMACS format
+	if output is None:
+		e.write_dimacs(sys.stdout)
+	else:
+		with open_output(output) as f:
+			e.write_dimacs(f)
+
+if __name__ == "__main__":
+	main()
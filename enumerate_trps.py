@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+
+# Enumerate the coloured TRPs of a case up to equivalence
+# The instance of encode.py is solved incrementally (with a solver of the python-sat package) and after each model
+# the symbol assignment of P and Q is blocked so that the solver continues from its current state
+# Each model is reduced to a canonical form under the symmetries that the normal form of encode.py does not remove:
+# * swapping P and Q when both squares have the same type,
+# * permuting the first six columns,
+# * permuting the last four columns together with the symbols 0-3 in a way that maps the rows of both subsquares Omega_1 and Omega_2 to rows,
+# * permuting the symbols 4-9,
+# followed by choosing the first row of P and sorting the rows of each type by their first entry as encode.py does
+# (for the analogue of order n with an m x m subsquare given by -order n,m: the first n-m columns, the last m columns with the symbols
+# below m, and the symbols m to n-1)
+# By default every copy of a model in normal form is blocked (so the solver never returns the same TRP twice); with --block model
+# only the model itself is blocked and the copies found later are dropped as duplicates
+# The canonical TRPs are printed as they are found (in the text layout of decode.py, or as JSON lines with -f json)
+# and the progress is printed on the standard error
+
+import argparse
+import itertools
+import sys
+import time
+from array import array
+
+import decode
+import encode
+import params
+import verify
+
+# Pairs (a, b) of a permutation a of the last m columns (column n-m+c is moved to column n-m+a[c]) and a permutation b
+# of the symbols below m such that all candidate subsquares (Omega_1 and Omega_2 for n = 10) are mapped to themselves up to the order of their rows
+def subsquare_autotopisms():
+	row_sets = [{frozenset((c, L[l][c]) for c in range(m)) for l in range(m)} for L in encode.Ls]
+	auts = []
+	for a in itertools.permutations(range(m)):
+		for b in itertools.permutations(range(m)):
+			if all({frozenset((a[c], b[s]) for c, s in row) for row in rows} == rows for rows in row_sets):
+				auts.append((a, b))
+	return auts
+
+# Set the order n, the subsquare order m and the number first_cols = n-m of columns before the subsquare columns
+# from the parameters p (see params.py), also in encode.py, decode.py and verify.py
+def configure(p):
+	global n, m, first_cols, autotopisms
+	encode.configure(p)
+	decode.configure(p)
+	verify.configure(p)
+	n = p.n
+	m = p.m
+	first_cols = p.first_cols
+	autotopisms = subsquare_autotopisms()
+
+configure(params.default)
+
+# Return the number of white entries (symbols below m) in the last m columns of a row, which determines its transversal type
+def row_type(row):
+	return sum(1 for x in row[first_cols:] if x < m)
+
+# Return the square A with column jn taken from column src[jn] and every symbol s replaced by sym[s],
+# with its rows sorted by type and then by first entry; D (the dark entries of A) is rearranged in the same way
+def transform(A, D, src, sym):
+	rows = sorted((([sym[A[i][j]] for j in src], [D[i][j] for j in src]) for i in range(n)), key=lambda r: (row_type(r[0]), r[0][0]))
+	return tuple(tuple(r[0]) for r in rows), tuple(tuple(r[1]) for r in rows)
+
+# Yield the copies (P, Q, Pd, Qd) in normal form of the TRP (P, Q) with dark entries Pd and Qd
+# The first row of P in normal form is one of the three rows fixed in square_constraints of encode.py
+def normal_copies(P, Q, Pd, Qd, same_type):
+	for A, B, Ad, Bd in [(P, Q, Pd, Qd)] + ([(Q, P, Qd, Pd)] if same_type else []):
+		for r in range(n):
+			if row_type(A[r]) != 1:
+				continue
+			row = A[r]
+			c0 = next(c for c in range(m) if row[first_cols+c] < m)
+			for a, b in autotopisms:
+				# The white entry in the last m columns of the first row must be moved to column n-m and be nonzero (column 6 and 1, 2 or 3 for n = 10)
+				if a[c0] != 0 or b[row[first_cols+c0]] == 0:
+					continue
+				src = [0]*n
+				for c in range(m):
+					src[first_cols+a[c]] = first_cols+c
+				# The other m-1 white entries are moved in increasing order to columns 0 to m-2 (0-2 for n = 10)
+				whites = sorted((j for j in range(first_cols) if row[j] < m), key=lambda j: b[row[j]])
+				sym = list(b) + [0]*(n-m)
+				for order in itertools.permutations(j for j in range(first_cols) if row[j] >= m):
+					src[0:m-1] = whites
+					src[m-1:first_cols] = order
+					# The symbols m to n-1 are relabelled as in the first rows of params.Parameters.first_rows
+					# (for n = 10 the first row is 4, 5, 6 in columns 3-5 and 7, 8, 9 in columns 7-9)
+					for t in range(first_cols-m+1):
+						sym[row[src[m-1+t]]] = m+t
+					for t in range(m-1):
+						sym[row[src[first_cols+1+t]]] = n-m+1+t
+					An, And = transform(A, Ad, src, sym)
+					Bn, Bnd = transform(B, Bd, src, sym)
+					yield An, Bn, And, Bnd
+
+# Return the clause blocking the symbols of the squares P and Q
+def blocking_clause(P, Q):
+	return [-encode.P[i][j][P[i][j]] for i in range(n) for j in range(n)] + [-encode.Q[i][j][Q[i][j]] for i in range(n) for j in range(n)]
+
+# Return the squares P and Q and their dark entries Pd and Qd in the model of the solver
+def squares(model):
+	LS = decode.decode_model(model)
+	def square(p):
+		return tuple(tuple(row) for row in decode.square_rows(LS, p))
+	Pd = tuple(tuple(c == decode.DARK for c in row) for row in square(0))
+	Qd = tuple(tuple(c == decode.DARK for c in row) for row in square(1))
+	return square(2), square(3), Pd, Qd
+
+# Return the decoded squares (in the flat layout of decode.py) of the TRP (P, Q) with dark entries Pd and Qd
+def flat_squares(P, Q, Pd, Qd):
+	LS = array('b')
+	for A, D in [(P, Pd), (Q, Qd)]:
+		LS.extend(decode.WHITE if A[i][j] < m else decode.DARK if D[i][j] else decode.LIGHT for i in range(n) for j in range(n))
+	for A in [P, Q]:
+		LS.extend(A[i][j] for i in range(n) for j in range(n))
+	return LS
+
+# Yield the canonical forms (P, Q, Pd, Qd) of the inequivalent coloured TRPs of the pair type case with the subsquare option subsq
+# The instance is solved with the python-sat solver solver_name; block is "orbit" or "model" (see above) and strong_symmetry adds
+# the stronger symmetry breaking of encode.py -strongsym; the progress is printed on the text stream log unless it is None
+# With check every model of the solver is verified with verify.verify_model and a ValueError is raised if one fails
+def enumerate_trps(case, subsq="", solver_name="cadical195", block="orbit", strong_symmetry=False, log=None, check=False):
+	from pysat.solvers import Solver
+	z4, z2xz2 = encode.subsquare_flags(subsq)
+	start = time.time()
+	e = encode.encode(case[0], case[1], z4, z2xz2, strong_symmetry=strong_symmetry)
+	solver = Solver(name=solver_name, bootstrap_with=e.clauses)
+	if log is not None:
+		print("{}{}: {} variables, {} clauses encoded in {:.1f} seconds".format(case, subsq, e.total_vars, len(e.clauses), time.time()-start), file=log)
+
+	seen = set()
+	models = 0
+	try:
+		while solver.solve():
+			models += 1
+			model = solver.get_model()
+			if check:
+				result = verify.verify_model(model, case[0], case[1], z4, z2xz2, strong_symmetry)
+				if not result.passed():
+					raise ValueError("model {} failed verification: {}".format(models, ", ".join(result.failed())))
+			P, Q, Pd, Qd = squares(model)
+			copies = {(A, B): (Ad, Bd) for A, B, Ad, Bd in normal_copies(P, Q, Pd, Qd, case[0] == case[1])}
+			canonical = min(copies)
+			if block == "orbit":
+				for A, B in copies:
+					solver.add_clause(blocking_clause(A, B))
+			else:
+				solver.add_clause(blocking_clause(P, Q))
+			if canonical in seen:
+				if log is not None:
+					print("model {}: duplicate of a TRP found before".format(models), file=log)
+				continue
+			seen.add(canonical)
+			if log is not None:
+				print("model {}: TRP {} ({} copies in normal form) after {:.1f} seconds".format(models, len(seen), len(copies), time.time()-start), file=log)
+			yield canonical + copies[canonical]
+		if log is not None:
+			print("{}{}: {} inequivalent TRPs in {} models ({:.1f} seconds)".format(case, subsq, len(seen), models, time.time()-start), file=log)
+	finally:
+		solver.delete()
+
+def main():
+	parser = argparse.ArgumentParser(description="Enumerate the coloured TRPs of a case up to equivalence")
+	parser.add_argument("case", help="pair type (e.g., UU)")
+	parser.add_argument("-z", dest="subsq", help="subsquare consistency option (4, 2xz2 or 4z2xz2)")
+	parser.add_argument("-f", dest="format", choices=["text", "json"], default="text", help="output format of the canonical TRPs (as in decode.py)")
+	parser.add_argument("-l", dest="limit", type=int, help="stop after finding limit inequivalent TRPs")
+	parser.add_argument("--block", choices=["orbit", "model"], default="orbit", help="block every copy of a model in normal form (default) or only the model")
+	parser.add_argument("--strongsym", action="store_true", help="add the stronger symmetry breaking of encode.py -strongsym")
+	parser.add_argument("--order", help="enumerate the analogue n,m of order n with an m x m subsquare (see params.py)")
+	parser.add_argument("--solver", default="cadical195", help="name of the python-sat solver to use")
+	parser.add_argument("--verify", action="store_true", help="verify every model of the solver (see verify.py)")
+	args = parser.parse_args()
+	if args.order:
+		configure(params.from_string(args.order))
+
+	case = args.case
+	if len(case) != 2 or any(t not in encode.transversal_types for t in case):
+		print("Invalid square type. Both square types must be one of {" + ",".join(encode.transversal_types) + "}.")
+		sys.exit(1)
+	subsq = "-z" + args.subsq if args.subsq else ""
+	encode.subsquare_flags(subsq)
+	try:
+		import pysat.solvers
+	except ImportError:
+		print("Enumeration requires the python-sat package (pip install python-sat)")
+		sys.exit(1)
+
+	found = 0
+	for P, Q, Pd, Qd in enumerate_trps(case, subsq, args.solver, args.block, args.strongsym, sys.stderr, args.verify):
+		found += 1
+		LS = flat_squares(P, Q, Pd, Qd)
+		if args.format == "text":
+			sys.stdout.write(("\n" if found > 1 else "") + decode.format_text(LS))
+		else:
+			sys.stdout.write(decode.format_json(LS, "{}{}#{}".format(case, subsq, found)) + "\n")
+		sys.stdout.flush()
+		if found == args.limit:
+			print("{}{}: stopped at the limit of {} inequivalent TRPs".format(case, subsq, found), file=sys.stderr)
+			break
+
+if __name__ == "__main__":
+	main()
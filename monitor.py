@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+
+# Follow the Kissat runs writing to the logs in log/ and write rolling metrics of every run to a JSON file and a Prometheus text file
+# The logs are read incrementally; the metrics come from the progress lines that Kissat prints from time to time
+# ("c <type> <seconds> <MB> <level> ... <conflicts> ..." under a header naming the columns) and are grouped by case, subsquare option and seed
+# as in the log names of run.sh, portfolio.py and campaign.py
+# A run is active while some process has its log open; for runs started by run.sh this is tee, and the solver is found in its process group
+# With --straggler-ratio r an active run whose conflict rate (over the last --window seconds of solver time) is below r times
+# the median rate of the other active runs of the same case is flagged as a straggler once it has run --min-seconds, and with --stop
+# the straggler is terminated (Kissat prints its statistics) and its log is marked as unknown as portfolio.py does
+# For example, ./monitor.py --straggler-ratio 0.3 --min-seconds 3600 --stop writes log/telemetry.json and log/telemetry.prom every 30 seconds
+
+import argparse
+import collections
+import json
+import os
+import signal
+import statistics
+import sys
+import time
+
+import summary
+
+# Columns of the progress lines of Kissat, used until the header of a log names them
+default_columns = ["seconds", "MB", "level", "switched", "reductions", "restarts", "rate", "conflicts", "redundant", "trail",
+                   "glue", "irredundant", "variables", "remaining"]
+
+# Metrics of a run written to the Prometheus text file, with the column of the progress lines (or attribute of the run) they come from
+prometheus_metrics = [
+	("kissat_seconds", "seconds", "Process time of the solver in seconds"),
+	("kissat_conflicts", "conflicts", "Number of conflicts"),
+	("kissat_conflict_rate", "conflict_rate", "Conflicts per second over the rolling window"),
+	("kissat_restarts", "restarts", "Number of restarts"),
+	("kissat_memory_mb", "MB", "Memory used by the solver in MB"),
+	("kissat_remaining_variables_percent", "remaining", "Percentage of the variables that are still active"),
+	("kissat_active", "active", "1 if a process is still writing the log"),
+	("kissat_straggler", "straggler", "1 if the run was flagged as a straggler"),
+]
+
+# The state of one log: the position read up to, the columns of its progress lines, the (seconds, conflicts) samples
+# in the rolling window and the latest values of the columns
+class Run:
+	def __init__(self, name, case, subsq, seed):
+		self.name = name
+		self.case = case
+		self.subsq = subsq
+		self.seed = seed
+		self.offset = 0
+		self.partial = ""
+		self.columns = default_columns
+		self.header = []
+		self.samples = collections.deque()
+		self.latest = {}
+		self.status = None
+		self.active = False
+		self.straggler = False
+		self.stopped = False
+
+	# Read the lines appended to the log since the last call
+	def update(self, window):
+		with open(self.name, "rb") as f:
+			f.seek(self.offset)
+			data = f.read()
+		self.offset += len(data)
+		lines = (self.partial + data.decode(errors="replace")).split("\n")
+		self.partial = lines.pop()
+		for line in lines:
+			self.parse_line(line, window)
+
+	# Parse a line of the log, keeping the samples of the last window seconds of solver time
+	def parse_line(self, line, window):
+		if line.startswith("s "):
+			self.status = line.split()[1]
+			return
+		tokens = line.split()
+		if len(tokens) < 2 or tokens[0] != "c":
+			return
+		# The header is printed on consecutive lines, each naming every third column
+		if all(t.isalpha() for t in tokens[1:]) and ("seconds" in tokens or self.header):
+			self.header.append(tokens[1:])
+			if len(self.header) == 3:
+				h = self.header
+				self.columns = [h[r][c] for c in range(max(map(len, h))) for r in range(3) if c < len(h[r])]
+				self.header = []
+			return
+		self.header = []
+		if len(tokens[1]) != 1 or tokens[1].isdigit() or len(tokens) != len(self.columns)+2:
+			return
+		try:
+			values = [float(t.rstrip("%")) for t in tokens[2:]]
+		except ValueError:
+			return
+		self.latest = dict(zip(self.columns, values))
+		if "seconds" in self.latest and "conflicts" in self.latest:
+			self.samples.append((self.latest["seconds"], self.latest["conflicts"]))
+			while len(self.samples) > 2 and self.samples[1][0] <= self.samples[-1][0] - window:
+				self.samples.popleft()
+
+	# Return the conflicts per second over the samples in the rolling window (or since the start if there is only one sample)
+	def conflict_rate(self):
+		if not self.samples:
+			return None
+		(s0, c0), (s1, c1) = self.samples[0], self.samples[-1]
+		if len(self.samples) == 1 or s1 <= s0:
+			return c1/s1 if s1 > 0 else None
+		return (c1-c0)/(s1-s0)
+
+	def record(self):
+		record = {"log": self.name, "case": self.case, "subsq": self.subsq, "seed": self.seed, "status": self.status,
+		          "active": self.active, "straggler": self.straggler, "stopped": self.stopped, "conflict_rate": self.conflict_rate()}
+		for column in ["seconds", "MB", "conflicts", "restarts", "remaining"]:
+			record[column] = self.latest.get(column)
+		return record
+
+# Return a dictionary mapping the real path of every file in the directory log_dir held open by a process to the set of those processes
+def open_logs(log_dir):
+	log_dir = os.path.realpath(log_dir)
+	holders = collections.defaultdict(set)
+	for pid in os.listdir("/proc"):
+		if not pid.isdigit():
+			continue
+		try:
+			for fd in os.listdir("/proc/{}/fd".format(pid)):
+				target = os.readlink("/proc/{}/fd/{}".format(pid, fd))
+				if os.path.dirname(target) == log_dir:
+					holders[target].add(int(pid))
+		except OSError:
+			continue
+	return holders
+
+# Return the name of the program run by the process pid (None if it has exited)
+def process_name(pid):
+	try:
+		with open("/proc/{}/comm".format(pid)) as f:
+			return f.read().strip()
+	except OSError:
+		return None
+
+# Return the pipe (as named by /proc) open as the file descriptor fd of the process pid, or None if it is not a pipe
+def pipe_of(pid, fd):
+	try:
+		target = os.readlink("/proc/{}/fd/{}".format(pid, fd))
+	except OSError:
+		return None
+	return target if target.startswith("pipe:") else None
+
+# Return whether the process pid holds the file name open
+def holds_open(pid, name):
+	name = os.path.realpath(name)
+	try:
+		return any(os.readlink("/proc/{}/fd/{}".format(pid, fd)) == name for fd in os.listdir("/proc/{}/fd".format(pid)))
+	except OSError:
+		return False
+
+# Return the process of the solver writing to a log held open by the processes pids and the process writing the log,
+# or (None, None) if there is no unique solver: the solver is one of them if it writes the log itself (portfolio.py, campaign.py),
+# and otherwise the solver whose standard output is the pipe read by one of them (the pipeline of run.sh, where tee writes the log)
+def solver_process(pids, solver_name):
+	for pid in pids:
+		if process_name(pid) == solver_name:
+			return pid, pid
+	readers = {pipe_of(pid, 0): pid for pid in pids if pipe_of(pid, 0) is not None}
+	matches = []
+	for pid in os.listdir("/proc"):
+		if pid.isdigit() and process_name(int(pid)) == solver_name:
+			pipe = pipe_of(int(pid), 1)
+			if pipe in readers:
+				matches.append((int(pid), readers[pipe]))
+	return matches[0] if len(matches) == 1 else (None, None)
+
+# Terminate the solver process pid, wait for it and for the process writer writing the log to exit, and mark the log of the run as unknown
+# (tee in run.sh does not open the log for appending, so the marker is only written once tee has closed the log)
+def stop_run(run, pid, writer):
+	try:
+		os.kill(pid, signal.SIGTERM)
+		for _ in range(300):
+			time.sleep(0.1)
+			os.kill(pid, 0)
+		os.kill(pid, signal.SIGKILL)
+	except ProcessLookupError:
+		pass
+	for _ in range(300):
+		if not holds_open(writer, run.name):
+			break
+		time.sleep(0.1)
+	else:
+		print("{}: process {} still has the log open, so it is not marked as unknown".format(run.name, writer))
+		run.stopped = True
+		return
+	with open(run.name, "a") as f:
+		f.write("c stopped by monitor.py as a straggler\ns UNKNOWN\n")
+	run.stopped = True
+
+# Flag the active runs whose conflict rate is below ratio times the median rate of the other active runs of the same case
+# once they have run min_seconds; return the flagged runs
+def find_stragglers(runs, ratio, min_seconds, min_siblings):
+	flagged = []
+	by_case = collections.defaultdict(list)
+	for run in runs:
+		if run.active and run.conflict_rate() is not None:
+			by_case[(run.case, run.subsq)].append(run)
+	for group in by_case.values():
+		for run in group:
+			others = [r.conflict_rate() for r in group if r is not run]
+			if len(others) < min_siblings or run.latest.get("seconds", 0) < min_seconds:
+				continue
+			if run.conflict_rate() < ratio*statistics.median(others):
+				flagged.append(run)
+	return flagged
+
+# Write the text to the file name atomically
+def write_file(name, text):
+	tmp = "{}.{}.tmp".format(name, os.getpid())
+	with open(tmp, "w") as f:
+		f.write(text)
+	os.replace(tmp, name)
+
+# Return the metrics of the runs in the Prometheus text format
+def prometheus_text(runs):
+	lines = []
+	for metric, key, description in prometheus_metrics:
+		lines.append("# HELP {} {}".format(metric, description))
+		lines.append("# TYPE {} gauge".format(metric))
+		for run in runs:
+			value = run.record()[key]
+			if value is None:
+				continue
+			labels = 'case="{}",subsq="{}",seed="{}"'.format(run.case, run.subsq, run.seed)
+			lines.append("{}{{{}}} {}".format(metric, labels, float(value)))
+	return "\n".join(lines) + "\n"
+
+def main():
+	parser = argparse.ArgumentParser(description="Write rolling metrics of the running Kissat solvers and optionally stop stragglers")
+	parser.add_argument("--log-dir", default="log", help="directory of the logs (default: log)")
+	parser.add_argument("-i", dest="interval", type=float, default=30, help="seconds between updates (default: 30)")
+	parser.add_argument("--window", type=float, default=600, help="seconds of solver time over which the conflict rate is measured (default: 600)")
+	parser.add_argument("--json", help="file to write the metrics to as JSON (default: telemetry.json in the log directory)")
+	parser.add_argument("--prom", help="file to write the metrics to in the Prometheus text format (default: telemetry.prom in the log directory)")
+	parser.add_argument("--straggler-ratio", type=float, help="flag active runs whose conflict rate is below this fraction of the median of the other runs of the case")
+	parser.add_argument("--min-seconds", type=float, default=3600, help="seconds of solver time before a run can be flagged (default: 3600)")
+	parser.add_argument("--min-siblings", type=int, default=2, help="number of other active runs of the case needed to flag a run (default: 2)")
+	parser.add_argument("--stop", action="store_true", help="terminate the stragglers")
+	parser.add_argument("--solver-name", default="kissat", help="process name of the solver (default: kissat)")
+	parser.add_argument("--once", action="store_true", help="update the metrics once and exit")
+	args = parser.parse_args()
+	json_name = args.json or os.path.join(args.log_dir, "telemetry.json")
+	prom_name = args.prom or os.path.join(args.log_dir, "telemetry.prom")
+
+	runs = {}
+	while True:
+		holders = open_logs(args.log_dir)
+		for name in sorted(os.listdir(args.log_dir)):
+			m = summary.log_pattern.fullmatch(name)
+			if not m:
+				continue
+			path = os.path.join(args.log_dir, name)
+			if path not in runs:
+				runs[path] = Run(path, m.group(1), m.group(2) or "", int(m.group(3)))
+			run = runs[path]
+			run.active = os.path.realpath(path) in holders
+			if run.active or os.path.getsize(path) != run.offset:
+				run.update(args.window)
+
+		if args.straggler_ratio is not None:
+			flagged = find_stragglers(runs.values(), args.straggler_ratio, args.min_seconds, args.min_siblings)
+			for run in runs.values():
+				if run.active and run not in flagged:
+					run.straggler = False
+			for run in flagged:
+				if not run.straggler:
+					print("{}: straggler at {:.0f} conflicts per second after {:.0f} seconds".format(run.name, run.conflict_rate(), run.latest["seconds"]))
+				run.straggler = True
+				if args.stop and not run.stopped:
+					pid, writer = solver_process(holders[os.path.realpath(run.name)], args.solver_name)
+					if pid is None:
+						print("{}: no unique solver process writes the log, so it is not stopped".format(run.name))
+					else:
+						stop_run(run, pid, writer)
+						print("{}: stopped".format(run.name))
+				sys.stdout.flush()
+
+		records = [run.record() for run in runs.values()]
+		write_file(json_name, json.dumps({"time": time.time(), "runs": records}, indent=1) + "\n")
+		write_file(prom_name, prometheus_text(list(runs.values())))
+		if args.once:
+			break
+		time.sleep(args.interval)
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,99 @@
+# Parameters shared by encode.py, decode.py and verify.py
+# The search is for a coloured TRP (P,Q) of order n where the third square L has an m x m subsquare in its bottom-right corner
+# The last m columns are the subsquare columns, the symbols 0, ..., m-1 are the white symbols, and each of the first n-m columns
+# contains the same number of dark entries
+# The default parameters are those of Myrvold's problem (n = 10, m = 4); other orders give smaller analogues of it
+
+import itertools
+
+# Transversal types of Myrvold's problem
+# The ith entry of each list represents that row i has form p_i (has i whites in the last 4 columns)
+myrvold_types = {
+'R': 8*[1] + 2*[4],
+'S': 7*[1] + 3*[3],
+'T': 7*[1] + [2] + [3] + [4],
+'U': 6*[1] + 2*[2] + 2*[3],
+'V': 6*[1] + 3*[2] + [4],
+'W': 5*[1] + 4*[2] + [3],
+'X': 4*[1] + 6*[2]
+}
+
+# Return the Cayley table of the cyclic group Z_m
+def cyclic_table(m):
+	return [[(i+j) % m for j in range(m)] for i in range(m)]
+
+# Return the candidate subsquares of order m with their names: one Latin square of order m for each isotopy class considered
+# For m = 4 these are Omega_1 (the Cayley table of Z_4) and Omega_2 (the Cayley table of Z_2 x Z_2); otherwise the Cayley table of Z_m
+def default_subsquares(m):
+	if m == 4:
+		return [cyclic_table(4), [[0,1,2,3],[1,0,3,2],[2,3,0,1],[3,2,1,0]]], ["Cayley table of Z_4", "Cayley table of Z_2xZ_2"]
+	return [cyclic_table(m)], ["Cayley table of Z_{}".format(m)]
+
+class Parameters:
+	# n is the order of the squares and m the order of the subsquare
+	# types maps the name of each square type to its list of row forms (the number of whites in the last m columns of each row);
+	# by default it is Myrvold's table for n = 10 and m = 4 and otherwise every possible list, named A, B, C, ...
+	def __init__(self, n=10, m=4, types=None, subsquares=None, subsquare_names=None):
+		if m < 2 or n < max(4, 2*m-1):
+			raise ValueError("the order must be at least 4 and at least 2m-1 for the first row of P to be fixed")
+		self.n = n
+		self.m = m
+		# Number of columns before the subsquare columns
+		self.first_cols = n - m
+		# Number of dark entries in each of the first n-m columns; in Myrvold's problem (and whenever m(m+1) = 2n) this is n-2m
+		self.darks = n - 2*m if m*(m+1) == 2*n and n >= 2*m else 0
+		if types is None:
+			types = myrvold_types if (n, m) == (10, 4) else self.all_types()
+		if not types:
+			raise ValueError("there are no square types of order {} with a {}x{} subsquare".format(n, m, m))
+		self.types = types
+		if subsquares is None:
+			subsquares, subsquare_names = default_subsquares(m)
+		self.subsquares = subsquares
+		self.subsquare_names = subsquare_names or ["subsquare {}".format(s+1) for s in range(len(subsquares))]
+
+	# Number of dark entries in a row with w whites in the last m columns
+	def row_darks(self, w):
+		return self.darks*(w-1)
+
+	# Colour counts [w1,l1,w2,l2,d] of a row with w whites in the last m columns, where:
+	# w1 is the number of whites in the first n-m columns
+	# l1 is the number of lights in the first n-m columns
+	# w2 is the number of whites in the last m columns
+	# l2 is the number of lights in the last m columns
+	# d is the number of darks (all in the first n-m columns)
+	def row_colours(self, w):
+		d = self.row_darks(w)
+		return [self.m-w, self.first_cols-(self.m-w)-d, w, self.m-w, d]
+
+	# Return all lists of row forms in increasing order with a first row of form 1 that are consistent with
+	# the square having m whites in each of its last m columns and the given number of darks in each of its first n-m columns
+	def all_types(self):
+		n, m = self.n, self.m
+		types = {}
+		for rest in itertools.combinations_with_replacement(range(1, m+1), n-1):
+			forms = [1] + list(rest)
+			if sum(forms) != m*m or sum(self.row_darks(w) for w in forms) != self.darks*self.first_cols:
+				continue
+			if any(self.row_colours(w)[1] < 0 for w in forms):
+				continue
+			types[chr(ord('A') + len(types))] = forms
+		return types
+
+	# The allowed first rows of P (symmetry breaking), one for each white symbol x = m-1, ..., 1 in the first subsquare column:
+	# the other white symbols in increasing order in the first m-1 columns, then the symbols m, ..., n-m in the remaining first n-m columns,
+	# x, and the symbols n-m+1, ..., n-1 in the remaining subsquare columns
+	def first_rows(self):
+		n, m = self.n, self.m
+		rows = []
+		for x in reversed(range(1, m)):
+			rows.append([0] + [s for s in range(1, m) if s != x] + list(range(m, n-m+1)) + [x] + list(range(n-m+1, n)))
+		return rows
+
+# Return the parameters given by a string "n,m" (as passed to the -order option of the scripts)
+def from_string(s):
+	n, m = map(int, s.split(","))
+	return Parameters(n, m)
+
+# Parameters of Myrvold's problem
+default = Parameters()
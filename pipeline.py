@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+
+# Decode and verify the models in solver outputs with a pool of long-lived worker processes
+# This does the work of decode.py and verify.py -model (whose functions it uses) on outputs with many models, e.g., of enumerations
+# or of many portfolio runs, without starting interpreters or passing text between them for each model
+# The pipeline has three stages connected by queues of small tuples:
+# * a reader process reads the models with decode.read_models and copies the literals of the squares of each model into a free slot
+#   of a shared memory block,
+# * -j worker processes decode and verify the model in a slot with verify.verify_model and write the decoded squares back into the slot,
+# * the main process writes the results in the order of the input and then frees the slot
+# There are --slots slots, so the reader waits for a free slot when the workers or the writer fall behind and at most --slots models
+# are held in memory; the models decoded per second are printed to the standard error every -i seconds
+# For each model a line "<file>:<model>: ok" or "<file>:<model>: FAIL <properties>" is printed (the properties of verify.batch_properties
+# that failed), and with -o the decoded squares are also written to a file in the format -f of decode.py
+# The exit status is 1 if no model was found or some model was not verified
+# For example, ./pipeline.py -z 4 -j 8 -o squares.json VX log/
+# reads the logs in log/ and its subdirectories (or the standard input if no file is given)
+
+import argparse
+import multiprocessing
+import os
+import queue
+import sys
+import time
+from array import array
+from multiprocessing import shared_memory
+
+import decode
+import encode
+import params
+import verify
+
+# Return the number of literals held by a slot (a model has at most one positive literal for every variable of the squares)
+def slot_literals():
+	return decode.k*decode.n**3
+
+# Return the number of bytes of the decoded squares of a slot (in the flat layout of decode.py)
+def slot_squares():
+	return decode.k*decode.n*decode.n
+
+# Return memoryviews of the literals and of the decoded squares of all slots in the shared memory block shm
+def slot_views(shm, slots):
+	split = slots*slot_literals()*4
+	return shm.buf[:split].cast("i"), shm.buf[split:split+slots*slot_squares()].cast("b")
+
+# Reader stage: copy the literals of the squares of the models in the solver outputs names (or the file descriptor fd) into free slots
+# and queue them for the workers; a result for an UNSAT answer or an invalid model goes straight to the writer
+# The number of models is sent to the writer at the end and the seconds spent waiting for a free slot are added to waited
+def reader(names, fd, unmap, shm_name, slots, free, tasks, done, jobs, waited):
+	shm = shared_memory.SharedMemory(shm_name)
+	lits, squares = slot_views(shm, slots)
+	capacity = slot_literals()
+	seq = 0
+	for name in decode.input_files(names) if names else [None]:
+		lines = open(name) if name is not None else os.fdopen(fd)
+		source = name if name is not None else "stdin"
+		for index, model in enumerate(decode.read_models(lines), 1):
+			label = "{}:{}".format(source, index)
+			if model is None:
+				done.put((seq, None, "UNSAT", label))
+				seq += 1
+				continue
+			if unmap is not None:
+				model = unmap(model)
+			# decode.decode_model only reads the positive literals of the variables of the squares
+			model = array("i", (lit for lit in model if 0 < lit <= capacity))
+			if len(model) > capacity:
+				done.put((seq, None, "more than {} literals".format(capacity), label))
+				seq += 1
+				continue
+			start = time.time()
+			slot = free.get()
+			with waited.get_lock():
+				waited.value += time.time() - start
+			lits[slot*capacity:slot*capacity+len(model)] = model
+			tasks.put((seq, slot, len(model), label))
+			seq += 1
+		lines.close()
+	for _ in range(jobs):
+		tasks.put(None)
+	done.put((None, seq))
+	lits.release()
+	squares.release()
+	shm.close()
+
+# Worker stage: decode and verify the models of the queued slots, write the decoded squares into the slots and send the properties
+# that hold (as bits in the order of verify.batch_properties) and the compatible subsquares (as bits) to the writer
+def worker(shm_name, slots, tasks, done, type1, type2, z4, z2xz2, strong_symmetry):
+	shm = shared_memory.SharedMemory(shm_name)
+	lits, squares = slot_views(shm, slots)
+	capacity, size = slot_literals(), slot_squares()
+	while True:
+		task = tasks.get()
+		if task is None:
+			break
+		seq, slot, length, label = task
+		try:
+			result = verify.verify_model(lits[slot*capacity:slot*capacity+length], type1, type2, z4, z2xz2, strong_symmetry)
+		except ValueError as err:
+			done.put((seq, slot, str(err), label))
+			continue
+		squares[slot*size:(slot+1)*size] = result.squares
+		ok = sum(1 << b for b, name in enumerate(verify.batch_properties) if result.ok[name])
+		compatible = sum(1 << s for s, c in enumerate(result.compatible) if c)
+		done.put((seq, slot, (ok, compatible), label))
+	lits.release()
+	squares.release()
+	shm.close()
+
+def main():
+	parser = argparse.ArgumentParser(description="Decode and verify the models in solver outputs with a pool of worker processes")
+	parser.add_argument("case", help="pair type (e.g., VX)")
+	parser.add_argument("files", nargs="*", help="solver outputs, or directories searched for .log files (default: the standard input)")
+	parser.add_argument("-z", dest="subsq", help="subsquare consistency option (4, 2xz2 or 4z2xz2)")
+	parser.add_argument("-j", dest="jobs", type=int, default=len(os.sched_getaffinity(0)), help="number of worker processes (default: number of available cores)")
+	parser.add_argument("--slots", type=int, help="number of models held in shared memory at a time (default: 64 per worker)")
+	parser.add_argument("-m", dest="map", help="variable map of an instance simplified by encode.py -simplify")
+	parser.add_argument("-o", dest="output", help="write the decoded squares to this file")
+	parser.add_argument("-f", dest="format", choices=["text", "json", "binary"], default="json", help="format of the decoded squares (default: json)")
+	parser.add_argument("--order", help="order n,m of the analogue of order n with an m x m subsquare (default: 10,4)")
+	parser.add_argument("--strongsym", action="store_true", help="also verify the stronger symmetry breaking of encode.py -strongsym")
+	parser.add_argument("-i", dest="interval", type=float, default=10, help="seconds between reports of the throughput (default: 10)")
+	args = parser.parse_intermixed_args()
+
+	if args.order:
+		p = params.from_string(args.order)
+		encode.configure(p)
+		verify.configure(p)
+	case = args.case
+	if len(case) != 2 or any(t not in verify.square_data for t in case):
+		print("Invalid square type. Both square types must be one of {{{}}}.".format(",".join(verify.square_data)))
+		sys.exit(1)
+	subsq = "-z" + args.subsq if args.subsq else ""
+	z4, z2xz2 = encode.subsquare_flags(subsq)
+	unmap = None
+	if args.map:
+		with open(args.map) as f:
+			unmap = decode.read_map(f)
+	slots = args.slots or 64*args.jobs
+
+	ctx = multiprocessing.get_context("fork")
+	shm = shared_memory.SharedMemory(create=True, size=slots*(slot_literals()*4 + slot_squares()))
+	free, tasks, done = ctx.Queue(), ctx.Queue(), ctx.Queue()
+	for slot in range(slots):
+		free.put(slot)
+	waited = ctx.Value("d", 0.0)
+	# The reader gets a copy of the standard input since multiprocessing closes it in child processes
+	fd = os.dup(sys.stdin.fileno()) if not args.files else None
+	stages = [ctx.Process(target=reader, args=(args.files, fd, unmap, shm.name, slots, free, tasks, done, args.jobs, waited))]
+	stages += [ctx.Process(target=worker, args=(shm.name, slots, tasks, done, case[0], case[1], z4, z2xz2, args.strongsym)) for _ in range(args.jobs)]
+	for stage in stages:
+		stage.start()
+	if fd is not None:
+		os.close(fd)
+
+	lits, squares = slot_views(shm, slots)
+	size = slot_squares()
+	out = None
+	if args.output:
+		out = open(args.output, "wb" if args.format == "binary" else "w")
+	start = last = time.time()
+	pending = {}
+	written = models = passed = 0
+	compatible = [0]*len(verify.Ls)
+	total = None
+	try:
+		while total is None or written < total:
+			try:
+				item = done.get(timeout=args.interval)
+			except queue.Empty:
+				item = None
+				if any(stage.exitcode not in (None, 0) for stage in stages):
+					print("Error: a stage of the pipeline exited with status {}".format([stage.exitcode for stage in stages]))
+					sys.exit(1)
+			if item is not None and item[0] is None:
+				total = item[1]
+			elif item is not None:
+				pending[item[0]] = item
+			# Write the results in the order of the input
+			while written in pending:
+				seq, slot, result, label = pending.pop(written)
+				if result == "UNSAT":
+					print("{}: UNSAT".format(label))
+				elif not isinstance(result, tuple):
+					models += 1
+					print("{}: skipped: {}".format(label, result))
+				else:
+					models += 1
+					ok, comp = result
+					failed = [name for b, name in enumerate(verify.batch_properties) if not ok >> b & 1]
+					print("{}: {}".format(label, "ok" if not failed else "FAIL " + ", ".join(failed)))
+					passed += not failed
+					for s in range(len(compatible)):
+						compatible[s] += comp >> s & 1
+					if out is not None:
+						LS = array("b", squares[slot*size:(slot+1)*size])
+						if args.format == "text":
+							out.write(("\n" if models > 1 else "") + decode.format_text(LS))
+						elif args.format == "json":
+							out.write(decode.format_json(LS, label) + "\n")
+						else:
+							out.write(decode.format_binary(LS))
+				if slot is not None:
+					free.put(slot)
+				written += 1
+			if time.time() - last >= args.interval:
+				last = time.time()
+				print("{} models in {:.1f} seconds ({:.0f} models per second, reader waited {:.1f} seconds for a free slot)".format(
+				      written, last-start, written/(last-start), waited.value), file=sys.stderr)
+				sys.stderr.flush()
+		for stage in stages:
+			stage.join()
+	finally:
+		for stage in stages:
+			if stage.is_alive():
+				stage.terminate()
+		if out is not None:
+			out.close()
+		lits.release()
+		squares.release()
+		shm.close()
+		shm.unlink()
+
+	elapsed = time.time() - start
+	counts = ["{} {}with Omega_{}".format(compatible[s], "compatible " if s == 0 else "", s+1) for s in range(len(compatible))]
+	print("{} of {} models verified ({}) in {:.1f} seconds ({:.0f} models per second with {} workers)".format(
+	      passed, models, ", ".join(counts), elapsed, written/elapsed if elapsed > 0 else 0, args.jobs))
+	if models == 0:
+		print("No model found in the solver output")
+	if models == 0 or passed < models:
+		sys.exit(1)
+
+if __name__ == "__main__":
+	main()
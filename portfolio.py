@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+
+# Race several Kissat processes with different random seeds on the same case
+# The case is encoded once, K solvers are started on K cores, and as soon as one solver returns SAT or UNSAT the others are stopped
+# Each solver writes its log to log/<case><subsq>-<seed>.log (as run.sh does) so summary.sh keeps working
+# If a solution was found it is decoded and verified in this process with decode.py and verify.py (see verify.verify_model)
+
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import decode
+import encode
+import summary
+import verify
+
+here = os.path.dirname(os.path.abspath(__file__))
+
+# Default location of the Kissat binary (compiled by compile-kissat.sh)
+default_solver = "./kissat/build/kissat"
+
+# Exit codes of Kissat
+SAT = 10
+UNSAT = 20
+
+# Return the Kissat command line solving the instance cnf
+def solver_command(solver, cnf, seed, timeout=None, options=[]):
+	return [solver, "--seed={}".format(seed)] + (["--time={}".format(timeout)] if timeout else []) + options + [cnf]
+
+# Compile Kissat if the solver is the default one and it does not exist yet
+def ensure_solver(solver):
+	if not os.path.exists(solver) and solver == default_solver:
+		subprocess.run([os.path.join(here, "compile-kissat.sh")], check=True)
+
+# Return the name of the log file of the given case, subsquare option and seed
+def log_name(case, subsq, seed, log_dir="log"):
+	return os.path.join(log_dir, "{}{}-{}.log".format(case, subsq, seed))
+
+# Write the instance of the given case and subsquare option to a file in the directory dirname and return its name
+def write_instance(case, subsq, dirname):
+	z4, z2xz2 = encode.subsquare_flags(subsq)
+	cnf = os.path.join(dirname, "{}{}.cnf".format(case, subsq))
+	with open(cnf, "w") as f:
+		encode.encode(case[0], case[1], z4, z2xz2).write_dimacs(f)
+	return cnf
+
+# Draw k distinct random seeds in the range used by run.sh
+def random_seeds(k):
+	return random.SystemRandom().sample(range(1000000000), k)
+
+# Stop a running solver: Kissat prints its statistics when terminated, and the log is marked as unknown
+def stop(proc, log, reason):
+	proc.terminate()
+	try:
+		proc.wait(timeout=30)
+	except subprocess.TimeoutExpired:
+		proc.kill()
+		proc.wait()
+	log.write("c {}\ns UNKNOWN\n".format(reason))
+
+# Run the solver on cnf with each of the seeds in parallel until one of them finds the answer
+# Return (seed, exit code) of the first solver to return SAT or UNSAT, or (None, None) if all solvers stopped without an answer
+def race(cnf, case, subsq, seeds, solver=default_solver, timeout=None, options=[], log_dir="log", poll=0.2):
+	os.makedirs(log_dir, exist_ok=True)
+	running = {}
+	for seed in seeds:
+		command = solver_command(solver, cnf, seed, timeout, options)
+		print(" ".join(command) + " > " + log_name(case, subsq, seed, log_dir))
+		log = open(log_name(case, subsq, seed, log_dir), "w")
+		running[seed] = (subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT), log)
+	sys.stdout.flush()
+
+	winner, result = None, None
+	while running and winner is None:
+		time.sleep(poll)
+		for seed, (proc, log) in list(running.items()):
+			if proc.poll() is None:
+				continue
+			log.close()
+			del running[seed]
+			if proc.returncode in (SAT, UNSAT) and winner is None:
+				winner, result = seed, proc.returncode
+
+	for seed, (proc, log) in running.items():
+		stop(proc, log, "{} after seed {} returned {}".format(summary.loser_marker, winner, "SAT" if result == SAT else "UNSAT"))
+		log.close()
+	return winner, result
+
+# Decode and verify the solution in the log file with verify.verify_model and print the squares and the result of the verification
+# Return True if the solution passed verification
+def decode_and_verify(logname, case, subsq):
+	with open(logname) as f:
+		model = next((model for model in decode.read_models(f) if model is not None), None)
+	if model is None:
+		print("No model found in " + logname)
+		return False
+	z4, z2xz2 = encode.subsquare_flags(subsq)
+	result = verify.verify_model(model, case[0], case[1], z4, z2xz2)
+	print(decode.format_text(result.squares), end="")
+	print(result.report(), end="")
+	return result.passed()
+
+def main():
+	parser = argparse.ArgumentParser(description="Race Kissat with several random seeds on one case")
+	parser.add_argument("case", help="pair type (e.g., UU)")
+	parser.add_argument("-z", dest="subsq", help="subsquare consistency option (4, 2xz2 or 4z2xz2)")
+	parser.add_argument("-k", dest="jobs", type=int, default=len(os.sched_getaffinity(0)), help="number of solvers to run in parallel (default: number of available cores)")
+	parser.add_argument("-t", dest="timeout", type=int, help="stop each solver after timeout seconds")
+	parser.add_argument("-s", dest="seeds", type=int, nargs="+", help="seeds to use instead of random ones")
+	parser.add_argument("--solver", default=default_solver, help="path to the Kissat binary")
+	args = parser.parse_args()
+
+	case = args.case
+	if len(case) != 2 or any(t not in encode.transversal_types for t in case):
+		print("Invalid square type. Both square types must be one of {R,S,T,U,V,W,X}.")
+		sys.exit(1)
+	subsq = "-z" + args.subsq if args.subsq else ""
+	seeds = args.seeds if args.seeds else random_seeds(args.jobs)
+
+	ensure_solver(args.solver)
+	with tempfile.TemporaryDirectory() as tmp:
+		cnf = write_instance(case, subsq, tmp)
+		start = time.time()
+		winner, result = race(cnf, case, subsq, seeds, args.solver, args.timeout)
+		elapsed = time.time() - start
+
+	if winner is None:
+		print("No solver determined the answer")
+		sys.exit(1)
+	print("Seed {} returned {} after {:.1f} seconds".format(winner, "SAT" if result == SAT else "UNSAT", elapsed))
+	if result == SAT:
+		if not decode_and_verify(log_name(case, subsq, winner), case, subsq):
+			sys.exit(1)
+	else:
+		print("s UNSATISFIABLE")
+
+if __name__ == "__main__":
+	main()
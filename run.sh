@@ -2,12 +2,14 @@
 
 solver="./kissat/build/kissat"
 
-# Check for subsquare consistency option -z4 or -z2xz2, -t with timeout, or -s with seed
-while getopts "z:t:s:" opt; do
+# Check for subsquare consistency option -z4 or -z2xz2, -t with timeout, -s with seed, -p to simplify the instance, or -d to keep a DRAT proof
+while getopts "z:t:s:pd" opt; do
 	case "$opt" in
 		z) subsq="-z$OPTARG" ;;
 		t) timeout=" --time=$OPTARG" ;;
 		s) seed="$OPTARG" ;;
+		p) simplify=1 ;;
+		d) proof=1 ;;
 	esac
 done
 shift $((OPTIND-1))
@@ -15,10 +17,12 @@ shift $((OPTIND-1))
 # Ensure pair type given on command-line
 if [ -z $1 ]
 then
-	echo "Usage: $0 [-z4|-z2xz2] [-t timeout] [-s seed] Pair_Type (e.g., VX)"
+	echo "Usage: $0 [-z4|-z2xz2] [-t timeout] [-s seed] [-p] [-d] Pair_Type (e.g., VX)"
 	echo "Pass -z4 to enforce subsquare consistency with Z_4; pass -z2xz2 to enforce subsquare consistency with Z_2 x Z_2"
 	echo "Pass -t timeout to stop solving after timeout seconds"
 	echo "Pass -s seed to set the random seed of the solver"
+	echo "Pass -p to simplify the instance by unit propagation before solving it"
+	echo "Pass -d to keep a binary DRAT proof in log/<name>.drat.gz and the instance in log/<name>.cnf.gz (check them with ./check_proofs.py)"
 	exit 1
 fi
 
@@ -44,14 +48,41 @@ fi
 
 logname=$case$subsq-$seed
 
-command="./encode.py $subsq $case | $solver$timeout --seed=$seed | tee log/$logname.log"
-echo $command
-eval $command
+# Pass the options of Kissat tuned for the case by tune.py
+if [ -s tuned/$case$subsq.options ]
+then
+	options=" $(cat tuned/$case$subsq.options)"
+fi
+
+# The variable map of a simplified instance is needed to decode the solution
+if [ -n "$simplify" ]
+then
+	simplify=" -simplify log/$logname.map"
+	unmap=" -m log/$logname.map"
+fi
+
+if [ -n "$proof" ]
+then
+	# Kissat writes the proof to a named pipe that gzip compresses as it is written, so the proof is never stored uncompressed
+	./encode.py$simplify $subsq $case -o log/$logname.cnf
+	mkfifo log/$logname.drat.fifo
+	gzip -c < log/$logname.drat.fifo > log/$logname.drat.gz &
+	command="$solver$timeout$options --seed=$seed log/$logname.cnf log/$logname.drat.fifo | tee log/$logname.log"
+	echo $command
+	eval $command
+	wait
+	rm log/$logname.drat.fifo
+	gzip -f log/$logname.cnf
+else
+	command="./encode.py$simplify $subsq $case | $solver$timeout$options --seed=$seed | tee log/$logname.log"
+	echo $command
+	eval $command
+fi
 
 if grep -q "s SATISFIABLE" log/$logname.log
 then
 	# Verify the found solution satisfies the expected properties
-	grep '^v' log/$logname.log | ./decode.py | ./verify.py $subsq $case
+	./verify.py -model$unmap $subsq $case < log/$logname.log
 else
 	grep "s UNSATISFIABLE" log/$logname.log
 fi
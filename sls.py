@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+
+# Search for coloured TRPs of a case by stochastic local search on the squares themselves instead of on the SAT encoding
+# If P is a Latin square, the rows of Q that agree with every row of P in exactly one entry (Q = PZ) are the transversals of P,
+# and Q is a Latin square exactly when its rows are n disjoint transversals of P; so a walker searches for P and completes Q exactly:
+# * it keeps every row of P a permutation of the symbols with the number of white entries in its last m columns given by
+#   the transversal type of P in encode.py, and the dark symbols of each of the first n-m columns (shared by P and Q) as a set
+#   of darks symbols, and moves to the best swap of two entries of a row with a violation (or to a random swap with probability
+#   --noise) or of a dark symbol of a column, to remove the violations of the columns of P being permutations (Latin), of the number
+#   of dark entries of each row of P (row types and darks) and of no row of P agreeing with a row of the subsquare in two of
+#   the last m columns (compatibility with Omega_1 or Omega_2); the counts are kept in tables updated after every move,
+#   together with the violations of every row, so that a row with a violation is found without recounting
+# * when P has no violation it enumerates the transversals of P that can be rows of Q (with the number of white entries
+#   in the last m columns of a row of the type of Q, its number of dark entries, and compatible with the subsquare)
+#   and searches for n disjoint ones with the row types of Q (an exact cover of the entries of P, see complete)
+# * if there is none, P is changed by --kick random swaps and the walk goes on
+# Many walkers with different seeds run on a pool of processes (-j); a walker restarts from a random P after --steps moves
+# A solution found is brought into normal form (see normal_copies in enumerate_trps.py) and verified with verify.py before it is printed
+# The search is incomplete: it never shows that a case is UNSAT
+# For example, ./sls.py -z 4 -t 3600 UU runs walkers for an hour on UU with -z4
+
+import argparse
+import itertools
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+import decode
+import encode
+import enumerate_trps
+import params
+import verify
+
+# Set the parameters of the squares from p (see params.py), also in enumerate_trps.py, encode.py, decode.py and verify.py
+def configure(p):
+	global n, m, first_cols, darks, parameters
+	enumerate_trps.configure(p)
+	parameters = p
+	n = p.n
+	m = p.m
+	first_cols = p.first_cols
+	darks = p.darks
+
+configure(params.default)
+
+# Return the candidate subsquares that a TRP of the subsquare option subsq must be compatible with, one list per choice
+# (the subsquares given by -z4 and -z2xz2, or any one of them)
+def subsquare_choices(subsq):
+	z4, z2xz2 = encode.subsquare_flags(subsq)
+	required = [s for s, flag in enumerate([z4, z2xz2]) if flag]
+	return [required] if required else [[s] for s in range(len(encode.Ls))]
+
+# Return the choices of subsquare_choices(subsq) that a TRP of the case can be compatible with: a row with m white entries in the
+# last m columns has all the white symbols there, so every subsquare of the choice must have a permutation of them agreeing with
+# each of its rows in at most one entry (which the Cayley table of Z_m for even m, such as Omega_1, does not have)
+def feasible_choices(case, subsq):
+	full = any(m in encode.transversal_types[t] for t in case)
+	def allows(s):
+		return not full or any(all(sum(x == y for x, y in zip(perm, row)) < 2 for row in encode.Ls[s]) for perm in itertools.permutations(range(m)))
+	return [choice for choice in subsquare_choices(subsq) if all(allows(s) for s in choice)]
+
+# The state of one walk: the square P (a list of rows), the dark symbols D[j] of column j and the count tables
+# col[j][s] (occurrences of symbol s in column j), rows[j][s] (the rows with symbol s in column j), dark[i] (dark entries of row i)
+# and agree[i][k] (entries where row i agrees with row k of the required subsquares, numbered one after the other), and the violations
+# of every row in bad[i] (the entries of row i in a column with a repeated symbol, the difference between the dark entries of row i
+# and the number required by its type, and the agreements with rows of the subsquares beyond the first)
+class Walker:
+	def __init__(self, types, subsquares, rng):
+		self.rng = rng
+		self.forms = [encode.transversal_types[t] for t in types]
+		self.required = [parameters.row_darks(w) for w in self.forms[0]]
+		# The rows of the required subsquares padded to n columns (with -1 in the first n-m columns) so that they line up with the rows
+		# of P, and the rows hit[j][s] of them with the symbol s in column j
+		self.K = [[-1]*first_cols + list(row) for s in subsquares for row in encode.Ls[s]]
+		self.hit = [[[k for k, K in enumerate(self.K) if K[j] == s] for s in range(n)] for j in range(n)]
+		self.restart()
+
+	# Start from a random P and random dark symbols
+	def restart(self):
+		rng = self.rng
+		self.P = []
+		for i in range(n):
+			# The white symbols of the row are placed in forms[0][i] random columns of the last m and m-forms[0][i] of the first n-m
+			# (moves only swap white symbols with each other or within the first n-m or the last m columns, which keeps these numbers)
+			w = self.forms[0][i]
+			cols = rng.sample(range(first_cols), m-w) + rng.sample(range(first_cols, n), w)
+			rest = [j for j in range(n) if j not in cols]
+			row = [0]*n
+			for j, s in zip(cols + rest, rng.sample(range(m), m) + rng.sample(range(m, n), n-m)):
+				row[j] = s
+			self.P.append(row)
+		self.D = [set(rng.sample(range(m, n), darks)) for j in range(first_cols)]
+		self.recount()
+
+	# Compute the count tables and the violations from P and D
+	def recount(self):
+		P = self.P
+		self.col = [[0]*n for j in range(n)]
+		self.rows = [[set() for s in range(n)] for j in range(n)]
+		for i in range(n):
+			for j in range(n):
+				self.col[j][P[i][j]] += 1
+				self.rows[j][P[i][j]].add(i)
+		self.dark = [sum(P[i][j] in self.D[j] for j in range(first_cols)) for i in range(n)]
+		self.agree = [[sum(P[i][j] == K[j] for j in range(first_cols, n)) for K in self.K] for i in range(n)]
+		self.bad = [self.row_violations(i) for i in range(n)]
+		self.cost = sum(max(c-1, 0) for counts in self.col for c in counts) + sum(abs(self.dark[i]-self.required[i]) for i in range(n)) \
+		            + sum(max(a-1, 0) for i in range(n) for a in self.agree[i])
+
+	# Return the violations of row i
+	def row_violations(self, i):
+		row, col = self.P[i], self.col
+		return sum(col[j][row[j]] > 1 for j in range(n)) + abs(self.dark[i]-self.required[i]) + sum(max(a-1, 0) for a in self.agree[i])
+
+	# Return whether swapping the entries in columns a and b of a row with symbols s and t keeps its white entries in place
+	def allowed(self, a, b, s, t):
+		return (s < m) == (t < m) or (a < first_cols) == (b < first_cols)
+
+	# Return the changes of the number of violations of swapping the entries in columns a and b of row i for the pairs (a, b) of moves
+	def swap_deltas(self, i, moves):
+		row, col, D, hit, agree = self.P[i], self.col, self.D, self.hit, self.agree[i]
+		dark, required = self.dark[i], self.required[i]
+		deltas = []
+		for a, b in moves:
+			s, t = row[a], row[b]
+			delta = (col[a][t] >= 1) + (col[b][s] >= 1) - (col[a][s] > 1) - (col[b][t] > 1)
+			d = 0
+			if a < first_cols:
+				d += (t in D[a]) - (s in D[a])
+			if b < first_cols:
+				d += (s in D[b]) - (t in D[b])
+			if d:
+				delta += abs(dark+d-required) - abs(dark-required)
+			# The agreements lost and gained are counted one at a time, each adding its change of the excess, and then undone
+			lost, gained = hit[a][s] + hit[b][t], hit[a][t] + hit[b][s]
+			for k in lost:
+				delta -= agree[k] > 1
+				agree[k] -= 1
+			for k in gained:
+				delta += agree[k] >= 1
+				agree[k] += 1
+			for k in lost:
+				agree[k] += 1
+			for k in gained:
+				agree[k] -= 1
+			deltas.append(delta)
+		return deltas
+
+	# Return the change of the number of violations of swapping the entries in columns a and b of row i
+	def swap_delta(self, i, a, b):
+		return self.swap_deltas(i, [(a, b)])[0]
+
+	# Swap the entries in columns a and b of row i and update the tables
+	def swap(self, i, a, b):
+		row, agree = self.P[i], self.agree[i]
+		delta = self.swap_delta(i, a, b)
+		s, t = row[a], row[b]
+		affected = {i} | self.rows[a][s] | self.rows[a][t] | self.rows[b][s] | self.rows[b][t]
+		for j, old, new in ((a, s, t), (b, t, s)):
+			self.col[j][old] -= 1
+			self.col[j][new] += 1
+			self.rows[j][old].discard(i)
+			self.rows[j][new].add(i)
+			if j < first_cols:
+				self.dark[i] += (new in self.D[j]) - (old in self.D[j])
+			for k in self.hit[j][old]:
+				agree[k] -= 1
+			for k in self.hit[j][new]:
+				agree[k] += 1
+		row[a], row[b] = t, s
+		self.cost += delta
+		for r in affected:
+			self.bad[r] = self.row_violations(r)
+
+	# Return the change of the number of violations of making the symbol t dark instead of s in column j
+	def dark_delta(self, j, s, t):
+		delta = 0
+		for rows, d in ((self.rows[j][s], -1), (self.rows[j][t], 1)):
+			for i in rows:
+				delta += abs(self.dark[i]+d-self.required[i]) - abs(self.dark[i]-self.required[i])
+		return delta
+
+	# Make the symbol t dark instead of s in column j and update the tables
+	def move_dark(self, j, s, t):
+		self.cost += self.dark_delta(j, s, t)
+		self.D[j].remove(s)
+		self.D[j].add(t)
+		for rows, d in ((self.rows[j][s], -1), (self.rows[j][t], 1)):
+			for i in rows:
+				self.dark[i] += d
+				self.bad[i] = self.row_violations(i)
+
+	# Make one move: a dark move in a random column (with probability 0.1 when there are dark entries) or a swap in a random
+	# row with a violation, to the best move (ties broken at random) or, with probability noise, to a random move
+	def step(self, noise):
+		rng = self.rng
+		walk = rng.random() < noise
+		if darks > 0 and rng.random() < 0.1:
+			j = rng.randrange(first_cols)
+			moves = [(s, t) for s in self.D[j] for t in range(m, n) if t not in self.D[j]]
+			if not walk:
+				deltas = [self.dark_delta(j, s, t) for s, t in moves]
+				moves = [move for move, delta in zip(moves, deltas) if delta == min(deltas)]
+			self.move_dark(j, *moves[rng.randrange(len(moves))])
+			return
+		violated = [i for i in range(n) if self.bad[i]]
+		i = violated[rng.randrange(len(violated))] if violated else rng.randrange(n)
+		row = self.P[i]
+		moves = [(a, b) for a in range(n) for b in range(a+1, n) if self.allowed(a, b, row[a], row[b])]
+		if not walk:
+			deltas = self.swap_deltas(i, moves)
+			best = min(deltas)
+			moves = [move for move, delta in zip(moves, deltas) if delta == best]
+		self.swap(i, *moves[rng.randrange(len(moves))])
+
+	# Make count random swaps
+	def kick(self, count):
+		rng = self.rng
+		for _ in range(count):
+			i, a, b = rng.randrange(n), rng.randrange(n), rng.randrange(n)
+			if a != b and self.allowed(a, b, self.P[i][a], self.P[i][b]):
+				self.swap(i, a, b)
+
+	# Return the transversals of P that can be rows of Q: one entry in every row, column and symbol, with forms[1][r] white
+	# entries in the last m columns for some row r of Q, the number of dark entries of a row of that form, and agreeing with
+	# no row of a required subsquare in two entries; each is a tuple (form, entries as a bit mask of j*n+i, symbols by column)
+	def transversals(self):
+		P, D = self.P, self.D
+		forms = set(self.forms[1])
+
+		# Return the partial transversals in the given columns as tuples (rows, symbols, entries, whites, darks, subsquare rows
+		# agreed with), all but the counts as bit masks, extended by one column at a time
+		def spread(columns):
+			partial = [(0, 0, 0, 0, 0, 0)]
+			for j in columns:
+				cells = []
+				for i in range(n):
+					s = P[i][j]
+					hit = sum(1 << k for k in self.hit[j][s])
+					cells.append((1 << i, 1 << s, 1 << (j*n+i), j >= first_cols and s < m, j < first_cols and s in D[j], hit))
+				partial = [(r | row, y | sym, e | entry, w + white, d + dark, a | hit)
+				           for r, y, e, w, d, a in partial for row, sym, entry, white, dark, hit in cells
+				           if not (r & row or y & sym or a & hit)]
+			return partial
+
+		# The transversals are joined from their parts in the first n-m columns (with the dark entries) and in the last m columns
+		# (with the white entries counted by the form and the agreements with the subsquares) on the remaining rows and symbols
+		first = {}
+		for r, y, e, w, d, a in spread(range(first_cols)):
+			first.setdefault((r, y), []).append((e, d))
+		full = (1 << n) - 1
+		found = []
+		for r, y, e, w, d, a in spread(range(first_cols, n)):
+			if w in forms:
+				for e1, d1 in first.get((full ^ r, full ^ y), ()):
+					if d1 == parameters.row_darks(w):
+						entries = e | e1
+						found.append((w, entries, tuple(P[(entries >> j*n & full).bit_length() - 1][j] for j in range(n))))
+		return found
+
+	# Return the rows of a square Q such that (P, Q) is a TRP of the types of the walker, or None if there is none
+	# (or if the search for it passes limit nodes): the rows are n disjoint transversals of P (see transversals) with the row
+	# forms of the type of Q, found by an exact cover of the entries of P choosing the entry covered by the fewest transversals
+	# and stopping as soon as too few transversals of some form are left
+	def complete(self, limit=100000):
+		candidates = self.transversals()
+		need = {}
+		for w in self.forms[1]:
+			need[w] = need.get(w, 0) + 1
+		covering = [[t for t in candidates if t[1] >> e & 1] for e in range(n*n)]
+		chosen = []
+		nodes = [0]
+
+		def cover(used, left):
+			if len(chosen) == n:
+				return True
+			nodes[0] += 1
+			if nodes[0] > limit:
+				return False
+			left = [t for t in left if not t[1] & used]
+			for w in need:
+				if sum(t[0] == w for t in left) < need[w]:
+					return False
+			best = None
+			for e in range(n*n):
+				if used >> e & 1:
+					continue
+				options = [t for t in covering[e] if not t[1] & used and need[t[0]] > 0]
+				if best is None or len(options) < len(best):
+					best = options
+					if len(best) <= 1:
+						break
+			for t in best:
+				need[t[0]] -= 1
+				chosen.append(t)
+				if cover(used | t[1], left):
+					return True
+				chosen.pop()
+				need[t[0]] += 1
+			return False
+
+		if not cover(0, candidates):
+			return None
+		# The transversals are given to the rows of Q in the order of their forms
+		Q = []
+		for w in self.forms[1]:
+			t = next(t for t in chosen if t[0] == w)
+			chosen.remove(t)
+			Q.append(list(t[2]))
+		return Q
+
+	# Run at most steps moves, completing P whenever it has no violation and kicking it by kick random swaps if it cannot be completed
+	# Return the rows of Q found (or None), the number of moves made and the number of squares P that were completed
+	def walk(self, steps, noise, kick, deadline=None):
+		tried = 0
+		for step in range(steps):
+			if step % 100 == 0 and deadline is not None and time.time() > deadline:
+				return None, step, tried
+			if self.cost == 0:
+				tried += 1
+				Q = self.complete()
+				if Q is not None:
+					self.Q = Q
+					return Q, step, tried
+				self.kick(kick)
+				continue
+			self.step(noise)
+		return None, steps, tried
+
+	# Return the TRP (P, Q, Pd, Qd) of the squares as tuples of rows
+	def trp(self):
+		P, Q = (tuple(tuple(x for x in row) for row in A) for A in (self.P, self.Q))
+		Pd, Qd = (tuple(tuple(j < first_cols and A[i][j] in self.D[j] for j in range(n)) for i in range(n)) for A in (P, Q))
+		return P, Q, Pd, Qd
+
+# Return the TRP found by the walker for the case and the subsquare option subsq in normal form (in the flat layout of decode.py)
+# The squares are verified with verify.py and a ValueError is raised if they fail
+def found_squares(walker, case, subsq):
+	P, Q, Pd, Qd = min(enumerate_trps.normal_copies(*walker.trp(), case[0] == case[1]))
+	LS = enumerate_trps.flat_squares(P, Q, Pd, Qd)
+	z4, z2xz2 = encode.subsquare_flags(subsq)
+	result = verify.check_trp(*(decode.square_rows(LS, p) for p in range(4)), case[0], case[1], z4, z2xz2)
+	if not result.passed():
+		raise ValueError("the squares found fail verification: " + ", ".join(result.failed()))
+	return LS
+
+# Run the walker with the given seed for the case and the subsquare option subsq until it finds a TRP, makes steps moves or
+# passes the deadline; return the seed, the squares found (see found_squares, or None), the number of moves and
+# the number of squares P that were completed
+def run_walker(case, subsq, seed, steps, noise, kick, deadline):
+	choices = feasible_choices(case, subsq)
+	walker = Walker(case, choices[seed % len(choices)], random.Random(seed))
+	Q, moves, tried = walker.walk(steps, noise, kick, deadline)
+	if Q is None:
+		return seed, None, moves, tried
+	return seed, found_squares(walker, case, subsq), moves, tried
+
+def main():
+	parser = argparse.ArgumentParser(description="Search for coloured TRPs of a case by stochastic local search on a pool of processes")
+	parser.add_argument("case", help="pair type (e.g., UU)")
+	parser.add_argument("-z", dest="subsq", help="subsquare consistency option (4, 2xz2 or 4z2xz2)")
+	parser.add_argument("-j", dest="jobs", type=int, default=os.cpu_count(), help="number of walkers run at once (default: number of cores)")
+	parser.add_argument("-t", dest="timeout", type=float, help="stop after timeout seconds (default: run until a TRP is found)")
+	parser.add_argument("-k", dest="count", type=int, default=1, help="stop after finding count TRPs (default: 1)")
+	parser.add_argument("-s", dest="seed", type=int, default=0, help="seed of the first walker; walker i has seed seed+i (default: 0)")
+	parser.add_argument("--steps", type=int, default=1000000, help="moves of a walker before it is restarted with a new seed (default: 1000000)")
+	parser.add_argument("--noise", type=float, default=0.1, help="probability of a random move (default: 0.1)")
+	parser.add_argument("--kick", type=int, default=n, help="random swaps made to a square P that cannot be completed (default: n)")
+	parser.add_argument("-f", dest="format", choices=["text", "json"], default="text", help="output format of the TRPs (as in decode.py)")
+	parser.add_argument("--order", help="search the analogue n,m of order n with an m x m subsquare (see params.py)")
+	args = parser.parse_args()
+	if args.order:
+		configure(params.from_string(args.order))
+
+	case = args.case
+	if len(case) != 2 or any(t not in encode.transversal_types for t in case):
+		print("Invalid square type. Both square types must be one of {" + ",".join(encode.transversal_types) + "}.")
+		sys.exit(1)
+	subsq = "-z" + args.subsq if args.subsq else ""
+	encode.subsquare_flags(subsq)
+	if not feasible_choices(case, subsq):
+		print("{}{}: no TRP can be compatible with the subsquares".format(case, subsq), file=sys.stderr)
+		sys.exit(1)
+
+	start = time.time()
+	deadline = start + args.timeout if args.timeout else None
+	found = []
+	walkers = 0
+	tried = 0
+	with multiprocessing.get_context("fork").Pool(args.jobs) as pool:
+		running = []
+		# The walkers stop by themselves at the deadline, so the squares P they tried are still counted
+		while len(found) < args.count and (running or deadline is None or time.time() < deadline):
+			while len(running) < args.jobs and (deadline is None or time.time() < deadline):
+				running.append(pool.apply_async(run_walker, (case, subsq, args.seed + walkers, args.steps, args.noise, args.kick, deadline)))
+				walkers += 1
+			time.sleep(0.05)
+			for job in [job for job in running if job.ready()]:
+				running.remove(job)
+				seed, LS, moves, completed = job.get()
+				tried += completed
+				if LS is None:
+					continue
+				found.append(LS)
+				print("walker {}: TRP {} after {} moves and {} squares P ({:.1f} seconds)".format(seed, len(found), moves, completed, time.time()-start), file=sys.stderr)
+				if args.format == "text":
+					sys.stdout.write(("\n" if len(found) > 1 else "") + decode.format_text(LS))
+				else:
+					sys.stdout.write(decode.format_json(LS, "{}{}#sls-{}".format(case, subsq, seed)) + "\n")
+				sys.stdout.flush()
+		pool.terminate()
+	print("{}{}: {} TRPs found by {} walkers after trying {} squares P in {:.1f} seconds".format(case, subsq, len(found), walkers, tried, time.time()-start), file=sys.stderr)
+	sys.exit(0 if found else 1)
+
+if __name__ == "__main__":
+	main()
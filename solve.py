@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+
+# Encode, solve, decode and verify one case in a single process
+# The clauses go from the clause buffer of encode.py to the solver backend (see solvers.py) without a pipe, and the model comes back
+# as an array of literals that is decoded and verified in memory with verify.verify_model
+# For example, ./solve.py -z 4 --backend pysat UU or ./solve.py --backend kissat --log log/UU-1.log -s 1 UU
+
+import argparse
+import sys
+import time
+
+import decode
+import encode
+import params
+import solvers
+import verify
+
+def main():
+	parser = argparse.ArgumentParser(description="Solve one case with a solver backend and decode and verify the solution")
+	parser.add_argument("case", help="pair type (e.g., UU)")
+	parser.add_argument("-z", dest="subsq", help="subsquare consistency option (4, 2xz2 or 4z2xz2)")
+	parser.add_argument("--backend", default="kissat", help="solver backend: kissat[:path], pysat[:name] or ipasir:library (default: kissat)")
+	parser.add_argument("-t", dest="timeout", type=int, help="stop the solver after timeout seconds")
+	parser.add_argument("-s", dest="seed", type=int, default=0, help="random seed of the solver (Kissat only)")
+	parser.add_argument("--log", help="file to write the log of Kissat to")
+	parser.add_argument("-f", dest="format", choices=["text", "json"], default="text", help="output format of the solution (as in decode.py)")
+	parser.add_argument("--order", help="solve the analogue n,m of order n with an m x m subsquare (see params.py)")
+	parser.add_argument("--strongsym", action="store_true", help="add the stronger symmetry breaking of encode.py -strongsym")
+	args = parser.parse_args()
+	if args.order:
+		p = params.from_string(args.order)
+		encode.configure(p)
+		verify.configure(p)
+
+	case = args.case
+	if len(case) != 2 or any(t not in encode.transversal_types for t in case):
+		print("Invalid square type. Both square types must be one of {" + ",".join(encode.transversal_types) + "}.")
+		sys.exit(1)
+	subsq = "-z" + args.subsq if args.subsq else ""
+	z4, z2xz2 = encode.subsquare_flags(subsq)
+	backend = solvers.backend(args.backend)
+
+	start = time.perf_counter()
+	e = encode.encode(case[0], case[1], z4, z2xz2, strong_symmetry=args.strongsym)
+	encode_time = time.perf_counter() - start
+	result = backend.solve(e, args.seed, args.timeout, args.log)
+	print("c {}{}: {} variables, {} clauses encoded in {:.2f} seconds, solved by {} in {:.2f} seconds".format(case, subsq, e.total_vars, len(e.clauses), encode_time, args.backend, result.seconds), file=sys.stderr)
+	if result.status != solvers.SAT:
+		print("s " + {solvers.UNSAT: "UNSATISFIABLE"}.get(result.status, "UNKNOWN"))
+		sys.exit(0 if result.status == solvers.UNSAT else 1)
+
+	print("s SATISFIABLE")
+	verification = verify.verify_model(result.model, case[0], case[1], z4, z2xz2, args.strongsym)
+	LS = verification.squares
+	sys.stdout.write(decode.format_text(LS) if args.format == "text" else decode.format_json(LS, case + subsq) + "\n")
+	sys.stdout.write(verification.report())
+	if not verification.passed():
+		sys.exit(1)
+
+if __name__ == "__main__":
+	main()
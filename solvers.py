@@ -0,0 +1,130 @@
+# Solver backends
+# A backend solves the instance held by an Encoder of encode.py and returns a Result with the answer and the model as an array of literals,
+# which can be passed straight to decode.decode_model
+# * kissat[:path]: the clause buffer is written to a DIMACS file that Kissat reads directly (no pipe), Kissat runs as a subprocess writing its
+#   log to a file, and the model is read back from the "v" lines of the log
+# * pysat[:name]: the clauses are passed from the clause buffer to a solver of the python-sat package in this process (default: cadical195)
+# * ipasir:library: the literals of the clause buffer are passed to a shared library implementing the IPASIR interface
+#   (ipasir_init, ipasir_add, ipasir_solve, ...; e.g., a shared build of CaDiCaL) loaded with ctypes
+
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from array import array
+
+import decode
+import portfolio
+
+# Answers of the solvers (the exit codes of Kissat)
+SAT = portfolio.SAT
+UNSAT = portfolio.UNSAT
+
+# The answer of a solver: status is SAT, UNSAT or None (no answer), model is an array('i') of literals when the status is SAT,
+# and seconds is the time taken by the solver (without encoding the instance)
+class Result:
+	def __init__(self, status, model=None, seconds=None):
+		self.status = status
+		self.model = model
+		self.seconds = seconds
+
+	def status_name(self):
+		return {SAT: "SAT", UNSAT: "UNSAT"}.get(self.status, "UNKNOWN")
+
+# Kissat run as a subprocess on a DIMACS file
+class KissatBackend:
+	def __init__(self, solver=portfolio.default_solver, options=[]):
+		self.solver = solver
+		self.options = options
+
+	# Solve the instance of the encoder e with the given seed, stopping after timeout seconds if it is set
+	# The log of Kissat is written to the file log if it is given (and to a temporary file otherwise)
+	def solve(self, e, seed=0, timeout=None, log=None):
+		portfolio.ensure_solver(self.solver)
+		with tempfile.TemporaryDirectory() as tmp:
+			cnf = os.path.join(tmp, "instance.cnf")
+			with open(cnf, "w") as f:
+				e.write_dimacs(f)
+			log = log or os.path.join(tmp, "kissat.log")
+			start = time.perf_counter()
+			with open(log, "w") as f:
+				returncode = subprocess.run(portfolio.solver_command(self.solver, cnf, seed, timeout, self.options), stdout=f, stderr=subprocess.STDOUT).returncode
+			seconds = time.perf_counter() - start
+			if returncode == SAT:
+				with open(log) as f:
+					return Result(SAT, array('i', next(decode.read_models(f))), seconds)
+		return Result(returncode if returncode == UNSAT else None, None, seconds)
+
+# A solver of the python-sat package run in this process
+class PysatBackend:
+	def __init__(self, name="cadical195"):
+		self.name = name
+
+	# Solve the instance of the encoder e, stopping after timeout seconds if it is set
+	# (the seed is ignored, and not every python-sat solver can be stopped at the timeout)
+	def solve(self, e, seed=0, timeout=None, log=None):
+		from pysat.solvers import Solver
+		with Solver(name=self.name, bootstrap_with=e.clauses) as solver:
+			start = time.perf_counter()
+			if timeout:
+				timer = threading.Timer(timeout, solver.interrupt)
+				timer.start()
+				answer = solver.solve_limited(expect_interrupt=True)
+				timer.cancel()
+			else:
+				answer = solver.solve()
+			seconds = time.perf_counter() - start
+			if answer:
+				return Result(SAT, array('i', solver.get_model()), seconds)
+		return Result(UNSAT if answer is False else None, None, seconds)
+
+# A shared library implementing the IPASIR interface, loaded with ctypes
+class IpasirBackend:
+	def __init__(self, library):
+		import ctypes
+		self.ctypes = ctypes
+		self.lib = ctypes.CDLL(library)
+		self.lib.ipasir_init.restype = ctypes.c_void_p
+		self.lib.ipasir_add.argtypes = [ctypes.c_void_p, ctypes.c_int32]
+		self.lib.ipasir_solve.argtypes = [ctypes.c_void_p]
+		self.lib.ipasir_val.argtypes = [ctypes.c_void_p, ctypes.c_int32]
+		self.lib.ipasir_release.argtypes = [ctypes.c_void_p]
+		self.terminate_type = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_void_p)
+		self.lib.ipasir_set_terminate.argtypes = [ctypes.c_void_p, ctypes.c_void_p, self.terminate_type]
+
+	# Solve the instance of the encoder e, stopping after timeout seconds if it is set (the seed is ignored)
+	def solve(self, e, seed=0, timeout=None, log=None):
+		lib = self.lib
+		s = lib.ipasir_init()
+		try:
+			# The literals of the clause buffer are already terminated by 0 as ipasir_add expects
+			add = lib.ipasir_add
+			for lit in e.clauses.lits:
+				add(s, lit)
+			start = time.perf_counter()
+			if timeout:
+				deadline = start + timeout
+				terminate = self.terminate_type(lambda data: int(time.perf_counter() > deadline))
+				lib.ipasir_set_terminate(s, None, terminate)
+			answer = lib.ipasir_solve(s)
+			seconds = time.perf_counter() - start
+			if answer == SAT:
+				val = lib.ipasir_val
+				return Result(SAT, array('i', (v if val(s, v) > 0 else -v for v in range(1, e.total_vars+1))), seconds)
+			return Result(answer if answer == UNSAT else None, None, seconds)
+		finally:
+			lib.ipasir_release(s)
+
+# Return the backend given by spec: kissat[:path], pysat[:name] or ipasir:library (see above)
+def backend(spec):
+	name, _, arg = spec.partition(":")
+	if name == "kissat":
+		return KissatBackend(arg or portfolio.default_solver)
+	if name == "pysat":
+		return PysatBackend(arg or "cadical195")
+	if name == "ipasir":
+		if not arg:
+			raise ValueError("The ipasir backend needs the path of the library (ipasir:library)")
+		return IpasirBackend(arg)
+	raise ValueError("Unknown solver backend " + spec)
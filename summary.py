@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+
+# Summarize the results of the logs in a table (as summary.sh did)
+# Call with -l for LaTeX table output
+# Every log is parsed once and the results are kept in an SQLite index (log/index.sqlite by default);
+# later calls only parse the logs that are new or were modified since they were indexed
+
+import argparse
+import os
+import re
+import sqlite3
+import statistics
+
+# Pair types and subsquare options in the table
+types = ["UU", "SX", "UW", "WW", "VX", "UX", "WX", "XX"]
+subsqs = ["", "-z4", "-z2xz2", "-z4z2xz2"]
+stats = ["count", "mean", "median", "min", "max"]
+
+# Running time assumed for a run that did not finish (one week)
+TIMEOUT = 604800
+
+# Names of the logs written by run.sh: <pair type><subsquare option>-<seed>.log
+log_pattern = re.compile(r"([RSTUVWX]{2})(-z4|-z2xz2|-z4z2xz2)?-([0-9]+)\.log$")
+
+# Comment written by portfolio.py to the logs of the solvers it stopped because another seed answered first
+loser_marker = "stopped: portfolio loser"
+
+# Version of the index: the index is rebuilt when an older version of this script wrote it
+INDEX_VERSION = 1
+
+schema = """create table if not exists logs (
+	file text primary key,
+	mtime real,
+	size integer,
+	pair_type text,
+	subsq text,
+	seed integer,
+	status text,
+	process_time real,
+	conflicts integer,
+	decisions integer
+)"""
+
+# Parse a Kissat log and return its status (SATISFIABLE, UNSATISFIABLE, UNKNOWN, STOPPED or None if the run has no answer yet),
+# process time in seconds, and numbers of conflicts and decisions (None when the log does not report them)
+# A log containing "s UNKNOWN" anywhere is unknown (portfolio.py and cube.py append it to the logs of stopped solvers),
+# except that the log of a solver stopped by portfolio.py because another seed answered first is STOPPED
+def parse_log(name):
+	status, process_time, conflicts, decisions = None, None, None, None
+	unknown = False
+	stopped = False
+	with open(name, errors="replace") as f:
+		for line in f:
+			if "s UNKNOWN" in line:
+				unknown = True
+			if line.startswith("c " + loser_marker):
+				stopped = True
+			if line.startswith("s "):
+				status = line.split()[1]
+			elif line.startswith("c process-time"):
+				process_time = float(line.split()[-2])
+			elif line.startswith("c conflicts:"):
+				conflicts = int(line.split()[2])
+			elif line.startswith("c decisions:"):
+				decisions = int(line.split()[2])
+	return ("STOPPED" if stopped else "UNKNOWN" if unknown else status), process_time, conflicts, decisions
+
+# Bring the index in the database db up to date with the logs in the directory log_dir
+# Return the number of logs parsed
+def update_index(db, log_dir):
+	db.execute(schema)
+	if db.execute("pragma user_version").fetchone()[0] < INDEX_VERSION:
+		db.execute("delete from logs")
+		db.execute("pragma user_version = {}".format(INDEX_VERSION))
+	indexed = {row[0]: (row[1], row[2]) for row in db.execute("select file, mtime, size from logs")}
+	present = set()
+	parsed = 0
+	for name in sorted(os.listdir(log_dir)):
+		m = log_pattern.fullmatch(name)
+		if not m:
+			continue
+		present.add(name)
+		st = os.stat(os.path.join(log_dir, name))
+		if indexed.get(name) == (st.st_mtime, st.st_size):
+			continue
+		status, process_time, conflicts, decisions = parse_log(os.path.join(log_dir, name))
+		db.execute("insert or replace into logs values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+		           (name, st.st_mtime, st.st_size, m.group(1), m.group(2) or "", int(m.group(3)), status, process_time, conflicts, decisions))
+		parsed += 1
+	db.executemany("delete from logs where file = ?", [(name,) for name in indexed if name not in present])
+	db.commit()
+	return parsed
+
+# Return the entries of the table row of the given pair type and subsquare option, or None if there are no logs for it
+# Runs that did not finish count as taking one week in all statistics except for the count
+# Runs stopped by portfolio.py because another seed answered first are left out (the race is counted once, by its winner)
+def table_row(db, pair_type, subsq):
+	rows = db.execute("select status, process_time from logs where pair_type = ? and subsq = ? and status is not 'STOPPED'", (pair_type, subsq)).fetchall()
+	if not rows:
+		return None
+	times = [t for status, t in rows if status != "UNKNOWN" and t is not None]
+	entries = ["{:8d}/{:2d}".format(len(times), len(rows))]
+	padded = times + [TIMEOUT]*(len(rows)-len(times))
+	for stat in stats[1:]:
+		if not times:
+			entries.append("-")
+			continue
+		t = {"mean": statistics.mean, "median": statistics.median, "min": min, "max": max}[stat](padded)
+		entries.append("timeout" if t == TIMEOUT else "{:.1f}".format(t))
+	return entries
+
+def main():
+	parser = argparse.ArgumentParser(description="Summarize the results of the Kissat logs")
+	parser.add_argument("-l", dest="latex", action="store_true", help="print the table in LaTeX form")
+	parser.add_argument("--log-dir", default="log", help="directory holding the logs (default: log)")
+	parser.add_argument("--db", help="SQLite index of the logs (default: index.sqlite in the log directory)")
+	args = parser.parse_args()
+	sep, endl = (" &", " \\\\") if args.latex else ("", "")
+
+	if not os.path.isdir(args.log_dir):
+		print("Error: no log directory {}; exiting.".format(args.log_dir))
+		return
+	db = sqlite3.connect(args.db or os.path.join(args.log_dir, "index.sqlite"))
+	update_index(db, args.log_dir)
+
+	print("{:<12}{}".format("pair type", sep) + "".join("{:>11}{}".format(stat, sep) for stat in stats) + endl)
+	for subsq in subsqs:
+		for pair_type in types:
+			entries = table_row(db, pair_type, subsq)
+			if entries is None:
+				continue
+			print("{:<12}{}".format(pair_type + subsq, sep) + "".join("{:>11}{}".format(t, sep) for t in entries) + endl)
+	db.close()
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+
+# Tune the options of Kissat for one case on short time budgets
+# Configurations of Kissat options are sampled at random from the table options below (the first configuration is Kissat's default)
+# and every configuration is run on the same seeds with a budget of -t seconds (Kissat's --time), -j runs at a time
+# The runs of a case are kept in log/tune/<case><subsq>/ (the plan of the configurations and seeds in plan.json, and the logs of each
+# configuration in a directory c<i>/ named as by run.sh and indexed by summary.py), so an interrupted tuning is resumed by running it again
+# and more configurations or seeds are added by running it again with a larger -n or -k
+# The configurations are ranked by the median and the 90th percentile of their times to solve (a run without an answer counts as twice
+# the budget), then by the number of runs with an answer, and then by the median percentage of variables still active at the end of the runs (the progress reached by runs that
+# timed out, from the progress lines of Kissat as read by monitor.py)
+# The options of the best configuration are written to tuned/<case><subsq>.options, which run.sh passes to Kissat, and the ranking
+# of all configurations to tuned/<case><subsq>.json
+# For example, ./tune.py -z 4 -n 16 -k 8 -t 60 UU
+
+import argparse
+import json
+import os
+import random
+import signal
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+
+import campaign
+import encode
+import monitor
+import portfolio
+import summary
+
+# Kissat options that are sampled, with the values tried besides the default (the first value)
+options = [
+	("stable", [1, 0, 2]),
+	("target", [1, 0, 2]),
+	("phase", [1, 0]),
+	("chrono", [1, 0]),
+	("restartint", [1, 10, 50]),
+	("reduceint", [1000, 300, 3000]),
+	("tier1", [2, 3]),
+	("tier2", [6, 10]),
+	("shrink", [3, 0, 1]),
+	("eliminate", [1, 0]),
+	("walkinitially", [0, 1]),
+]
+
+# Directory of the options files read by run.sh
+tuned_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tuned")
+
+# Return a random configuration (a list of Kissat options) changing between one and max_changes options from their defaults
+def sample_configuration(rng, max_changes=3):
+	changed = rng.sample(options, rng.randint(1, max_changes))
+	return sorted("--{}={}".format(name, rng.choice(values[1:])) for name, values in changed)
+
+# Read the plan of the tuning in the directory (or start a new one) and extend it to count configurations and seeds seeds
+# The first configuration is the default one; the plan is written back to plan.json
+def load_plan(directory, count, seeds, rng):
+	name = os.path.join(directory, "plan.json")
+	plan = {"configurations": [[]], "seeds": []}
+	if os.path.exists(name):
+		with open(name) as f:
+			plan = json.load(f)
+	while len(plan["configurations"]) < count:
+		configuration = sample_configuration(rng)
+		if configuration not in plan["configurations"]:
+			plan["configurations"].append(configuration)
+	plan["seeds"] += portfolio.random_seeds(max(0, seeds - len(plan["seeds"])))
+	os.makedirs(directory, exist_ok=True)
+	with open(name + ".tmp", "w") as f:
+		json.dump(plan, f, indent=1)
+	os.replace(name + ".tmp", name)
+	return plan
+
+# Return the 90th percentile of the values
+def tail(values):
+	values = sorted(values)
+	return values[min(len(values)-1, int(0.9*len(values)))]
+
+# Return the statistics of the runs of a configuration in the directory: the numbers of runs and of answers, the median and
+# the 90th percentile of the times to solve (runs without an answer count as twice the budget) and the median percentage of
+# variables still active at the end of the runs (None if no log reports it)
+def configuration_stats(directory, case, subsq, seeds, budget):
+	db = sqlite3.connect(os.path.join(directory, "index.sqlite"))
+	summary.update_index(db, directory)
+	results = {seed: (status, t) for seed, status, t in db.execute("select seed, status, process_time from logs where pair_type = ? and subsq = ?", (case, subsq))}
+	db.close()
+	times, remaining = [], []
+	for seed in seeds:
+		if seed not in results:
+			continue
+		status, t = results[seed]
+		solved = status in ("SATISFIABLE", "UNSATISFIABLE") and t is not None
+		times.append(t if solved else 2*budget)
+		run = monitor.Run(portfolio.log_name(case, subsq, seed, directory), case, subsq, seed)
+		run.update(budget)
+		if "remaining" in run.latest:
+			remaining.append(run.latest["remaining"])
+	return {"runs": len(times), "solved": sum(t < 2*budget for t in times), "median": statistics.median(times) if times else None,
+	        "tail": tail(times) if times else None, "remaining": statistics.median(remaining) if remaining else None}
+
+# Key ordering the statistics of the configurations from best to worst
+def rank_key(stats):
+	return (stats["median"], stats["tail"], -stats["solved"], 100 if stats["remaining"] is None else stats["remaining"])
+
+def main():
+	parser = argparse.ArgumentParser(description="Tune the options of Kissat for one case on short time budgets")
+	parser.add_argument("case", help="pair type (e.g., UU)")
+	parser.add_argument("-z", dest="subsq", help="subsquare consistency option (4, 2xz2 or 4z2xz2)")
+	parser.add_argument("-n", dest="configurations", type=int, default=16, help="number of configurations, including the default one (default: 16)")
+	parser.add_argument("-k", dest="seeds", type=int, default=8, help="number of seeds each configuration is run on (default: 8)")
+	parser.add_argument("-t", dest="timeout", type=int, default=60, help="budget of each run in seconds (default: 60)")
+	parser.add_argument("-j", dest="jobs", type=int, default=len(os.sched_getaffinity(0)), help="number of solvers run in parallel (default: number of available cores)")
+	parser.add_argument("-s", dest="seed", type=int, help="seed of the sampling of the configurations")
+	parser.add_argument("--log-dir", default="log", help="directory of the logs (default: log)")
+	parser.add_argument("--solver", default=portfolio.default_solver, help="path to the Kissat binary")
+	parser.add_argument("--no-save", dest="save", action="store_false", help="only print the ranking without writing the files read by run.sh")
+	args = parser.parse_args()
+
+	case = args.case
+	if len(case) != 2 or any(t not in encode.transversal_types for t in case):
+		print("Invalid square type. Both square types must be one of {R,S,T,U,V,W,X}.")
+		sys.exit(1)
+	subsq = "-z" + args.subsq if args.subsq else ""
+	encode.subsquare_flags(subsq)
+
+	directory = os.path.join(args.log_dir, "tune", case + subsq)
+	plan = load_plan(directory, args.configurations, args.seeds, random.Random(args.seed))
+	configurations = plan["configurations"][:args.configurations]
+	seeds = plan["seeds"][:args.seeds]
+	dirs = [os.path.join(directory, "c{}".format(c)) for c in range(len(configurations))]
+	# A run is done when its log exists (the logs of interrupted runs are removed)
+	pending = [(c, seed) for seed in seeds for c in range(len(configurations)) if not os.path.exists(portfolio.log_name(case, subsq, seed, dirs[c]))]
+	print("{}{}: {} configurations on {} seeds, {} runs pending".format(case, subsq, len(configurations), len(seeds), len(pending)))
+
+	if pending:
+		portfolio.ensure_solver(args.solver)
+		cnf = campaign.instance(case, subsq, directory)
+		signal.signal(signal.SIGTERM, signal.default_int_handler)
+		running = {}
+		try:
+			while pending or running:
+				while pending and len(running) < args.jobs:
+					c, seed = run = pending.pop(0)
+					os.makedirs(dirs[c], exist_ok=True)
+					log = open(portfolio.log_name(case, subsq, seed, dirs[c]), "w")
+					command = portfolio.solver_command(args.solver, cnf, seed, args.timeout, configurations[c])
+					running[run] = (subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT), log, time.time())
+				time.sleep(0.5)
+				for run, (proc, log, start) in list(running.items()):
+					if proc.poll() is None:
+						continue
+					log.close()
+					del running[run]
+					result = {portfolio.SAT: "SAT", portfolio.UNSAT: "UNSAT"}.get(proc.returncode, "UNKNOWN")
+					print("c{} seed {}: {} after {:.1f} seconds ({} pending, {} running)".format(run[0], run[1], result, time.time()-start, len(pending), len(running)))
+					sys.stdout.flush()
+		except KeyboardInterrupt:
+			for (c, seed), (proc, log, start) in running.items():
+				portfolio.stop(proc, log, "stopped by tune.py")
+				log.close()
+				os.remove(portfolio.log_name(case, subsq, seed, dirs[c]))
+			print("Tuning interrupted; run it again to resume")
+			sys.exit(1)
+
+	ranking = []
+	for c, configuration in enumerate(configurations):
+		stats = configuration_stats(dirs[c], case, subsq, seeds, args.timeout)
+		stats.update({"configuration": "c{}".format(c), "options": configuration})
+		ranking.append(stats)
+	ranking.sort(key=rank_key)
+	print("{:<6}{:>8}{:>10}{:>10}{:>11}  {}".format("config", "solved", "median", "tail", "remaining", "options"))
+	for stats in ranking:
+		print("{:<6}{:>8}{:>10.1f}{:>10.1f}{:>11}  {}".format(stats["configuration"], "{}/{}".format(stats["solved"], stats["runs"]),
+		      stats["median"], stats["tail"], "-" if stats["remaining"] is None else "{:.0f}%".format(stats["remaining"]),
+		      " ".join(stats["options"]) or "(default)"))
+
+	if args.save:
+		os.makedirs(tuned_dir, exist_ok=True)
+		name = os.path.join(tuned_dir, case + subsq)
+		with open(name + ".json", "w") as f:
+			json.dump({"case": case, "subsq": subsq, "budget": args.timeout, "seeds": seeds, "ranking": ranking}, f, indent=1)
+			f.write("\n")
+		with open(name + ".options", "w") as f:
+			f.write(" ".join(ranking[0]["options"]) + "\n")
+		print("Options of {} written to {}.options".format(ranking[0]["configuration"], name))
+
+if __name__ == "__main__":
+	main()
@@ -10,29 +10,39 @@
 # 4) The permutation type of each row is correct for that square type.
 # 5) The coloured transversal representation pair is in normal form (i.e., satisfies the symmetry breaking constraints).
 # 6) The 4x4 subsquare consistency constraints are satisfied (using the white entries in the last four columns).
+# With -strongsym it also verifies the normal form of the stronger symmetry breaking of encode.py -strongsym
+# With -order n,m it verifies the analogue of order n with an m x m subsquare instead (see params.py)
+
+# With -batch it instead verifies any number of solutions at once (see verify_batch; requires NumPy)
+# With -model it instead verifies the models in a solver output given on the standard input without printing them as text (see verify_model)
 
 import sys
 
-# Order of the squares
-n = 10
+import decode
+import params
 
-use_z4 = "-z4" in sys.argv
-if use_z4: sys.argv.remove("-z4")
-use_z2xz2 = "-z2xz2" in sys.argv
-if use_z2xz2: sys.argv.remove("-z2xz2")
-if "-z4z2xz2" in sys.argv: use_z4 = True; use_z2xz2 = True; sys.argv.remove("-z4z2xz2")
+# The colour squares are stored with 0 for light, 2 for dark and 3 for white entries (as in decode.py)
+LIGHT = decode.LIGHT
+DARK = decode.DARK
+WHITE = decode.WHITE
 
-# Read from standard input
-# Verify that square names are provided
-if len(sys.argv) <= 1:
-	print("Need to provide the names of the squares as first command-line argument: e.g., VX")
-	print("Optionally pass -z4 or -z2xz2 to verify subsquare consistency constraints for Z_4 or Z_2 x Z_2")
-	quit()
+# Names of the properties that are checked, in the order of the checks in verify
+batch_properties = ["colours", "latin", "transversal", "darks", "row types", "normal form", "subsquare"]
 
-type1 = sys.argv[1][0]
-type2 = sys.argv[1][1]
-assert(type1 in {'R','S','T','U','V','W','X'})
-assert(type2 in {'R','S','T','U','V','W','X'})
+# Set the parameters of the squares from p (see params.py):
+# n is the order of the squares, m the order of the subsquare, first_cols = n-m the number of columns before the subsquare columns
+# and darks the number of dark entries in each of them (decode.py is configured in the same way)
+def configure(p):
+	global n, m, first_cols, darks, square_data, Ls, subsquare_names, first_rows
+	decode.configure(p)
+	n = p.n
+	m = p.m
+	first_cols = p.first_cols
+	darks = p.darks
+	square_data = {t: [p.row_colours(w) for w in p.types[t]] for t in p.types}
+	Ls = p.subsquares
+	subsquare_names = p.subsquare_names
+	first_rows = p.first_rows()
 
 # Determine if N is a Latin square
 def latin(N):
@@ -45,148 +55,352 @@ def latin(N):
 	return True
 
 # Determine if P is a transversal representation of Q
+# Q must be Latin: the inverse table inv[j][s] (the row of symbol s in column j of Q) makes the check O(n^2)
 def transversal(P,Q):
+	inv = [[0]*n for j in range(n)]
 	for i in range(n):
-		N = []
 		for j in range(n):
-			for k in range(n):
-				if P[i][j] == Q[k][j]:
-					N.append(k)
-		if sorted(N) != list(range(n)):
+			inv[j][Q[i][j]] = i
+	for i in range(n):
+		if len({inv[j][P[i][j]] for j in range(n)}) != n:
 			return False
 	return True
 
 ############################################################################################################
 ####                                            Square type                                            #####
 ############################################################################################################
-# Colour counts [w1,l1,w2,l2,d] for each row of the seven square types, where:
+# Colour counts [w1,l1,w2,l2,d] for each row of the seven square types of Myrvold's problem, where:
 # w1 is the number of whites in the first six columns
 # l1 is the number of lights in the first six columns
 # w2 is the number of whites in the last four columns
 # l2 is the number of lights in the last four columns
 # d is the number of darks (all in the first six columns)
-square_data = {
-'R': [[3,3,1,3,0],[3,3,1,3,0],[3,3,1,3,0],[3,3,1,3,0],[3,3,1,3,0],[3,3,1,3,0],[3,3,1,3,0],[3,3,1,3,0],[0,0,4,0,6],[0,0,4,0,6]],
-'S': [[3,3,1,3,0],[3,3,1,3,0],[3,3,1,3,0],[3,3,1,3,0],[3,3,1,3,0],[3,3,1,3,0],[3,3,1,3,0],[1,1,3,1,4],[1,1,3,1,4],[1,1,3,1,4]],
-'T': [[3,3,1,3,0],[3,3,1,3,0],[3,3,1,3,0],[3,3,1,3,0],[3,3,1,3,0],[3,3,1,3,0],[3,3,1,3,0],[2,2,2,2,2],[1,1,3,1,4],[0,0,4,0,6]],
-'U': [[3,3,1,3,0],[3,3,1,3,0],[3,3,1,3,0],[3,3,1,3,0],[3,3,1,3,0],[3,3,1,3,0],[2,2,2,2,2],[2,2,2,2,2],[1,1,3,1,4],[1,1,3,1,4]],
-'V': [[3,3,1,3,0],[3,3,1,3,0],[3,3,1,3,0],[3,3,1,3,0],[3,3,1,3,0],[3,3,1,3,0],[2,2,2,2,2],[2,2,2,2,2],[2,2,2,2,2],[0,0,4,0,6]],
-'W': [[3,3,1,3,0],[3,3,1,3,0],[3,3,1,3,0],[3,3,1,3,0],[3,3,1,3,0],[2,2,2,2,2],[2,2,2,2,2],[2,2,2,2,2],[2,2,2,2,2],[1,1,3,1,4]],
-'X': [[3,3,1,3,0],[3,3,1,3,0],[3,3,1,3,0],[3,3,1,3,0],[2,2,2,2,2],[2,2,2,2,2],[2,2,2,2,2],[2,2,2,2,2],[2,2,2,2,2],[2,2,2,2,2]]
-}
+# For example, the rows of form p_1 of these types are [3,3,1,3,0] and the rows of form p_4 are [0,0,4,0,6]
+# configure derives the table (square_data) from the row forms of the types with params.Parameters.row_colours
 #############################################################
 
-# Four matrices to store the coloured TRP
-Pc = [[[0 for k in range(n)] for j in range(n)] for i in range(n)]
-Qc = [[[0 for k in range(n)] for j in range(n)] for i in range(n)]
-P = [[[0 for k in range(n)] for j in range(n)] for i in range(n)]
-Q = [[[0 for k in range(n)] for j in range(n)] for i in range(n)]
-
-# Read from standard input
-input_lines = sys.stdin.readlines()
-
-# Read colours of square P
-for i in range(n):
-	j = 0
-	assert(len(input_lines[i].split()) == n)
-	for s in input_lines[i].split():
-		assert(s in {"w", "l", "d"})
-		Pc[i][j] = s
-		j += 1
-
-# Read colours of square Q
-for i in range(n):
-	j = 0
-	assert(len(input_lines[n+1+i].split()) == n)
-	for s in input_lines[n+1+i].split():
-		assert(s in {"w", "l", "d"})
-		Qc[i][j] = s
-		j += 1
-
-# Read symbols of square P
-for i in range(n):
-	j = 0
-	assert(len(input_lines[2*(n+1)+i].split()) == n)
-	for s in input_lines[2*(n+1)+i].split():
-		assert(int(s) >= 0 and int(s) < n)
-		P[i][j] = int(s)
-		j += 1
-
-# Read symbols of square Q
-for i in range(n):
-	j = 0
-	assert(len(input_lines[3*(n+1)+i].split()) == n)
-	for s in input_lines[3*(n+1)+i].split():
-		assert(int(s) >= 0 and int(s) < n)
-		Q[i][j] = int(s)
-		j += 1
-
-# Verify 1) All colours were assigned a proper symbol for that colour.
-for i in range(n):
-	for j in range(n):
-		if Pc[i][j] == 'w':
-			assert(P[i][j] < 4)
-		else:
-			assert(P[i][j] >= 4)
-		if Qc[i][j] == 'w':
-			assert(Q[i][j] < 4)
+configure(params.default)
+
+# The result of verifying a coloured TRP: ok maps each name in batch_properties to whether the TRP has that property,
+# compatible lists whether the TRP is compatible with each candidate subsquare (Omega_1, Omega_2, ...),
+# and squares holds the decoded squares (in the flat layout of decode.py) when the TRP was decoded from a model
+class Verification:
+	def __init__(self, ok, compatible, squares=None):
+		self.ok = ok
+		self.compatible = compatible
+		self.squares = squares
+
+	def passed(self):
+		return all(self.ok.values())
+
+	def failed(self):
+		return [name for name in batch_properties if not self.ok[name]]
+
+	# Return the text printed by verify.py: the subsquares compatible with the TRP followed by the result
+	def report(self):
+		lines = [f"TRP is compatible with {m}x{m} Latin subsquare Omega_{s+1} ({subsquare_names[s]})" for s in range(len(Ls)) if self.compatible[s]]
+		lines.append("All constraints verified." if self.passed() else "Verification failed: " + ", ".join(self.failed()))
+		return "\n".join(lines) + "\n"
+
+# Verify the coloured TRP with colour squares Pc, Qc (LIGHT, DARK or WHITE) and symbol squares P, Q, given as lists of rows,
+# where P has type type1 and Q has type type2; return a Verification
+def check_trp(Pc, Qc, P, Q, type1, type2, use_z4=False, use_z2xz2=False, strong_symmetry=False):
+	ok = {}
+	valid = all(0 <= A[i][j] < n for A in (P, Q) for i in range(n) for j in range(n))
+
+	# 1) All colours were assigned a proper symbol for that colour.
+	ok["colours"] = valid and all((C[i][j] == WHITE) == (A[i][j] < m) for A, C in ((P, Pc), (Q, Qc)) for i in range(n) for j in range(n))
+
+	# 2) The squares are Latin squares that are transversal representations of each other.
+	ok["latin"] = valid and latin(P) and latin(Q)
+	ok["transversal"] = ok["latin"] and transversal(P,Q) and transversal(Q,P)
+
+	# 3) There are 2 dark entries in each of the first six columns and the dark entries of the two squares match.
+	def dark_symbols(A, C, j):
+		return [A[i][j] for i in range(n) if C[i][j] == DARK]
+	ok["darks"] = all(len(dark_symbols(P, Pc, j)) == darks and len(dark_symbols(Q, Qc, j)) == darks and
+	                  set(dark_symbols(P, Pc, j)) == set(dark_symbols(Q, Qc, j)) for j in range(first_cols))
+
+	# 4) The permutation type of each row is correct for that square type.
+	def row_counts(row):
+		row = list(row)
+		return [row[:first_cols].count(WHITE), row[:first_cols].count(LIGHT), row[first_cols:].count(WHITE), row[first_cols:].count(LIGHT), row[:first_cols].count(DARK)]
+	ok["row types"] = all(row_counts(C[i]) == square_data[t][i] and DARK not in list(C[i][first_cols:]) for C, t in ((Pc, type1), (Qc, type2)) for i in range(n))
+
+	# 5) The symmetry breaking: rows of the same type are sorted by their first entry and the first row of P is in normal form
+	ok["normal form"] = (all(A[i][0] < A[i+1][0] for A, t in ((P, type1), (Q, type2)) for i in range(n-1) if square_data[t][i] == square_data[t][i+1])
+	                     and list(P[0]) in first_rows)
+	# With the stronger symmetry breaking, the light symbols of the first row of P are ordered by the type of their row in the first column of Q
+	# and then by the type of their row in the first column of P (see light_symbol_order in encode.py)
+	if strong_symmetry and ok["normal form"]:
+		if ok["latin"]:
+			rowP, rowQ = [0]*n, [0]*n
+			for i in range(n):
+				rowP[P[i][0]] = i
+				rowQ[Q[i][0]] = i
+			def light_key(s):
+				return (square_data[type2][rowQ[s]][2], square_data[type1][rowP[s]][2])
+			ok["normal form"] = all(light_key(s) <= light_key(s+1) for s in range(m, n-m))
 		else:
-			assert(Q[i][j] >= 4)
-
-# Verify 2) The squares are Latin squares that are transversal representations of each other.
-assert(latin(P))
-assert(latin(Q))
-assert(transversal(P,Q))
-assert(transversal(Q,P))
-
-# Verify 3) There are 2 dark entries in each of the first six columns and the dark entries of the two squares match.
-for j in range(6):
-	assert([Pc[i][j] for i in range(n)].count('d') == 2)
-	assert([Qc[i][j] for i in range(n)].count('d') == 2)
-	assert({P[i][j] for i in range(n) if Pc[i][j] == 'd'} == {Q[i][j] for i in range(n) if Qc[i][j] == 'd'})
-
-# Verify 4) The permutation type of each row is correct for that square type.
-for i in range(n):
-	assert(Pc[i][:6].count('w') == square_data[type1][i][0])
-	assert(Pc[i][:6].count('l') == square_data[type1][i][1])
-	assert(Pc[i][6:].count('w') == square_data[type1][i][2])
-	assert(Pc[i][6:].count('l') == square_data[type1][i][3])
-	assert(Pc[i][:6].count('d') == square_data[type1][i][4])
-	assert(Pc[i][6:].count('d') == 0)
-
-	assert(Qc[i][:6].count('w') == square_data[type2][i][0])
-	assert(Qc[i][:6].count('l') == square_data[type2][i][1])
-	assert(Qc[i][6:].count('w') == square_data[type2][i][2])
-	assert(Qc[i][6:].count('l') == square_data[type2][i][3])
-	assert(Qc[i][:6].count('d') == square_data[type2][i][4])
-	assert(Qc[i][6:].count('d') == 0)
-
-# Verify 5) The symmetry breaking
-# The rows of the same transversal types are lexicographically sorted in both squares
-for i in range(n-1):
-	if square_data[type1][i] == square_data[type1][i+1]:
-		assert(P[i][0] < P[i+1][0])
-	if square_data[type2][i] == square_data[type2][i+1]:
-		assert(Q[i][0] < Q[i+1][0])
-# First row of first square is in normal form
-assert(P[0] == [0, 1, 2, 4, 5, 6, 3, 7, 8, 9] or P[0] == [0, 1, 3, 4, 5, 6, 2, 7, 8, 9] or P[0] == [0, 2, 3, 4, 5, 6, 1, 7, 8, 9])
-
-# Verify 6) The subsquare consistency constraints
-Ls = [[[0,1,2,3],[1,2,3,0],[2,3,0,1],[3,0,1,2]],
-      [[0,1,2,3],[1,0,3,2],[2,3,0,1],[3,2,1,0]]]
-compatible_with_subsq = [True, True]
-for subsq in range(2):
-	L = Ls[subsq]
+			ok["normal form"] = False
+
+	# 6) The subsquare consistency constraints
+	# A row is incompatible with a subsquare if two of its entries in the last m columns agree with the same row of the subsquare
+	compatible = [not any(sum(A[i][j] == L[k][j-first_cols] for j in range(first_cols, n)) >= 2 for A in (P, Q) for i in range(n) for k in range(m)) for L in Ls]
+	ok["subsquare"] = any(compatible) and (not use_z4 or compatible[0]) and (not use_z2xz2 or compatible[1])
+	return Verification(ok, compatible)
+
+# Decode the model of a solver (a list of literals) with decode.py and verify the TRP it encodes (see check_trp)
+# The squares are decoded straight into arrays without going through text; return a Verification holding the decoded squares
+# (decode.decode_model raises ValueError if the model assigns two symbols to an entry)
+def verify_model(model, type1, type2, use_z4=False, use_z2xz2=False, strong_symmetry=False):
+	LS = decode.decode_model(model)
+	result = check_trp(*(decode.square_rows(LS, p) for p in range(4)), type1, type2, use_z4, use_z2xz2, strong_symmetry)
+	result.squares = LS
+	return result
+
+# Verify the coloured TRP given in the text layout of decode.py on the standard input
+def verify(type1, type2, use_z4, use_z2xz2, strong_symmetry=False):
+	# Four matrices to store the coloured TRP
+	Pc = [[0 for j in range(n)] for i in range(n)]
+	Qc = [[0 for j in range(n)] for i in range(n)]
+	P = [[0 for j in range(n)] for i in range(n)]
+	Q = [[0 for j in range(n)] for i in range(n)]
+	code = {"w": WHITE, "l": LIGHT, "d": DARK}
+
+	# Read from standard input
+	input_lines = sys.stdin.readlines()
+
+	# Read colours of square P
+	for i in range(n):
+		j = 0
+		assert(len(input_lines[i].split()) == n)
+		for s in input_lines[i].split():
+			assert(s in code)
+			Pc[i][j] = code[s]
+			j += 1
+
+	# Read colours of square Q
 	for i in range(n):
-		for j in range(6,n):
-			for jp in range(j+1,n):
-				for k in range(4):
-					if P[i][j] == L[k][j-6] and P[i][jp] == L[k][jp-6]: compatible_with_subsq[subsq] = False
-					if Q[i][j] == L[k][j-6] and Q[i][jp] == L[k][jp-6]: compatible_with_subsq[subsq] = False
-	if compatible_with_subsq[subsq]:
-		print(f"TRP is compatible with 4x4 Latin subsquare Omega_{subsq+1}" + (" (Cayley table of Z_4)" if subsq == 0 else " (Cayley table of Z_2xZ_2)"))
-assert(compatible_with_subsq != [False, False])
-if use_z4: assert(compatible_with_subsq[0])
-if use_z2xz2: assert(compatible_with_subsq[1])
-
-print("All constraints verified.")
+		j = 0
+		assert(len(input_lines[n+1+i].split()) == n)
+		for s in input_lines[n+1+i].split():
+			assert(s in code)
+			Qc[i][j] = code[s]
+			j += 1
+
+	# Read symbols of square P
+	for i in range(n):
+		j = 0
+		assert(len(input_lines[2*(n+1)+i].split()) == n)
+		for s in input_lines[2*(n+1)+i].split():
+			assert(int(s) >= 0 and int(s) < n)
+			P[i][j] = int(s)
+			j += 1
+
+	# Read symbols of square Q
+	for i in range(n):
+		j = 0
+		assert(len(input_lines[3*(n+1)+i].split()) == n)
+		for s in input_lines[3*(n+1)+i].split():
+			assert(int(s) >= 0 and int(s) < n)
+			Q[i][j] = int(s)
+			j += 1
+
+	result = check_trp(Pc, Qc, P, Q, type1, type2, use_z4, use_z2xz2, strong_symmetry)
+	sys.stdout.write(result.report())
+	if not result.passed():
+		sys.exit(1)
+
+# Batch verification of many coloured TRPs at once using NumPy
+
+# Load N coloured TRPs from the binary stream f in the packed format of decode.py -f binary
+# Return the arrays Pc, Qc, P, Q of shape (N, n, n)
+def load_binary(f):
+	import numpy as np
+	data = np.frombuffer(f.read(), dtype=np.int8).reshape(-1, 4, n, n)
+	return data[:,0], data[:,1], data[:,2], data[:,3]
+
+# Load N coloured TRPs from the text stream f holding JSON lines written by decode.py -f json
+def load_json(f):
+	import json
+	import numpy as np
+	code = {"l": 0, "d": DARK, "w": WHITE}
+	sols = [json.loads(line) for line in f if line.strip()]
+	sols = [s for s in sols if "P" in s]
+	Pc = np.array([[[code[c] for c in row] for row in s["Pc"]] for s in sols], dtype=np.int8).reshape(-1, n, n)
+	Qc = np.array([[[code[c] for c in row] for row in s["Qc"]] for s in sols], dtype=np.int8).reshape(-1, n, n)
+	P = np.array([s["P"] for s in sols], dtype=np.int8).reshape(-1, n, n)
+	Q = np.array([s["Q"] for s in sols], dtype=np.int8).reshape(-1, n, n)
+	return Pc, Qc, P, Q
+
+# Load N coloured TRPs from the text stream f in the text layout of decode.py (blank lines are ignored)
+def load_text(f):
+	import numpy as np
+	code = {"l": 0, "d": DARK, "w": WHITE, "*": -1}
+	tokens = [code[t] if t in code else int(t) for line in f for t in line.split()]
+	data = np.array(tokens, dtype=np.int8).reshape(-1, 4, n, n)
+	return data[:,0], data[:,1], data[:,2], data[:,3]
+
+# Return a boolean array of shape (N,) that is True for the squares in A (of shape (N, n, n)) whose rows and columns are permutations
+def batch_latin(A):
+	import numpy as np
+	target = np.arange(n)
+	return (np.sort(A, axis=2) == target).all(axis=(1,2)) & (np.sort(A, axis=1) == target[:,None]).all(axis=(1,2))
+
+# Return a boolean array of shape (N,) that is True where P is a transversal representation of Q
+# Q must be Latin: the inverse table inv[b,s,j] (the row of symbol s in column j of Q) makes the check O(n^2) per pair
+def batch_transversal(P, Q):
+	import numpy as np
+	inv = np.argsort(Q, axis=1)
+	rows = np.take_along_axis(inv, P.astype(np.intp), axis=1)
+	return (np.sort(rows, axis=2) == np.arange(n)).all(axis=(1,2))
+
+# Verify N coloured TRPs at once; return a dictionary mapping each name in batch_properties to a boolean array of shape (N,)
+# that is True for the pairs satisfying that property, together with the (N, len(Ls)) array of subsquare compatibilities
+def verify_batch(Pc, Qc, P, Q, type1, type2, use_z4=False, use_z2xz2=False, strong_symmetry=False):
+	import numpy as np
+	N = len(P)
+	ok = {}
+	symbols = np.arange(n)
+	valid = ((P >= 0) & (P < n)).all(axis=(1,2)) & ((Q >= 0) & (Q < n)).all(axis=(1,2))
+	Ps = np.where((P >= 0) & (P < n), P, 0)
+	Qs = np.where((Q >= 0) & (Q < n), Q, 0)
+
+	# 1) All colours were assigned a proper symbol for that colour.
+	ok["colours"] = valid & ((Pc == WHITE) == (Ps < m)).all(axis=(1,2)) & ((Qc == WHITE) == (Qs < m)).all(axis=(1,2))
+
+	# 2) The squares are Latin squares that are transversal representations of each other.
+	ok["latin"] = valid & batch_latin(Ps) & batch_latin(Qs)
+	ok["transversal"] = ok["latin"] & batch_transversal(Ps, Qs) & batch_transversal(Qs, Ps)
+
+	# 3) There are 2 dark entries in each of the first six columns and the dark entries of the two squares match.
+	Pd = Pc[:,:,:first_cols] == DARK
+	Qd = Qc[:,:,:first_cols] == DARK
+	# Number of dark entries with symbol s in column j, of shape (N, n-m, n)
+	Pcount = ((Ps[:,:,:first_cols,None] == symbols) & Pd[:,:,:,None]).sum(axis=1)
+	Qcount = ((Qs[:,:,:first_cols,None] == symbols) & Qd[:,:,:,None]).sum(axis=1)
+	ok["darks"] = (Pd.sum(axis=1) == darks).all(axis=1) & (Qd.sum(axis=1) == darks).all(axis=1) & ((Pcount > 0) == (Qcount > 0)).all(axis=(1,2))
+
+	# 4) The permutation type of each row is correct for that square type.
+	def row_counts(C):
+		return np.stack([(C[:,:,:first_cols] == WHITE).sum(axis=2), (C[:,:,:first_cols] == 0).sum(axis=2),
+		                 (C[:,:,first_cols:] == WHITE).sum(axis=2), (C[:,:,first_cols:] == 0).sum(axis=2),
+		                 (C[:,:,:first_cols] == DARK).sum(axis=2)], axis=2)
+	ok["row types"] = ((row_counts(Pc) == np.array(square_data[type1])).all(axis=(1,2)) & ((Pc[:,:,first_cols:] == DARK).sum(axis=(1,2)) == 0) &
+	                   (row_counts(Qc) == np.array(square_data[type2])).all(axis=(1,2)) & ((Qc[:,:,first_cols:] == DARK).sum(axis=(1,2)) == 0))
+
+	# 5) The symmetry breaking: rows of the same type are sorted by their first entry and the first row of P is in normal form
+	same1 = np.array([square_data[type1][i] == square_data[type1][i+1] for i in range(n-1)])
+	same2 = np.array([square_data[type2][i] == square_data[type2][i+1] for i in range(n-1)])
+	sorted1 = ((Ps[:,:-1,0] < Ps[:,1:,0]) | ~same1).all(axis=1)
+	sorted2 = ((Qs[:,:-1,0] < Qs[:,1:,0]) | ~same2).all(axis=1)
+	ok["normal form"] = sorted1 & sorted2 & (Ps[:,None,0,:] == np.array(first_rows)).all(axis=2).any(axis=1)
+	if strong_symmetry:
+		# The light symbols of the first row of P are ordered by the types of their rows in the first columns of Q and P
+		# (the rows are found with argsort, which inverts the first columns when they are permutations as checked by "latin")
+		forms1 = np.array([square_data[type1][i][2] for i in range(n)])
+		forms2 = np.array([square_data[type2][i][2] for i in range(n)])
+		keys = forms2[np.argsort(Qs[:,:,0], axis=1)]*(m+1) + forms1[np.argsort(Ps[:,:,0], axis=1)]
+		# As in check_trp, the normal form does not hold for squares that are not Latin
+		ok["normal form"] &= ok["latin"] & (keys[:,m:n-m] <= keys[:,m+1:n-m+1]).all(axis=1)
+
+	# 6) The subsquare consistency constraints
+	# A row is incompatible with a subsquare if two of its entries in the last m columns agree with the same row of the subsquare
+	compatible = np.zeros((N, len(Ls)), dtype=bool)
+	for subsq in range(len(Ls)):
+		L = np.array(Ls[subsq])
+		Pmatch = (Ps[:,:,None,first_cols:] == L).sum(axis=3)
+		Qmatch = (Qs[:,:,None,first_cols:] == L).sum(axis=3)
+		compatible[:,subsq] = (Pmatch < 2).all(axis=(1,2)) & (Qmatch < 2).all(axis=(1,2))
+	ok["subsquare"] = compatible.any(axis=1)
+	if use_z4: ok["subsquare"] &= compatible[:,0]
+	if use_z2xz2: ok["subsquare"] &= compatible[:,1]
+	return ok, compatible
+
+def main():
+	use_z4 = "-z4" in sys.argv
+	if use_z4: sys.argv.remove("-z4")
+	use_z2xz2 = "-z2xz2" in sys.argv
+	if use_z2xz2: sys.argv.remove("-z2xz2")
+	if "-z4z2xz2" in sys.argv: use_z4 = True; use_z2xz2 = True; sys.argv.remove("-z4z2xz2")
+	# Optionally verify many solutions at once, read in the given format (text, json or binary) from the files given or the standard input
+	batch = None
+	if "-batch" in sys.argv:
+		i = sys.argv.index("-batch")
+		batch = sys.argv[i+1]
+		del sys.argv[i:i+2]
+	# Optionally verify the models in a solver output (with -m mapfile for an instance simplified by encode.py -simplify mapfile)
+	model = "-model" in sys.argv
+	if model: sys.argv.remove("-model")
+	unmap = None
+	if "-m" in sys.argv:
+		i = sys.argv.index("-m")
+		with open(sys.argv[i+1]) as f:
+			unmap = decode.read_map(f)
+		del sys.argv[i:i+2]
+	if "-order" in sys.argv:
+		i = sys.argv.index("-order")
+		configure(params.from_string(sys.argv[i+1]))
+		del sys.argv[i:i+2]
+	strong_symmetry = "-strongsym" in sys.argv
+	if strong_symmetry: sys.argv.remove("-strongsym")
+
+	# Verify that square names are provided
+	if len(sys.argv) <= 1:
+		print("Need to provide the names of the squares as first command-line argument: e.g., VX")
+		print("Optionally pass -z4 or -z2xz2 to verify subsquare consistency constraints for Z_4 or Z_2 x Z_2")
+		print("Optionally pass -batch format (text, json or binary, as written by decode.py) to verify any number of solutions given on the standard input or in the files following the square names")
+		print("Optionally pass -order n,m to verify the analogue of order n with an m x m subsquare (default: 10,4)")
+		print("Optionally pass -strongsym to also verify the stronger symmetry breaking of encode.py -strongsym")
+		print("Optionally pass -model to verify the models in a solver output given on the standard input instead (with -m mapfile for an instance simplified by encode.py -simplify mapfile)")
+		quit()
+
+	type1 = sys.argv[1][0]
+	type2 = sys.argv[1][1]
+	assert(type1 in square_data)
+	assert(type2 in square_data)
+	assert(not use_z2xz2 or len(Ls) > 1)
+
+	if model:
+		results = []
+		for lits in decode.read_models(sys.stdin):
+			if lits is None:
+				continue
+			result = verify_model(unmap(lits) if unmap else lits, type1, type2, use_z4, use_z2xz2, strong_symmetry)
+			sys.stdout.write(result.report())
+			results.append(result.passed())
+		if not results:
+			print("No model found in the solver output")
+		if not results or not all(results):
+			sys.exit(1)
+		return
+
+	if batch is None:
+		verify(type1, type2, use_z4, use_z2xz2, strong_symmetry)
+		return
+
+	import numpy as np
+	load = {"text": load_text, "json": load_json, "binary": load_binary}[batch]
+	parts = []
+	for name in sys.argv[2:] or [None]:
+		f = sys.stdin.buffer if batch == "binary" else sys.stdin
+		if name is not None:
+			f = open(name, "rb" if batch == "binary" else "r")
+		parts.append(load(f))
+		if name is not None:
+			f.close()
+	Pc, Qc, P, Q = (np.concatenate([part[p] for part in parts]) for p in range(4))
+	ok, compatible = verify_batch(Pc, Qc, P, Q, type1, type2, use_z4, use_z2xz2, strong_symmetry)
+
+	for b in range(len(P)):
+		failed = [name for name in batch_properties if not ok[name][b]]
+		print("{}: {}".format(b, "ok" if not failed else "FAIL " + ", ".join(failed)))
+	passed = np.logical_and.reduce([ok[name] for name in batch_properties]) if len(P) else np.zeros(0, dtype=bool)
+	counts = ["{} {}with Omega_{}".format(int(compatible[:,s].sum()), "compatible " if s == 0 else "", s+1) for s in range(len(Ls))]
+	print("{} of {} solutions verified ({})".format(int(passed.sum()), len(P), ", ".join(counts)))
+	if not passed.all():
+		sys.exit(1)
+
+if __name__ == "__main__":
+	main()